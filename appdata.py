@@ -0,0 +1,35 @@
+"""
+Папка данных пользователя для файлов, которые программа ведёт сама:
+профили принтеров, очередь заданий сервера печати, кэш готовых файлов, замеры заданий.
+
+Текущая папка для них не годится — она зависит от ярлыка, планировщика или каталога,
+из которого запущены окно и командная строка, и профили «пропадали» бы между запусками.
+Windows — %APPDATA%\\CableSigns, остальные системы — $XDG_DATA_HOME/cable_signs
+(~/.local/share/cable_signs). Вся папка переопределяется CABLE_SIGNS_HOME,
+отдельные файлы — своими переменными окружения (CABLE_SIGNS_PRINTERS, ...).
+"""
+import os
+
+APP_DIR_NAME = "CableSigns"  # Имя папки в %APPDATA%
+XDG_DIR_NAME = "cable_signs"  # Имя папки в $XDG_DATA_HOME
+
+
+def app_data_dir():
+    """Папка данных пользователя (не создаётся — её создаёт тот, кто пишет файл)"""
+    if os.environ.get("CABLE_SIGNS_HOME"):
+        return os.path.abspath(os.environ["CABLE_SIGNS_HOME"])
+    if os.name == "nt" and os.environ.get("APPDATA"):
+        return os.path.join(os.environ["APPDATA"], APP_DIR_NAME)
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, XDG_DIR_NAME)
+
+
+def data_path(name, env=None):
+    """
+    Путь файла или папки данных.
+    :param name: имя в папке данных пользователя
+    :param env: переменная окружения, которая задаёт путь целиком
+    """
+    if env and os.environ.get(env):
+        return os.environ[env]
+    return os.path.join(app_data_dir(), name)
@@ -0,0 +1,260 @@
+"""
+Бенчмарк конвейера генерации бирок по этапам.
+
+Генерирует синтетические журналы (1k, 10k, 100k бирок) и замеряет отдельно:
+чтение книги, сборку записей, отрисовку листов (draw_page/draw_triangle) и canvas.save.
+Для каждого этапа считается пиковая память (tracemalloc, отдельный проход),
+для задания — размер PDF. Результаты сохраняются в JSON и сравниваются с базовой линией.
+
+Запуск:
+    python benchmarks/bench_pipeline.py                         # 1k, 10k, 100k
+    python benchmarks/bench_pipeline.py --sizes 1000 10000
+    python benchmarks/bench_pipeline.py --save-baseline         # записать новую базовую линию
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import engine  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+TOLERANCE = 0.20  # Допустимое ухудшение относительно базовой линии (20%)
+MIN_DELTA_SECONDS = 0.01  # Разница во времени меньше этой считается шумом
+STAGES = ("read", "build", "draw", "save")
+
+# === СИНТЕТИЧЕСКИЕ ДАННЫЕ ===
+SYSTEMS = [
+        "СКУД", "АПС", "СОУЭ", "СОТ", "ЛВС", "АСКУЭ", "Видеонаблюдение",
+        "Диспетчеризация", "ЭОМ", "СКС", "Пожаротушение", "Домофония",
+]
+TRACK_PREFIXES = ["Тр", "ТР", "Кб", "КЛ", "Л", "ВЛ", "СК"]
+CABLES = [
+        "ParLan 4x2x0,57", "UTP 4x2x0,52", "КПСнг(А)-FRLS 1x2x0,75", "КПСнг(А)-FRHF 2x2x1,5",
+        "КВВГнг(А)-LS 7x1,5", "ВВГнг(А)-LS 3x2,5", "ВВГнг(А)-FRLS 5x4", "КСПВ 4x0,5",
+        "RG-6", "FTP 4x2x0,52", "ШВВП 2x0,75", "ОКЛ-0,22-8",
+]
+# Распределение 'Кол-во': в основном 1–2 бирки на трассу, изредка десятки
+QTY_WEIGHTS = ((1, 55), (2, 25), (3, 8), (4, 5), (6, 4), (10, 2), (40, 1))
+
+
+def make_schedule(path, labels, seed=42):
+    """
+    Записывает синтетический журнал с заданным общим числом бирок.
+    :return: количество строк данных
+    """
+    import openpyxl
+
+    rnd = random.Random(seed)
+    quantities, weights = zip(*QTY_WEIGHTS)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Журнал")
+    ws.append(["Подсистема", "Трасса", "Кабель", "Длина", "Кол-во"])
+
+    rows = 0
+    remaining = labels
+    while remaining > 0:
+        qty = min(rnd.choices(quantities, weights)[0], remaining)
+        system = rnd.choice(SYSTEMS)
+        track = f"{rnd.choice(TRACK_PREFIXES)}-{system[:3].upper()}-{rnd.randint(1, 9999):04d}"
+        if rnd.random() < 0.15:
+            track += f"/{rnd.randint(1, 99)}-ШУ{rnd.randint(1, 20)}"
+        length = rnd.choice((rnd.randint(1, 350), f"{rnd.randint(1, 120)}.{rnd.randint(0, 9)}", "по месту"))
+        ws.append([system, track, rnd.choice(CABLES), length, qty])
+        remaining -= qty
+        rows += 1
+
+    wb.save(path)
+    return rows
+
+
+def schedule_path(labels):
+    """Журнал кэшируется в benchmarks/data, чтобы не пересоздавать 100k строк каждый запуск"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"schedule_{labels}.xlsx")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        make_schedule(path, labels)
+    return path
+
+
+# === ЗАМЕРЫ ===
+def clear_caches():
+    """Каждый прогон начинается с пустых кэшей подбора шрифта"""
+    for func in (engine.text_width, engine.fit_main_text, engine.fit_cable_lines, engine.fit_sub_text):
+        func.cache_clear()
+
+
+def run_stages(xlsx_path, pdf_path, trace_memory=False):
+    """
+    Один прогон конвейера.
+    :return: (seconds, peaks, labels, rows) — время и пиковая память (байт) по этапам
+    """
+    clear_caches()
+    seconds = {}
+    peaks = {}
+
+    def stage(name, func):
+        if trace_memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func()
+        seconds[name] = time.perf_counter() - start
+        if trace_memory:
+            # Прирост пика за этап — без памяти, занятой предыдущими этапами
+            peaks[name] = tracemalloc.get_traced_memory()[1] - before
+        return result
+
+    renderer = engine.LabelRenderer(5.0, 0.0, 0.0)
+
+    def read():
+        _, rows = engine.read_excel_rows(xlsx_path)
+        return list(rows)
+
+    rows = stage("read", read)
+    data = stage("build", lambda: engine.build_label_sequence(iter(rows)))
+    c = renderer.new_canvas(pdf_path)
+    stage("draw", lambda: renderer.draw_sheets(c, data))
+    stage("save", c.save)
+    return seconds, peaks, len(data), len(rows)
+
+
+def bench_size(labels, repeat, trace_memory):
+    """Замер одного размера: лучшее время из repeat прогонов + отдельный проход памяти"""
+    xlsx_path = schedule_path(labels)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+
+        best = None
+        for _ in range(repeat):
+            seconds, _, label_count, row_count = run_stages(xlsx_path, pdf_path)
+            if best is None:
+                best = seconds
+            else:
+                best = {name: min(best[name], seconds[name]) for name in best}
+        pdf_bytes = os.path.getsize(pdf_path)
+
+        peaks = {}
+        if trace_memory:
+            tracemalloc.start()
+            try:
+                _, peaks, _, _ = run_stages(xlsx_path, pdf_path, trace_memory=True)
+            finally:
+                tracemalloc.stop()
+
+    total = sum(best.values())
+    return {
+            "labels": label_count,
+            "rows": row_count,
+            "seconds": {name: round(value, 4) for name, value in best.items()},
+            "total_seconds": round(total, 4),
+            "labels_per_second": round(label_count / total, 1) if total else None,
+            "peak_memory_mb": {name: round(value / 2 ** 20, 2) for name, value in peaks.items()},
+            "pdf_bytes": pdf_bytes,
+    }
+
+
+# === СРАВНЕНИЕ С БАЗОВОЙ ЛИНИЕЙ ===
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Сравнивает время, память и размер PDF с базовой линией.
+    :return: список строк с описанием регрессий
+    """
+    regressions = []
+    for size, current in results["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if base is None:
+            continue
+
+        checks = [(f"{stage} time", current["seconds"].get(stage), base["seconds"].get(stage)) for stage in STAGES]
+        checks += [
+                (f"{stage} memory", current["peak_memory_mb"].get(stage), base.get("peak_memory_mb", {}).get(stage))
+                for stage in STAGES
+        ]
+        checks.append(("pdf size", current["pdf_bytes"], base["pdf_bytes"]))
+
+        for name, value, reference in checks:
+            if value is None or not reference:
+                continue
+            ratio = value / reference
+            noise = name.endswith("time") and value - reference < MIN_DELTA_SECONDS
+            marker = "  "
+            if ratio > 1 + tolerance and not noise:
+                marker = "❌"
+                regressions.append(f"{size} labels: {name} {value} vs {reference} (x{ratio:.2f})")
+            print(f"{marker} {size:>7} {name:<14} {value:>12} vs {reference:>12}  x{ratio:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк генерации бирок по этапам")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="количества бирок")
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов на размер (берётся лучший)")
+    parser.add_argument("--no-memory", action="store_true", help="без прохода tracemalloc")
+    parser.add_argument("--output", default=RESULTS_PATH, help="куда записать результаты JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="базовая линия для сравнения")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="допустимое ухудшение (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = {
+            "meta": {
+                    "date": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "repeat": args.repeat,
+            },
+            "results": {},
+    }
+    # Ленивые импорты и регистрация шрифта не должны попадать в замер первого этапа
+    import openpyxl  # noqa: F401
+    engine.ensure_font()
+
+    for size in args.sizes:
+        result = bench_size(size, args.repeat, trace_memory=not args.no_memory)
+        results["results"][str(size)] = result
+        stages = ", ".join(f"{name} {value:.3f}s" for name, value in result["seconds"].items())
+        print(f"{size:>7} labels: {stages}; {result['labels_per_second']} labels/s; {result['pdf_bytes']} bytes")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet — run with --save-baseline")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
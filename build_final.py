@@ -22,6 +22,9 @@ def build_app():
         '--add-binary', f'{os.path.join(dlls_path, "tk86t.dll")};.',
         '--add-binary', f'{os.path.join(dlls_path, "_tkinter.pyd")};.',
         '--add-binary', f'{os.path.join(dlls_path, "tcl86t.dll")};.',
+        # pandas/numpy не используются, но попадают в сборку, если установлены в окружении
+        '--exclude-module', 'pandas',
+        '--exclude-module', 'numpy',
         'main.py'
     ]
     
@@ -33,6 +36,7 @@ def build_app():
     if result.returncode == 0:
         print("\n✅ Build successful!")
         print(f"Executable: dist/main.exe")
+        print("Check startup time: python measure_startup.py dist/main.exe")
     else:
         print("\n❌ Build failed!")
     
@@ -0,0 +1,199 @@
+"""
+Калибровка двусторонней печати и профили принтеров.
+
+Калибровочный лист: на лицевой стороне — шкалы в контрольных точках, на обратной —
+перекрестия в тех же точках (с текущей компенсацией). На просвет перекрестие обратной
+стороны указывает на шкале поправку в мм, которую нужно прибавить к компенсации.
+Найденные значения сохраняются как профиль принтера; профиль по умолчанию
+подставляется в следующие задания автоматически.
+"""
+import os
+import json
+import logging
+from datetime import datetime
+
+from reportlab.lib.units import mm
+
+from appdata import data_path
+from engine import FONT_NAME, SheetLayout, ensure_font
+from templates import DEFAULT_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+# Файл профилей принтеров — в папке данных пользователя; переопределяется CABLE_SIGNS_PRINTERS
+PRINTERS_FILE = data_path("printers.json", "CABLE_SIGNS_PRINTERS")
+
+SCALE_RANGE = 6  # Шкала от −6 до +6 мм
+SCALE_STEP = 0.5  # Деление шкалы, мм
+CORNER_INSET = 30 * mm  # Контрольные точки у углов — на таком расстоянии от краёв
+MARK_LINE = 0.3  # Толщина линий меток и контуров, пт
+CROSS_ARM = 9 * mm  # Половина перекрестия обратной стороны
+
+
+# === ПРОФИЛИ ПРИНТЕРОВ ===
+def load_profiles(path=PRINTERS_FILE):
+    """
+    Профили из файла.
+    :return: {"default": имя или None, "printers": {имя: {"offset_x", "offset_y", "saved"}}}
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            profiles = json.load(f)
+        profiles.setdefault("default", None)
+        profiles.setdefault("printers", {})
+        return profiles
+    except FileNotFoundError:
+        return {"default": None, "printers": {}}
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Файл профилей принтеров {path} не прочитан: {e}")
+        return {"default": None, "printers": {}}
+
+
+def _write_profiles(profiles, path):
+    """Запись через временный файл — профили не портятся при сбое"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def save_profile(name, offset_x, offset_y, path=PRINTERS_FILE, make_default=True):
+    """
+    Сохраняет компенсацию принтера под именем.
+    :param make_default: подставлять этот профиль в задания по умолчанию
+    """
+    profiles = load_profiles(path)
+    profiles["printers"][name] = {
+            "offset_x": round(offset_x, 2),
+            "offset_y": round(offset_y, 2),
+            "saved": datetime.now().isoformat(timespec="seconds"),
+    }
+    if make_default:
+        profiles["default"] = name
+    _write_profiles(profiles, path)
+    logger.info(f"🖨 Профиль принтера «{name}» сохранён: X={offset_x:+.2f} мм, Y={offset_y:+.2f} мм")
+
+
+def set_default_profile(name, path=PRINTERS_FILE):
+    """:raises KeyError: если профиля нет"""
+    profiles = load_profiles(path)
+    if name not in profiles["printers"]:
+        raise KeyError(name)
+    profiles["default"] = name
+    _write_profiles(profiles, path)
+
+
+def delete_profile(name, path=PRINTERS_FILE):
+    """:raises KeyError: если профиля нет"""
+    profiles = load_profiles(path)
+    del profiles["printers"][name]
+    if profiles["default"] == name:
+        profiles["default"] = None
+    _write_profiles(profiles, path)
+
+
+def get_profile(name=None, path=PRINTERS_FILE):
+    """
+    Профиль по имени или профиль по умолчанию.
+    :return: (имя, {"offset_x", "offset_y", ...}) или None
+    :raises KeyError: если профиль с таким именем не найден
+    """
+    profiles = load_profiles(path)
+    if name is None:
+        name = profiles["default"]
+        if name is None or name not in profiles["printers"]:
+            return None
+    return name, profiles["printers"][name]
+
+
+# === КАЛИБРОВОЧНЫЙ ЛИСТ ===
+def reference_points(layout):
+    """Контрольные точки лицевой стороны: центр листа и четыре точки у углов"""
+    width, height = layout.pagesize
+    return (
+            (width / 2, height / 2),
+            (CORNER_INSET, CORNER_INSET),
+            (width - CORNER_INSET, CORNER_INSET),
+            (CORNER_INSET, height - CORNER_INSET),
+            (width - CORNER_INSET, height - CORNER_INSET),
+    )
+
+
+def _draw_scales(c, x, y):
+    """
+    Шкалы лицевой стороны с нулём в точке (x, y).
+    Подписи — поправка к компенсации: по X совпадает со смещением метки на просвет
+    (обратная сторона зеркальна), по Y — противоположна ему.
+    """
+    c.setLineWidth(MARK_LINE)
+    c.line(x - SCALE_RANGE * mm, y, x + SCALE_RANGE * mm, y)
+    c.line(x, y - SCALE_RANGE * mm, x, y + SCALE_RANGE * mm)
+    c.setFont(FONT_NAME, 4.5)
+    steps = int(SCALE_RANGE / SCALE_STEP)
+    for i in range(-steps, steps + 1):
+        value = i * SCALE_STEP
+        tick = 2.5 * mm if value % 2 == 0 else 1.5 * mm if value % 1 == 0 else 0.8 * mm
+        c.line(x + value * mm, y, x + value * mm, y + tick)  # Шкала X — деления вверх
+        c.line(x, y + value * mm, x + tick, y + value * mm)  # Шкала Y — деления вправо
+        if value % 2 == 0 and value:
+            # Подписи за концами шкал — так они не пересекаются с делениями другой шкалы
+            c.drawCentredString(x + value * mm, y - (SCALE_RANGE + 2.5) * mm, f"{value:+g}")
+            c.drawString(x + (SCALE_RANGE + 1.5) * mm, y + value * mm - 1.5, f"{-value:+g}")
+    c.circle(x, y, 0.6 * mm)
+
+
+def _draw_cross(c, x, y):
+    """Перекрестие обратной стороны"""
+    c.setLineWidth(MARK_LINE)
+    c.line(x - CROSS_ARM, y, x + CROSS_ARM, y)
+    c.line(x, y - CROSS_ARM, x, y + CROSS_ARM)
+
+
+def render_calibration(output_path, offset_x=0.0, offset_y=0.0, template=DEFAULT_TEMPLATE, profile=None):
+    """
+    Калибровочный лист: одна страница лицевой стороны и одна — обратной.
+    Контуры ячеек тонкие, чтобы было видно и совмещение резки.
+    :param offset_x: текущая компенсация по X (мм) — применяется к обратной стороне, как в заданиях
+    :param offset_y: текущая компенсация по Y (мм)
+    :param template: шаблон листа (LabelTemplate)
+    :param profile: имя профиля принтера для подписи
+    """
+    from reportlab.pdfgen import canvas
+
+    ensure_font()
+    layout = SheetLayout(offset_x, offset_y, MARK_LINE, template)
+    width, height = layout.pagesize
+    c = canvas.Canvas(output_path, pagesize=layout.pagesize)
+
+    # Лицевая сторона: шкалы и инструкция
+    c.setLineWidth(MARK_LINE)
+    for slot in layout.slots('front'):
+        c.lines(slot.segments)
+    for x, y in reference_points(layout):
+        _draw_scales(c, x, y)
+    c.setFont(FONT_NAME, 8)
+    lines = (
+            f"Калибровка двусторонней печати — {profile or 'без профиля'}, шаблон {template.name}, "
+            f"компенсация X={offset_x:+.2f} мм, Y={offset_y:+.2f} мм",
+            "Напечатайте с переплётом по длинному краю и посмотрите на просвет. Число на шкале, через которое",
+            "проходит перекрестие обратной стороны, прибавьте к компенсации (X — по горизонтальной шкале,",
+            "Y — по вертикальной). Ориентир — центр листа; разница по углам — перекос или масштаб печати.",
+    )
+    for number, line in enumerate(lines):
+        c.drawString(10 * mm, height - 8 * mm - number * 10, line)
+    c.showPage()
+
+    # Обратная сторона: перекрестия в зеркальных точках с текущей компенсацией
+    shift_x = offset_x * mm
+    shift_y = offset_y * mm
+    c.setLineWidth(MARK_LINE)
+    for slot in layout.slots('back'):
+        c.lines(slot.segments)
+    for x, y in reference_points(layout):
+        _draw_cross(c, width - x + shift_x, y + shift_y)
+    c.setFont(FONT_NAME, 8)
+    c.drawString(10 * mm + shift_x, height - 8 * mm + shift_y, "Обратная сторона")
+    c.showPage()
+    c.save()
+    logger.info(f"📏 Калибровочный лист сохранён: {output_path}")
@@ -0,0 +1,586 @@
+"""
+Генерация бирок из командной строки (без окна Tkinter).
+
+Пример:
+    python cli.py generate "journals/*.xlsx" -o out --line-width 5 --offset-x 0.5 --jobs 4
+    python cli.py calibrate -o calibration.pdf --printer hp-m404
+    python cli.py printers save hp-m404 --read-x 0.5 --read-y -1
+"""
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from calibration import (
+        PRINTERS_FILE, delete_profile, get_profile, load_profiles, render_calibration, save_profile,
+        set_default_profile,
+)
+from engine import ALL_SHEETS, MAX_QUANTITY, MissingColumnsError, ensure_font, generate_pdf, sanitize_filename
+from metrics import METRICS_FILE
+from output_cache import CACHE_DIR, CACHE_MAX_MB, OutputCache
+from server import (
+        JOB_OPTIONS, QUEUE_FILE, SERVER_HOST, SERVER_PORT, SERVER_URL, SERVER_WORKERS,
+        cancel_job, job_status, list_jobs, serve, submit_job, wait_job,
+)
+from manifest import MANIFEST_FORMATS
+from selection import find_index, load_index, locate_tracks, parse_ranges, reprint_path
+from templates import TEMPLATES, describe_template, get_template
+
+logger = logging.getLogger("cable_signs.cli")
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def setup_logging(verbose=False):
+    """Логи в консоль (stderr) — для серверов сборки и планировщика задач"""
+    logging.basicConfig(
+            level=logging.DEBUG if verbose else logging.INFO,
+            format=LOG_FORMAT,
+    )
+
+
+def expand_inputs(patterns):
+    """
+    Раскрывает пути и маски файлов (в Windows оболочка маски не раскрывает).
+    :param patterns: список путей или масок (*.xlsx, **/*.xlsx)
+    :return: список файлов без повторов в порядке появления
+    """
+    files = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                logger.warning(f"⚠️ По маске ничего не найдено: {pattern}")
+        else:
+            matches = [pattern]
+        for path in matches:
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def output_path_for(input_path, output_dir, reprint=False):
+    """
+    Имя PDF по имени входного файла: journal.xlsx → <output_dir>/journal.pdf.
+    :param reprint: допечатка (задан отбор) — journal_reprint.pdf, исходный PDF и его индекс не трогаются
+    """
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    path = os.path.join(output_dir, sanitize_filename(stem) + ".pdf")
+    return reprint_path(path) if reprint else path
+
+
+def output_batches(inputs, args, reprint=False):
+    """
+    Задания generate: пары (журналы, PDF) — один общий PDF при --merge или PDF на каждый журнал.
+    :param reprint: допечатка — к именам добавляется REPRINT_SUFFIX
+    """
+    if args.merge:
+        name = sanitize_filename(args.merge)
+        if not name.lower().endswith(".pdf"):
+            name += ".pdf"
+        path = os.path.join(args.output_dir, name)
+        return [(inputs, reprint_path(path) if reprint else path)]
+    return [([path], output) for path, output in zip(inputs, output_paths(inputs, args.output_dir, reprint))]
+
+
+def output_paths(inputs, output_dir, reprint=False):
+    """
+    Имена PDF журналов — всегда <имя журнала>.pdf, как и при запуске по одному:
+    по этому имени находятся индекс (допечатка по листам) и кэш листов (--incremental).
+    :return: список путей по порядку inputs
+    :raises ValueError: если у разных журналов совпадает имя вывода (j.xlsx и j.csv, a/j.xlsx и b/j.xlsx)
+    """
+    outputs = [output_path_for(path, output_dir, reprint) for path in inputs]
+    seen = {}
+    for path, output in zip(inputs, outputs):
+        key = os.path.normcase(output).lower()
+        if key in seen:
+            raise ValueError(
+                    f"Журналы {seen[key]} и {path} записали бы один файл {output}: "
+                    "запустите их с разными папками вывода (-o) или объедините (--merge)"
+            )
+        seen[key] = path
+    return outputs
+
+
+def parse_sheets(value):
+    """--sheets: 'all' — все листы, 'Корпус 1,Корпус 2' — выбранные, пусто — активный лист"""
+    if not value:
+        return None
+    if value.strip().lower() == "all":
+        return ALL_SHEETS
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def selection_options(args):
+    """Отбор для допечатки из аргументов generate (None — все бирки)"""
+    options = {
+            "tracks": args.track,
+            "systems": args.system,
+            "rows": args.rows,
+            "sheet_numbers": args.sheet_numbers,
+            "index": args.index,
+    }
+    options = {key: value for key, value in options.items() if value}
+    return options or None
+
+
+def resolve_offsets(args):
+    """
+    Компенсация принтера: явные --offset-x/--offset-y, иначе профиль --printer,
+    иначе профиль по умолчанию, иначе 0.
+    :return: (offset_x, offset_y, имя профиля или None)
+    :raises KeyError: если профиль --printer не найден
+    """
+    offset_x = offset_y = 0.0
+    name = None
+    if args.printer or args.offset_x is None or args.offset_y is None:
+        found = get_profile(args.printer, args.printers)
+        if found is not None:
+            name, profile = found
+            offset_x, offset_y = profile["offset_x"], profile["offset_y"]
+            logger.info(f"🖨 Профиль принтера «{name}»: X={offset_x:+.2f} мм, Y={offset_y:+.2f} мм")
+    return (
+            offset_x if args.offset_x is None else args.offset_x,
+            offset_y if args.offset_y is None else args.offset_y,
+            name,
+    )
+
+
+def _generate_one(input_path, output_path, options, profile_dir=None):
+    """Задание для одного файла (выполняется в отдельном процессе)"""
+    profile_path = None
+    if profile_dir:
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        profile_path = os.path.join(profile_dir, stem + ".prof")
+
+    start = time.perf_counter()
+    labels = generate_pdf(input_path, output_path, profile_path=profile_path, **options)
+    return labels, time.perf_counter() - start
+
+
+def run_generate(args):
+    """Команда generate: несколько журналов → PDF в папке вывода"""
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        logger.error("🚨 Ошибка: Не найдено ни одного входного файла.")
+        return 2
+
+    try:
+        # Шаблон разбирается один раз — в процессы передаётся готовый
+        template = get_template(args.template)
+        offset_x, offset_y, _ = resolve_offsets(args)
+        # Диапазоны отбора проверяются сразу, а не в каждом задании
+        for ranges in (args.rows, args.sheet_numbers):
+            if ranges:
+                parse_ranges(ranges)
+    except (OSError, ValueError) as e:
+        logger.error(f"🚨 Ошибка: {e}")
+        return 2
+    except KeyError as e:
+        logger.error(f"🚨 Ошибка: профиль принтера {e} не найден")
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {
+            "line_width": args.line_width,
+            "offset_x": offset_x,
+            "offset_y": offset_y,
+            "max_qty": args.max_qty,
+            "workers": args.render_workers,
+            "metrics_path": args.metrics or None,
+            "incremental": args.incremental,
+            "sheets": parse_sheets(args.sheets),
+            "volume_sheets": args.volume_sheets,
+            "volume_mb": args.volume_mb,
+            "font_report": args.font_report,
+            "output_format": args.format,
+            "dpi": args.dpi,
+            "template": template,
+            "cache_dir": args.cache,
+            "selection": selection_options(args),
+            "manifest": None if args.manifest == "none" else args.manifest,
+    }
+    if args.pack or args.fill:
+        if not args.merge:
+            logger.error("🚨 Ошибка: --pack и --fill работают только вместе с --merge.")
+            return 2
+        options.update(pack=True, fill_path=args.fill)
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+
+    # Допечатка пишется под своим именем — исходный PDF и индекс, по которому отобраны листы, остаются
+    try:
+        batches = output_batches(inputs, args, reprint=bool(options["selection"]))
+    except ValueError as e:
+        logger.error(f"🚨 Ошибка: {e}")
+        return 2
+    if args.server:
+        return run_submit(batches, args, options)
+    if args.merge:
+        return run_merged(batches[0], args, options)
+
+    failed = 0
+    jobs = min(args.jobs, len(inputs))
+    logger.info(f"🚀 Файлов: {len(inputs)}, параллельно: {jobs}")
+    # Шрифт проверяется сразу и разбирается один раз на процесс пула
+    ensure_font()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=ensure_font) as executor:
+        futures = {
+                executor.submit(_generate_one, paths[0], output_path, options, args.profile_dir): (paths[0], output_path)
+                for paths, output_path in batches
+        }
+        for future in as_completed(futures):
+            path, output_path = futures[future]
+            try:
+                labels, elapsed = future.result()
+                logger.info(f"📝 {path}: {labels} бирок за {elapsed:.2f} с → {output_path}")
+            except MissingColumnsError as e:
+                failed += 1
+                logger.error(f"🚨 {path}: не найдены необходимые столбцы {e.found}")
+            except Exception as e:
+                failed += 1
+                logger.error(f"🚨 {path}: {e}")
+
+    logger.info(f"✅ Готово: {len(inputs) - failed} из {len(inputs)}")
+    return 1 if failed else 0
+
+
+def run_submit(batches, args, options):
+    """generate --server: задания отправляются в очередь сервера печати вместо отрисовки здесь"""
+    # Сервер пишет свои замеры; шаблон передаётся именем или путём к файлу
+    options = {key: value for key, value in options.items() if key in JOB_OPTIONS}
+    if args.template:
+        options["template"] = os.path.abspath(args.template) if os.path.isfile(args.template) else args.template
+    else:
+        options.pop("template")
+
+    failed = 0
+    job_ids = []
+    try:
+        for paths, output_path in batches:
+            job_id = submit_job(paths, output_path, options, args.server)
+            job_ids.append((job_id, output_path))
+            logger.info(f"📥 Задание {job_id} в очереди: {', '.join(paths)} → {output_path}")
+        for job_id, output_path in job_ids if args.wait else ():
+            try:
+                job = wait_job(job_id, args.server)
+                logger.info(f"📝 Задание {job_id}: {job['labels']} бирок → {output_path}")
+            except Exception as e:
+                failed += 1
+                logger.error(f"🚨 Задание {job_id}: {e}")
+    except RuntimeError as e:
+        logger.error(f"🚨 {e}")
+        return 1
+    return 1 if failed else 0
+
+
+def run_cache(args):
+    """Команда cache: содержимое кэша готовых файлов и его очистка"""
+    cache = OutputCache(args.dir, args.max_mb)
+    if args.action == "purge":
+        removed, freed = cache.purge(args.older_than)
+        logger.info(f"🧹 Удалено записей: {removed}, освобождено {freed / 1024 / 1024:.1f} МБ")
+        return 0
+
+    entries = cache.entries()
+    for entry in entries:
+        used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["used"]))
+        files = ", ".join(os.path.splitext(entry["output"])[0] + suffix for suffix in entry["files"])
+        print(f"{entry['key'][:12]}  {used}  {entry['bytes'] / 1024 / 1024:7.2f} МБ  {entry['labels']:>6} бирок  {files}")
+    total = sum(entry["bytes"] for entry in entries)
+    print(f"Записей: {len(entries)}, {total / 1024 / 1024:.1f} из {args.max_mb:g} МБ ({args.dir})")
+    return 0
+
+
+def run_serve(args):
+    """Команда serve: локальный сервер печати с очередью заданий"""
+    try:
+        serve(args.host, args.port, args.workers, args.queue, LOG_FORMAT)
+    except ValueError as e:
+        logger.error(f"🚨 Ошибка: {e}")
+        return 2
+    return 0
+
+
+def run_status(args):
+    """Команда status: состояние заданий сервера печати (или отмена задания)"""
+    try:
+        if args.cancel:
+            if args.job is None:
+                logger.error("🚨 Ошибка: для --cancel укажите номер задания.")
+                return 2
+            result = cancel_job(args.job, args.server)
+            print(f"{result['id']}: {result['status']}")
+            return 0
+        jobs = [job_status(args.job, args.server)] if args.job is not None else list_jobs(args.server)
+    except RuntimeError as e:
+        logger.error(f"🚨 {e}")
+        return 1
+    for job in jobs:
+        progress = f"{job['done']}/{job['total']}" if job["total"] else "—"
+        line = f"{job['id']:>5}  {job['status']:<9}  {progress:>9}  {', '.join(job['inputs'])} → {job['output']}"
+        if job["error"]:
+            line += f"  ({job['error']})"
+        print(line)
+    return 0
+
+
+def run_merged(batch, args, options):
+    """generate --merge: все журналы и листы подряд в одном PDF"""
+    inputs, output_path = batch
+    logger.info(f"🚀 Файлов: {len(inputs)} → один PDF {output_path}")
+    try:
+        labels, elapsed = _generate_one(inputs, output_path, options, args.profile_dir)
+    except MissingColumnsError as e:
+        logger.error(f"🚨 Не найдены необходимые столбцы {e.found}")
+        return 1
+    except Exception as e:
+        logger.error(f"🚨 {e}")
+        return 1
+    logger.info(f"✅ Готово: {labels} бирок за {elapsed:.2f} с → {output_path}")
+    return 0
+
+
+def run_templates(args):
+    """Команда templates: встроенные шаблоны листов и подобранные для них сетки"""
+    for template in TEMPLATES.values():
+        print(describe_template(template))
+    for path in args.files:
+        try:
+            print(describe_template(get_template(path)))
+        except (OSError, ValueError) as e:
+            logger.error(f"🚨 {path}: {e}")
+            return 1
+    return 0
+
+
+def run_calibrate(args):
+    """Команда calibrate: калибровочный лист двусторонней печати с текущей компенсацией"""
+    try:
+        template = get_template(args.template)
+        offset_x, offset_y, printer = resolve_offsets(args)
+    except (OSError, ValueError) as e:
+        logger.error(f"🚨 Ошибка: {e}")
+        return 2
+    except KeyError as e:
+        logger.error(f"🚨 Ошибка: профиль принтера {e} не найден")
+        return 2
+    render_calibration(args.output, offset_x, offset_y, template, printer)
+    print(
+            "Прибавьте к компенсации показания шкал и сохраните профиль:\n"
+            f"    python cli.py printers save {printer or 'ИМЯ'} --offset-x {offset_x:g} --offset-y {offset_y:g} --read-x ... --read-y ..."
+    )
+    return 0
+
+
+def run_printers(args):
+    """Команда printers: профили компенсации принтеров"""
+    try:
+        if args.action == "save":
+            if not args.name:
+                logger.error("🚨 Ошибка: укажите имя профиля.")
+                return 2
+            # Не заданная компенсация берётся из сохранённого профиля (уточнение после повторной калибровки)
+            profile = load_profiles(args.printers)["printers"].get(args.name, {})
+            offset_x = args.offset_x if args.offset_x is not None else profile.get("offset_x", 0.0)
+            offset_y = args.offset_y if args.offset_y is not None else profile.get("offset_y", 0.0)
+            save_profile(
+                    args.name, offset_x + args.read_x, offset_y + args.read_y, args.printers, not args.keep_default
+            )
+            return 0
+        if args.action == "default":
+            set_default_profile(args.name, args.printers)
+            return 0
+        if args.action == "delete":
+            delete_profile(args.name, args.printers)
+            return 0
+    except KeyError:
+        logger.error(f"🚨 Ошибка: профиль принтера «{args.name}» не найден")
+        return 1
+
+    profiles = load_profiles(args.printers)
+    for name, profile in profiles["printers"].items():
+        mark = "*" if name == profiles["default"] else " "
+        print(
+                f"{mark} {name:<20}  X={profile['offset_x']:+.2f} мм  Y={profile['offset_y']:+.2f} мм  "
+                f"{profile.get('saved', '')}"
+        )
+    print(f"Профилей: {len(profiles['printers'])} ({args.printers}), * — по умолчанию")
+    return 0
+
+
+def _add_offset_arguments(parser):
+    """Компенсация принтера: явные значения или сохранённый профиль"""
+    parser.add_argument("--offset-x", type=float, help="компенсация принтера по X, мм (по умолчанию — из профиля)")
+    parser.add_argument("--offset-y", type=float, help="компенсация принтера по Y, мм (по умолчанию — из профиля)")
+    parser.add_argument("--printer", metavar="NAME", help="профиль принтера (по умолчанию — профиль по умолчанию)")
+    parser.add_argument(
+            "--printers", default=PRINTERS_FILE, help=f"файл профилей принтеров (по умолчанию {PRINTERS_FILE})"
+    )
+
+
+def run_locate(args):
+    """Команда locate: листы, ячейки, файлы и страницы трасс в готовом выводе по его индексу"""
+    path = find_index(args.output)
+    try:
+        index = load_index(path)
+    except ValueError as e:
+        logger.error(f"🚨 Ошибка: {e}")
+        return 2
+    found = locate_tracks(index, args.tracks)
+    for track, positions in found.items():
+        places = ", ".join(
+                f"лист {sheet} ячейка {slot} ({index['files'][file]}, стр. {page})"
+                for sheet, slot, file, page in positions
+        )
+        print(f"{track}: {places}")
+    if not found:
+        logger.warning(f"⚠️ В {', '.join(index['files'])} таких трасс нет")
+        return 1
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cable_signs", description="Генератор бирок под маркировку трасс кабеля")
+    parser.add_argument("-v", "--verbose", action="store_true", help="подробный лог")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="создать PDF из журналов (Excel, CSV, Parquet)")
+    generate.add_argument("inputs", nargs="+", help="файлы .xlsx/.csv/.parquet или маски (journals/*.xlsx)")
+    generate.add_argument("-o", "--output-dir", required=True, help="папка для PDF")
+    generate.add_argument("--line-width", type=float, default=5.0, help="толщина контура (по умолчанию 5.0)")
+    _add_offset_arguments(generate)
+    generate.add_argument("--max-qty", type=int, default=MAX_QUANTITY, help="макс. бирок на строку")
+    generate.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="файлов параллельно")
+    generate.add_argument("--render-workers", type=int, default=1, help="процессов рендеринга на один файл")
+    generate.add_argument(
+            "--metrics", default=METRICS_FILE,
+            help=f"файл итогов заданий JSON Lines (по умолчанию {METRICS_FILE}; пусто — не писать)",
+    )
+    generate.add_argument(
+            "--incremental", action="store_true", help="перерисовать только изменённые листы (кэш <имя>.pdf.sheets)"
+    )
+    generate.add_argument(
+            "--sheets", help="листы книг Excel: all — все, или имена через запятую (по умолчанию — активный)"
+    )
+    generate.add_argument("--merge", metavar="NAME", help="объединить все журналы в один PDF с этим именем")
+    generate.add_argument(
+            "--pack", action="store_true", help="с --merge: неполные листы журналов упаковать на общие листы"
+    )
+    generate.add_argument("--fill", metavar="FILE", help="с --merge: очередь допечатки для пустых ячеек")
+    generate.add_argument("--volume-sheets", type=int, help="делить PDF на тома по N листов (имя_001.pdf, ...)")
+    generate.add_argument("--volume-mb", type=float, help="делить PDF на тома примерно по M МБ")
+    generate.add_argument(
+            "--font-report", action="store_true", help="размер встроенного шрифта и PDF без подмножеств"
+    )
+    generate.add_argument(
+            "--format", choices=("pdf", "tiff", "png"), default="pdf",
+            help="вывод: pdf, многостраничный tiff или png на каждую сторону листа (для термопринтеров)"
+    )
+    generate.add_argument("--dpi", type=int, help="разрешение tiff/png (по умолчанию 300)")
+    generate.add_argument(
+            "--template", help=f"шаблон листа: {', '.join(TEMPLATES)} или файл .json (по умолчанию a4)"
+    )
+    generate.add_argument(
+            "--cache", nargs="?", const=CACHE_DIR, metavar="DIR",
+            help=f"брать готовые файлы из кэша и сохранять в него (по умолчанию папка {CACHE_DIR})"
+    )
+    # Допечатка (любой отбор) пишется в <имя>_reprint.pdf рядом с исходным PDF
+    generate.add_argument(
+            "--track", action="append", metavar="PATTERN",
+            help="допечатка: только трассы по шаблону (*, ?; можно несколько раз)"
+    )
+    generate.add_argument(
+            "--system", action="append", metavar="PATTERN", help="допечатка: только подсистемы по шаблону"
+    )
+    generate.add_argument("--rows", metavar="RANGES", help="допечатка: только строки журнала (5-10,20)")
+    generate.add_argument(
+            "--sheet-numbers", metavar="RANGES", help="допечатка: бирки с листов прошлого задания (3,7-9)"
+    )
+    generate.add_argument(
+            "--index", metavar="FILE",
+            help="индекс прошлого задания для --sheet-numbers (по умолчанию — индекс исходного PDF журнала)"
+    )
+    generate.add_argument(
+            "--manifest", choices=(*MANIFEST_FORMATS, "none"), default="csv",
+            help="перечень бирок рядом с выводом: <имя>.manifest.csv, .jsonl или none (по умолчанию csv)"
+    )
+    generate.add_argument("--profile-dir", help="сохранить профиль cProfile каждого файла в папку")
+    generate.add_argument(
+            "--server", nargs="?", const=SERVER_URL, metavar="URL",
+            help=f"отправить задания в очередь сервера печати (по умолчанию {SERVER_URL})"
+    )
+    generate.add_argument("--wait", action="store_true", help="с --server: дождаться выполнения заданий")
+    generate.set_defaults(handler=run_generate)
+
+    templates = commands.add_parser("templates", help="показать шаблоны листов и сетку бирок")
+    templates.add_argument("files", nargs="*", help="файлы шаблонов .json для проверки")
+    templates.set_defaults(handler=run_templates)
+
+    cache = commands.add_parser("cache", help="кэш готовых файлов: список записей или очистка")
+    cache.add_argument("action", choices=("list", "purge"), nargs="?", default="list", help="list или purge")
+    cache.add_argument("--dir", default=CACHE_DIR, help=f"папка кэша (по умолчанию {CACHE_DIR})")
+    cache.add_argument("--max-mb", type=float, default=CACHE_MAX_MB, help="предельный размер кэша, МБ")
+    cache.add_argument(
+            "--older-than", type=float, metavar="DAYS", help="purge: только записи, не использованные N дней"
+    )
+    cache.set_defaults(handler=run_cache)
+
+    server = commands.add_parser("serve", help="запустить локальный сервер печати с очередью заданий")
+    server.add_argument("--host", default=SERVER_HOST, help=f"локальный адрес: 127.0.0.1 или localhost (по умолчанию {SERVER_HOST})")
+    server.add_argument("--port", type=int, default=SERVER_PORT, help=f"порт (по умолчанию {SERVER_PORT})")
+    server.add_argument(
+            "--workers", type=int, default=SERVER_WORKERS, help=f"заданий одновременно (по умолчанию {SERVER_WORKERS})"
+    )
+    server.add_argument("--queue", default=QUEUE_FILE, help=f"файл очереди SQLite (по умолчанию {QUEUE_FILE})")
+    server.set_defaults(handler=run_serve)
+
+    status = commands.add_parser("status", help="состояние заданий сервера печати")
+    status.add_argument("job", type=int, nargs="?", help="номер задания (без номера — последние задания)")
+    status.add_argument("--cancel", action="store_true", help="отменить задание")
+    status.add_argument("--server", default=SERVER_URL, metavar="URL", help=f"адрес сервера (по умолчанию {SERVER_URL})")
+    status.set_defaults(handler=run_status)
+
+    locate = commands.add_parser("locate", help="найти бирки трасс в готовом выводе (по индексу <имя>.index.json)")
+    locate.add_argument("output", help="готовый PDF (том, растр) или его индекс")
+    locate.add_argument("tracks", nargs="+", help="трассы или шаблоны (*, ?)")
+    locate.set_defaults(handler=run_locate)
+
+    calibrate = commands.add_parser("calibrate", help="калибровочный лист двусторонней печати")
+    calibrate.add_argument("-o", "--output", default="calibration.pdf", help="файл PDF (по умолчанию calibration.pdf)")
+    calibrate.add_argument(
+            "--template", help=f"шаблон листа: {', '.join(TEMPLATES)} или файл .json (по умолчанию a4)"
+    )
+    _add_offset_arguments(calibrate)
+    calibrate.set_defaults(handler=run_calibrate)
+
+    printers = commands.add_parser("printers", help="профили компенсации принтеров")
+    printers.add_argument(
+            "action", choices=("list", "save", "default", "delete"), nargs="?", default="list",
+            help="list, save, default (сделать профилем по умолчанию) или delete"
+    )
+    printers.add_argument("name", nargs="?", help="имя профиля (принтера)")
+    printers.add_argument("--offset-x", type=float, help="save: компенсация по X, мм (по умолчанию — из профиля)")
+    printers.add_argument("--offset-y", type=float, help="save: компенсация по Y, мм (по умолчанию — из профиля)")
+    printers.add_argument("--read-x", type=float, default=0.0, help="save: показание шкалы X калибровочного листа")
+    printers.add_argument("--read-y", type=float, default=0.0, help="save: показание шкалы Y калибровочного листа")
+    printers.add_argument("--keep-default", action="store_true", help="save: не делать профилем по умолчанию")
+    printers.add_argument("--printers", default=PRINTERS_FILE, help=f"файл профилей (по умолчанию {PRINTERS_FILE})")
+    printers.set_defaults(handler=run_printers)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.verbose)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,1531 @@
+"""
+Движок генерации бирок: чтение журнала, раскладка листа и отрисовка PDF.
+Не зависит от Tkinter — используется и окном приложения, и командной строкой.
+"""
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import math
+import logging
+import tempfile
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+# Лёгкие модули; openpyxl, reportlab.pdfgen и разбор TTF загружаются
+# при первой генерации, чтобы окно приложения открывалось быстрее
+from reportlab.lib.units import mm
+
+from metrics import METRICS_FILE, JobMetrics, emit, profiled
+from templates import DEFAULT_FONTS, DEFAULT_TEMPLATE, describe_template, get_template
+from readers import (  # noqa: F401 — реэкспорт для окна приложения и бенчмарка
+        ALL_SHEETS,
+        COLUMN_ALIASES,
+        MissingColumnsError,
+        cell_text,
+        find_column,
+        read_excel_rows,
+        read_rows,
+        read_sources,
+        resolve_columns,
+)
+
+logger = logging.getLogger(__name__)
+
+# === ГЛОБАЛЬНЫЕ ПАРАМЕТРЫ ===
+# Геометрия и шрифты по умолчанию — из шаблона A4 5×5 (templates.py)
+TRIANGLE_BASE = DEFAULT_TEMPLATE.triangle_base  # Ширина основания треугольника
+TRIANGLE_HEIGHT = DEFAULT_TEMPLATE.triangle_height  # Высота треугольника
+PAGE_WIDTH, PAGE_HEIGHT = DEFAULT_TEMPLATE.page_width, DEFAULT_TEMPLATE.page_height  # Размер листа A4
+
+MAX_COLS = DEFAULT_TEMPLATE.cols  # Количество треугольников в ряду
+MAX_ROWS = DEFAULT_TEMPLATE.rows  # Количество рядов
+X_START = DEFAULT_TEMPLATE.x_start  # X центра первого треугольника в ряду
+Y_START = DEFAULT_TEMPLATE.y_start  # Y основания первого ряда
+
+FONT_SYSTEM = DEFAULT_FONTS.system  # Размер шрифта для system
+FONT_TRACK = DEFAULT_FONTS.track  # Размер шрифта для track
+FONT_CABLE = DEFAULT_FONTS.cable  # Размер шрифта для cable (чуть больше)
+FONT_LENGTH = DEFAULT_FONTS.length  # Размер шрифта для length
+
+MIN_FONT_SIZE = DEFAULT_FONTS.min_size  # Минимальный размер шрифта при уменьшении
+FONT_NAME = "Times-Bold"  # Шрифт бирок
+FIT_CACHE_SIZE = 4096  # Размер LRU-кэша ширин строк и раскладок текста
+RENDER_WORKERS = 1  # Процессов рендеринга по умолчанию (1 — последовательно)
+PARALLEL_CHUNK_SHEETS = 20  # Листов в одной части при параллельном рендеринге
+USE_OUTLINE_FORMS = True  # Контуры треугольников через PDF Form XObject
+MAX_QUANTITY = 1000  # Максимальное количество бирок на одну строку ('Кол-во')
+PARTIAL_SUFFIX = ".partial"  # Вывод пишется под временным именем: <имя>.partial.pdf
+SHEET_CACHE_SUFFIX = ".sheets"  # Папка кэша листов рядом с PDF: <имя>.pdf.sheets
+SHEET_CACHE_VERSION = 2  # Меняется при изменении отрисовки — старый кэш не используется
+# Каждая дорисовка вносит в PDF своё подмножество шрифта: при большем числе дорисовок
+# в выводе или доле изменённых листов не меньше SHEET_CACHE_FULL_SHARE всё рисуется заново
+SHEET_CACHE_MAX_REVISIONS = 2
+SHEET_CACHE_FULL_SHARE = 0.5
+VOLUME_PROBE_SHEETS = 10  # Листов в первом томе при ограничении по размеру (оценка байт на лист)
+PRINTER_OFFSET_X = 0.0 * mm  # Компенсация смещения принтера на обратной стороне по оси X
+PRINTER_OFFSET_Y = 0.0 * mm  # Компенсация смещения принтера на обратной стороне по оси Y
+# Запрещённые символы в именах файлов Windows
+INVALID_FILENAME_CHARS = r'<>:"/\\|?*'
+
+# Файл шрифта ищется рядом с программой (или во временной папке собранного exe),
+# а не в текущей папке — движок запускается и из других каталогов
+BASE_DIR = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+FONT_FILE = os.path.join(BASE_DIR, 'timesbd.ttf')
+
+_font_registered = False
+_font_loaded = False  # TTF с кириллицей действительно загружен
+
+
+# === РЕГИСТРАЦИЯ ШРИФТА ===
+def ensure_font():
+    """
+    Регистрирует Times New Roman Bold один раз на процесс: разобранные метрики TTF
+    остаются в pdfmetrics и используются всеми заданиями процесса.
+    Если файл не загрузился — используется fallback (стандартный Times-Bold без кириллицы).
+    :return: True, если загружен TTF
+    """
+    global _font_registered, _font_loaded
+    if _font_registered:
+        return _font_loaded
+    _font_registered = True
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    # Попробуем загрузить Times New Roman Bold для красивого шрифта
+    try:
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_FILE))
+        _font_loaded = True
+    except Exception as e:
+        logger.error(
+                f"🚨 Шрифт {FONT_FILE} не загружен ({e}): используется встроенный Times-Bold, "
+                f"кириллица не будет напечатана"
+        )
+    return _font_loaded
+
+
+@lru_cache(maxsize=None)
+def font_file_hash():
+    """Хэш файла шрифта (один раз на процесс) — для ключа кэша готовых файлов"""
+    try:
+        with open(FONT_FILE, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def font_available():
+    """Быстрая проверка при запуске (без разбора TTF): файл шрифта на месте"""
+    return os.path.isfile(FONT_FILE)
+
+
+def font_size_report(pdf_path):
+    """
+    Сколько в PDF занимают встроенные подмножества шрифта и сколько занял бы
+    полный TTF (одна копия). Оба размера — после сжатия zlib, как потоки PDF.
+    :return: словарь с размерами в байтах
+    """
+    import zlib
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    embedded = {}
+    for page in reader.pages:
+        fonts = page.get("/Resources", {}).get("/Font", {})
+        for font in fonts.values():
+            descriptor = font.get_object().get("/FontDescriptor")
+            if descriptor is None:
+                continue
+            stream_ref = descriptor.get_object().get("/FontFile2")
+            if stream_ref is not None and stream_ref.idnum not in embedded:
+                # Сжатый размер потока — так же, как для полного TTF ниже
+                embedded[stream_ref.idnum] = len(zlib.compress(stream_ref.get_object().get_data()))
+
+    pdf_bytes = os.path.getsize(pdf_path)
+    subset_bytes = sum(embedded.values())
+    full_bytes = 0
+    if embedded and os.path.isfile(FONT_FILE):
+        with open(FONT_FILE, "rb") as f:
+            full_bytes = len(zlib.compress(f.read()))
+    return {
+            "pdf_bytes": pdf_bytes,
+            "font_subsets": len(embedded),
+            "font_subset_bytes": subset_bytes,
+            "font_full_bytes": full_bytes,
+            "pdf_bytes_without_subsetting": pdf_bytes - subset_bytes + full_bytes,
+    }
+
+
+def sanitize_filename(name):
+    """Заменяет запрещённые символы на _"""
+    for char in INVALID_FILENAME_CHARS:
+        name = name.replace(char, '_')
+    return name.strip()
+
+
+# === ФУНКЦИЯ: РАЗДЕЛЕНИЕ ТЕКСТА CABLE НА 2 СТРОКИ ===
+def split_cable_text(text):
+    """
+    Разделяет текст из колонки 'cable' на 2 строки:
+    - Первая строка: первое слово
+    - Вторая строка: всё остальное
+    Если одно слово — делит пополам.
+    Пример: "ParLan 4x2x0,57" → ["ParLan", "4x2x0,57"]
+    """
+    if not text or not text.strip():
+        return ["", ""]
+    words = text.strip().split()
+    if len(words) == 0:
+        return ["", ""]
+    elif len(words) == 1:
+        w = words[0]
+        mid = len(w) // 2
+        return [w[:mid], w[mid:]]
+    else:
+        return [words[0], " ".join(words[1:])]
+
+
+# === КЭШ ПОДБОРА ШРИФТА ===
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def text_width(text, font_name, font_size):
+    """
+    Ширина строки в пунктах (кэшируется по тексту, шрифту и размеру).
+    Если TTF не загружен — оценка с коэффициентами для широких букв кириллицы.
+    """
+    from reportlab.pdfbase import pdfmetrics
+
+    # У встроенного Times-Bold нет кириллицы — его ширины для неё неверны
+    if ensure_font():
+        return pdfmetrics.stringWidth(text, font_name, font_size)
+    else:
+        # Коэффициент 0.58 и поправки для широких букв — лучше для кириллицы
+        estimated_width_per_char = {
+                'Ш': 1.2, 'Щ': 1.2, 'Ж': 1.15, 'Д': 1.1, 'П': 1.05,
+                'А': 0.9, 'В': 0.95, 'Е': 0.9, 'К': 0.95, 'Х': 0.9
+        }
+        total_width = 0
+        for char in text.upper():
+            total_width += estimated_width_per_char.get(char, 1.0)
+        return total_width * font_size * 0.58
+
+
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def fit_main_text(text, side, fonts=DEFAULT_FONTS):
+    """
+    Раскладка основного текста (system на лицевой, cable на обратной стороне).
+    :param fonts: лестница шрифтов шаблона (FontLadder)
+    :return: кортеж строк (line, font_size, dx, dy), где dx — смещение от центра
+             основания, dy — смещение от базовой линии основного текста
+    """
+    if side == 'back':  # Это обратная сторона — cable
+        return fit_cable_lines(*split_cable_text(text), fonts)
+
+    # Лицевая сторона — system
+    fs = fonts.system_long if len(text) >= 8 else fonts.system
+    if fs < fonts.min_size:
+        fs = fonts.min_size
+    return ((text, fs, -text_width(text, FONT_NAME, fs) / 2, 0),)
+
+
+def _ladder_size(steps, length, size):
+    """Размер шрифта по ступеням лестницы: последняя ступень, до длины которой дотянулась строка"""
+    for min_length, step_size in steps:
+        if length >= min_length:
+            size = step_size
+    return size
+
+
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def fit_cable_lines(line1, line2, fonts=DEFAULT_FONTS):
+    """
+    Раскладка cable, уже разбитого на 2 строки (split_cable_text).
+    :return: кортеж строк (line, font_size, dx, dy) — как у fit_main_text
+    """
+    # Шрифт для первой строки — всегда cable (16)
+    fs_line1 = fonts.cable
+
+    # Шрифт для второй строки — уменьшаем, если длинная (от 10 символов — 14, от 15 — 12)
+    fs_line2 = _ladder_size(fonts.cable_steps, len(line2), fonts.cable)
+
+    # Первая строка выше, вторая ниже
+    return (
+            (line1, fs_line1, -text_width(line1, FONT_NAME, fs_line1) / 2, fs_line2 * 0.5),
+            (line2, fs_line2, -text_width(line2, FONT_NAME, fs_line2) / 2, -fs_line1 * 0.5),
+    )
+
+
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def fit_sub_text(text, side, sub_font_size, fonts=DEFAULT_FONTS):
+    """
+    Раскладка подзаголовка (track на лицевой, length на обратной стороне).
+    :return: кортеж строк (line, font_size, dx, dy), dy — смещение от базовой линии подзаголовка
+    """
+    if side == 'front':
+        # 18 символов — 13.5, 19 — 13, от 20 — 11.5
+        track_font_size = _ladder_size(fonts.track_steps, len(text), sub_font_size)
+    else:
+        track_font_size = sub_font_size  # 14
+
+    # Разбивка на 2 строки по длине
+    max_len = fonts.sub_wrap if track_font_size > fonts.small_size else fonts.sub_wrap_small
+    line1 = text[:max_len].strip()
+    line2 = text[max_len:max_len * 2].strip()
+
+    line_height = track_font_size * 1.5
+    return tuple(
+            (line, track_font_size, -text_width(line, FONT_NAME, track_font_size) / 2, -j * line_height)
+            for j, line in enumerate(item for item in (line1, line2) if item)
+    )
+
+
+def font_cache_stats():
+    """Статистика кэшей подбора шрифта: попадания, промахи, размер"""
+    stats = {}
+    for name, func in (
+            ("text_width", text_width), ("fit_main_text", fit_main_text),
+            ("fit_cable_lines", fit_cable_lines), ("fit_sub_text", fit_sub_text),
+    ):
+        info = func.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
+
+
+def count_font_cache(metrics, before):
+    """Добавляет в счётчики задания попадания и промахи кэшей шрифта с момента before"""
+    for name, stats in font_cache_stats().items():
+        metrics.count(f"font_cache_{name}_hits", stats["hits"] - before[name]["hits"])
+        metrics.count(f"font_cache_{name}_misses", stats["misses"] - before[name]["misses"])
+
+
+class LabelRecord:
+    """
+    Одна строка журнала: данные бирки и количество её копий.
+    Хранится один раз на строку, а не на каждую напечатанную бирку.
+    Тексты обратной стороны (L=... м и разбивка cable) готовятся заранее.
+    """
+    __slots__ = ("system", "track", "cable", "length", "qty", "row", "length_text", "cable_lines", "source")
+
+    def __init__(
+            self, system, track, cable, length, qty, row=None, length_text=None, cable_lines=None, source=None
+    ):
+        self.system = system
+        self.track = track
+        self.cable = cable
+        self.length = length
+        self.qty = qty
+        self.row = row  # Номер строки в исходном файле
+        self.source = source  # Файл (и лист), из которого взята строка
+        # Подзаголовок и строки cable для обратной стороны
+        self.length_text = format_length(length) if length_text is None else length_text
+        self.cable_lines = tuple(split_cable_text(cable)) if cable_lines is None else cable_lines
+
+    def __repr__(self):
+        return f"LabelRecord({self.track!r}, qty={self.qty}, row={self.row})"
+
+
+class LabelSequence:
+    """
+    Виртуальная последовательность бирок поверх LabelRecord.
+    Элемент i — пара (record, copy), где copy — номер копии записи.
+    Память пропорциональна числу уникальных строк, а не числу бирок.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._ends = []  # Накопленное количество бирок после каждой записи
+
+    def append(self, record):
+        """Добавляет запись; записи с нулевым количеством пропускаются"""
+        if record.qty <= 0:
+            return
+        self.records.append(record)
+        self._ends.append(len(self) + record.qty)
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("label index out of range")
+        pos = bisect_right(self._ends, index)
+        start = self._ends[pos - 1] if pos else 0
+        return self.records[pos], index - start
+
+    def extend(self, other):
+        """Дописывает записи другой последовательности (бирки идут подряд, без пустых ячеек)"""
+        for record in other.records:
+            self.append(record)
+
+    def __iter__(self):
+        for record in self.records:
+            for copy in range(record.qty):
+                yield record, copy
+
+    def slice(self, start, stop):
+        """
+        Возвращает новую последовательность с бирками [start, stop).
+        Записи на границах копируются с уменьшенным количеством.
+        """
+        part = LabelSequence()
+        stop = min(stop, len(self))
+        pos = bisect_right(self._ends, start)
+        while start < stop:
+            record = self.records[pos]
+            end = self._ends[pos]
+            count = min(end, stop) - start
+            if count != record.qty:
+                record = LabelRecord(
+                        record.system, record.track, record.cable, record.length, count, record.row,
+                        record.length_text, record.cable_lines, record.source
+                )
+            part.append(record)
+            start = end
+            pos += 1
+        return part
+
+
+# === НОРМАЛИЗАЦИЯ СТОЛБЦОВ ===
+# Замечание к строке журнала: номер строки, столбец, исходное значение, описание
+RowIssue = namedtuple("RowIssue", "row field value message source", defaults=(None,))
+MAX_LOGGED_ISSUES = 20  # Сколько замечаний выводить в лог (остальные — только счётчиком)
+NORMALIZE_CHUNK_ROWS = 10000  # Строк журнала в одной части нормализации
+
+
+def format_length(text):
+    """Подзаголовок обратной стороны: числовая длина → 'L=... м', иначе текст как есть"""
+    return f"L={text} м" if text.replace('.', '').isdigit() else text
+
+
+def _text_column(values):
+    """Столбец в строки: пустые ячейки → '', пробелы по краям убираются"""
+    return [value.strip() if value.__class__ is str else cell_text(value) for value in values]
+
+
+def _map_unique(func, values, mapping):
+    """
+    Применяет func к каждому уникальному значению столбца один раз.
+    :param mapping: словарь уже посчитанных значений — общий для всех частей журнала
+    """
+    for value in set(values).difference(mapping):
+        mapping[value] = func(value)
+    return [mapping[value] for value in values]
+
+
+def _parse_qty(value):
+    """'Кол-во' в целое; None — если значение не число"""
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    try:
+        number = float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    # inf, nan и 1e400 — не количество
+    return int(number) if math.isfinite(number) else None
+
+
+def normalize_rows(rows, max_qty=MAX_QUANTITY, source=None):
+    """
+    Приводит строки журнала к готовым для отрисовки записям — по столбцам частями
+    по NORMALIZE_CHUNK_ROWS строк (журнал не загружается в память целиком): тексты,
+    количество, подзаголовки длины и разбивка cable (для повторяющихся значений
+    считаются один раз на весь журнал). Попутно собираются замечания к строкам.
+    :param rows: итератор строк из read_rows (исходные значения ячеек)
+    :param max_qty: максимальное количество копий на одну строку
+    :param source: имя источника ('файл' или 'файл:лист') для записей и замечаний
+    :return: (LabelSequence, список RowIssue)
+    """
+    labels = LabelSequence()
+    issues = []
+    length_cache = {}
+    cable_cache = {}
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, NORMALIZE_CHUNK_ROWS))
+        if not chunk:
+            break
+        _normalize_chunk(chunk, max_qty, source, labels, issues, length_cache, cable_cache)
+    if source is not None:
+        issues = [issue._replace(source=source) for issue in issues]
+    return labels, issues
+
+
+def _normalize_chunk(chunk, max_qty, source, labels, issues, length_cache, cable_cache):
+    """Одна часть журнала: записи дописываются в labels, замечания — в issues"""
+    numbers, systems, tracks, cables, lengths, quantities = zip(*chunk)
+    systems = _text_column(systems)
+    tracks = _text_column(tracks)
+    cables = _text_column(cables)
+    lengths = _text_column(lengths)
+    length_texts = _map_unique(format_length, lengths, length_cache)
+    cable_lines = _map_unique(lambda cable: tuple(split_cable_text(cable)), cables, cable_cache)
+
+    for number, system, track, cable, length, raw_qty, length_text, lines in zip(
+            numbers, systems, tracks, cables, lengths, quantities, length_texts, cable_lines
+    ):
+        if raw_qty.__class__ is int:
+            qty = raw_qty
+        elif raw_qty is None or raw_qty == "":
+            qty = 1
+        else:
+            qty = _parse_qty(raw_qty)
+            if qty is None:
+                issues.append(RowIssue(number, "quantity", raw_qty, "количество не число, напечатана 1 бирка"))
+                qty = 1
+
+        if qty > max_qty:
+            issues.append(RowIssue(
+                    number, "quantity", raw_qty, f"количество больше допустимого ({max_qty}), будет напечатано {max_qty}"
+            ))
+            qty = max_qty
+        elif qty < 0:
+            issues.append(RowIssue(number, "quantity", raw_qty, "отрицательное количество, строка пропущена"))
+
+        if system or track or cable or length:
+            if not track:
+                issues.append(RowIssue(number, "track", "", "не указана трасса"))
+            if not cable:
+                issues.append(RowIssue(number, "cable", "", "не указан кабель"))
+
+        labels.append(LabelRecord(system, track, cable, length, qty, number, length_text, lines, source))
+
+
+def log_issues(issues, limit=MAX_LOGGED_ISSUES):
+    """Выводит замечания к строкам в лог (не больше limit)"""
+    for issue in issues[:limit]:
+        where = f"{issue.source}, строка {issue.row}" if issue.source else f"Строка {issue.row}"
+        logger.warning(f"⚠️ {where}: {issue.message} ({issue.field}={issue.value!r})")
+    if len(issues) > limit:
+        logger.warning(f"⚠️ ... и ещё {len(issues) - limit} замечаний")
+
+
+def build_label_sequence(rows, max_qty=MAX_QUANTITY):
+    """
+    Собирает последовательность бирок из потока строк (замечания — в лог).
+    Журнал читается потоком, но записи собираются целиком до отрисовки первого листа:
+    число листов, упаковка, отбор, хэши листов и индекс требуют всей последовательности.
+    Память — одна LabelRecord на строку журнала (а не на бирку); CSV к тому же читается
+    целиком (read_csv_rows).
+    :param rows: итератор строк из read_rows
+    :param max_qty: максимальное количество копий на одну строку
+    :return: LabelSequence
+    """
+    labels, issues = normalize_rows(rows, max_qty)
+    log_issues(issues)
+    return labels
+
+
+def _load_source(input_path, sheets, max_qty, selection=None):
+    """
+    Читает и нормализует один журнал (все выбранные листы подряд).
+    На уровне модуля — чтобы выполняться в пуле процессов.
+    :param selection: selection.Selection — строки отбираются по мере чтения
+    :return: (LabelSequence, список RowIssue)
+    """
+    labels = LabelSequence()
+    issues = []
+    for source, rows in read_sources(input_path, sheets):
+        try:
+            selected = selection.filter_rows(source, rows) if selection is not None else rows
+            part, part_issues = normalize_rows(selected, max_qty, source)
+        finally:
+            rows.close()
+        labels.extend(part)
+        issues.extend(part_issues)
+    return labels, issues
+
+
+def load_jobs(input_paths, max_qty=MAX_QUANTITY, sheets=None, workers=1, selection=None):
+    """
+    Читает журналы по отдельности (каждый — своё задание).
+    :param input_paths: путь к журналу или список путей (порядок сохраняется)
+    :param max_qty: максимальное количество копий на одну строку
+    :param sheets: None — активный лист, ALL_SHEETS — все листы, список — выбранные листы
+    :param workers: сколько журналов читать одновременно (процессы)
+    :param selection: selection.Selection — читать только отобранные строки (None — все)
+    :return: список пар (LabelSequence, список RowIssue) по порядку путей
+    """
+    if isinstance(input_paths, (str, os.PathLike)):
+        input_paths = [input_paths]
+
+    if workers > 1 and len(input_paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(input_paths))) as executor:
+            futures = [executor.submit(_load_source, path, sheets, max_qty, selection) for path in input_paths]
+            return [future.result() for future in futures]
+    return [_load_source(path, sheets, max_qty, selection) for path in input_paths]
+
+
+def load_labels(input_paths, max_qty=MAX_QUANTITY, sheets=None, workers=1, selection=None):
+    """
+    Собирает бирки из нескольких журналов и листов в одну непрерывную последовательность:
+    следующий лист или файл продолжает заполнять тот же лист бумаги.
+    Параметры — как у load_jobs.
+    :return: (LabelSequence, список RowIssue)
+    """
+    parts = load_jobs(input_paths, max_qty, sheets, workers, selection)
+    labels = LabelSequence()
+    issues = []
+    for part, part_issues in parts:
+        labels.extend(part)
+        issues.extend(part_issues)
+    if len(parts) > 1:
+        logger.info(f"📚 Журналов: {len(parts)}, строк: {len(labels.records)}, бирок: {len(labels)}")
+    return labels, issues
+
+
+def load_packed(
+        input_paths, per_page, max_qty=MAX_QUANTITY, sheets=None, workers=1, fill_path=None, selection=None
+):
+    """
+    Читает журналы как отдельные задания и упаковывает их на общие листы (packing.pack_jobs).
+    :param per_page: бирок на листе
+    :param fill_path: журнал очереди допечатки — заполняет пустые ячейки общих листов
+    Остальные параметры — как у load_jobs.
+    :return: (LabelSequence, список RowIssue, отчёт об упаковке по заданиям)
+    """
+    from packing import pack_jobs
+
+    if isinstance(input_paths, (str, os.PathLike)):
+        input_paths = [input_paths]
+    parts = load_jobs(input_paths, max_qty, sheets, workers, selection)
+    issues = [issue for _, part_issues in parts for issue in part_issues]
+
+    filler = None
+    if fill_path:
+        filler, filler_issues = _load_source(fill_path, None, max_qty, selection)
+        issues.extend(filler_issues)
+
+    jobs = [(os.path.basename(path), part) for path, (part, _) in zip(input_paths, parts)]
+    labels, report = pack_jobs(jobs, per_page, filler)
+    return labels, issues, report
+
+
+# === ГЕОМЕТРИЯ ЛИСТА ===
+# Ячейка листа: центр основания, Y основания, ориентация, вершины,
+# отрезки контура и базовые линии текста (в системе координат ячейки)
+Slot = namedtuple("Slot", "center_x y_base upside_down points segments y_main y_sub")
+
+
+class SheetLayout:
+    """
+    Раскладка ячеек листа для лицевой и обратной стороны.
+    Считается один раз на задание и используется для всех страниц.
+    """
+
+    def __init__(self, offset_x=0.0, offset_y=0.0, line_width=5.0, template=DEFAULT_TEMPLATE):
+        """
+        :param offset_x: компенсация принтера по X на обратной стороне (мм)
+        :param offset_y: компенсация принтера по Y на обратной стороне (мм)
+        :param line_width: толщина контура
+        :param template: шаблон листа (LabelTemplate) — размер листа, сетка, треугольник, шрифты
+        """
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.line_width = line_width
+        self.template = template
+        self.fonts = template.fonts
+        self.page_width = template.page_width  # Для зеркалирования обратной стороны
+        self.page_height = template.page_height
+        self.cols = template.cols
+        self.rows = template.rows
+        self.triangle_base = template.triangle_base
+        self.triangle_height = template.triangle_height
+        self.x_start = template.x_start  # X центра первого треугольника в ряду
+        self.y_start = template.y_start  # Y основания первого ряда
+        self._slots = {side: self._build_slots(side) for side in ('front', 'back')}
+
+    @property
+    def per_page(self):
+        """Количество бирок на листе"""
+        return self.cols * self.rows
+
+    @property
+    def pagesize(self):
+        """Размер листа для canvas"""
+        return self.page_width, self.page_height
+
+    def slots(self, side):
+        """Ячейки стороны листа в порядке заполнения"""
+        return self._slots[side]
+
+    def _build_slots(self, side):
+        col_step = self.triangle_base / 2
+        height = self.triangle_height
+
+        # Компенсация принтера — только на обратной стороне
+        shift_x = self.offset_x * mm if side == 'back' else 0
+        shift_y = self.offset_y * mm if side == 'back' else 0
+
+        slots = []
+        for row in range(self.rows):
+            for col in range(self.cols):
+                # Базовая координата X (для лицевой стороны)
+                center_x_base = self.x_start + col * col_step
+
+                # Для обратной стороны — отзеркаливаем относительно центра листа
+                if side == 'back':
+                    center_x = self.page_width - center_x_base + shift_x
+                else:
+                    center_x = center_x_base + shift_x
+
+                y_base = self.y_start + row * height + shift_y
+                upside_down = col % 2 == 1
+
+                x_left = center_x - self.triangle_base / 2
+                x_right = center_x + self.triangle_base / 2
+                if upside_down:
+                    points = ((x_left, y_base), (x_right, y_base), (center_x, y_base - height))
+                    # Текст рисуется в повёрнутой на 180° системе координат
+                    text_base = y_base
+                else:
+                    points = ((x_left, y_base - height), (x_right, y_base - height), (center_x, y_base))
+                    text_base = y_base - height
+
+                segments = tuple(
+                        (points[k][0], points[k][1], points[(k + 1) % 3][0], points[(k + 1) % 3][1])
+                        for k in range(3)
+                )
+                slots.append(Slot(
+                        center_x, y_base, upside_down, points, segments,
+                        text_base + height * 0.35,  # Основной текст ближе к центру
+                        text_base + height * 0.1  # Подзаголовок у основания
+                ))
+        return tuple(slots)
+
+
+def partial_path(output_path):
+    """Временное имя вывода до успешной отрисовки: cable_labels.pdf → cable_labels.partial.pdf"""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}{PARTIAL_SUFFIX}{ext}"
+
+
+def publish_outputs(paths, work_path, output_path):
+    """
+    Переименовывает готовые файлы из временного имени в имя вывода
+    (cable_labels.partial_001.pdf → cable_labels_001.pdf) поверх прошлого вывода.
+    :return: список итоговых путей
+    """
+    work_stem = os.path.splitext(work_path)[0]
+    stem = os.path.splitext(output_path)[0]
+    published = []
+    for path in paths:
+        target = stem + path[len(work_stem):]
+        os.replace(path, target)
+        published.append(target)
+    return published
+
+
+def remove_partial(work_path):
+    """Удаляет временные файлы этого вывода (недописанные тома, страницы растра)"""
+    for path in glob.glob(glob.escape(os.path.splitext(work_path)[0]) + "*"):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Временный файл {path} не удалён: {e}")
+
+
+def volume_path(output_path, number):
+    """Имя тома: cable_labels.pdf → cable_labels_001.pdf"""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}_{number:03d}{ext or '.pdf'}"
+
+
+def remove_stale_volumes(output_path, count):
+    """
+    Удаляет тома прошлого вывода сверх нового числа томов (были _001–_005, стало _001–_002),
+    чтобы их не напечатали вместе с новыми. Удаляются подряд идущие номера до первого пропуска.
+    :return: список удалённых путей
+    """
+    removed = []
+    number = count + 1
+    while os.path.exists(volume_path(output_path, number)):
+        path = volume_path(output_path, number)
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Старый том {path} не удалён: {e}")
+            break
+        removed.append(path)
+        number += 1
+    return removed
+
+
+def _volume_capacity(limit_bytes, samples):
+    """
+    Сколько листов поместится в том: размер тома ≈ общая часть (шрифт, формы) + байты на лист.
+    Обе величины оцениваются по первому и последнему записанным томам; запас 5%.
+    :param samples: список (листов, байт) записанных томов
+    """
+    (first_count, first_size), (last_count, last_size) = samples[0], samples[-1]
+    per_sheet = (last_size - first_size) / (last_count - first_count) if last_count != first_count else 0
+    if per_sheet <= 0:
+        # Одна точка (или шум) — без общей части, с запасом
+        per_sheet = max(size / count for count, size in samples)
+        shared = 0
+    else:
+        shared = max(first_size - per_sheet * first_count, 0)
+    return int((limit_bytes * 0.95 - shared) // per_sheet)
+
+
+def subsystem_outline(data, per_page):
+    """
+    Закладки PDF: первый лист каждой подсистемы (пустые ячейки упаковки не считаются).
+    :return: список (подсистема, номер листа с 0) по порядку листов
+    """
+    outline = []
+    seen = set()
+    start = 0
+    for record in data.records:
+        if record.row is not None and record.system not in seen:
+            seen.add(record.system)
+            outline.append((record.system or "(без подсистемы)", start // per_page))
+        start += record.qty
+    return outline
+
+
+def add_outline(writer, outline):
+    """Закладки подсистем в pypdf.PdfWriter (лицевая страница листа — 2 · номер листа)"""
+    for title, sheet in outline:
+        writer.add_outline_item(title, sheet * 2)
+    if outline:
+        writer.page_mode = "/UseOutlines"
+
+
+def merge_pdfs(paths, output_path, outline=None):
+    """
+    Склеивает PDF-файлы по порядку в один.
+    :param paths: список путей к частям
+    :param output_path: итоговый файл
+    :param outline: закладки subsystem_outline для итогового файла (None — без закладок)
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    add_outline(writer, outline or ())
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    writer.close()
+
+
+def _render_chunk(renderer, chunk, chunk_path):
+    """
+    Рисует часть бирок в отдельном процессе (должна быть на уровне модуля для pickle).
+    :return: замеры части (JobMetrics.snapshot) или None
+    """
+    # Закладки всего документа добавляются при склейке частей
+    renderer.bookmarks = False
+    if renderer.metrics is None:
+        renderer.render(chunk, chunk_path)
+        return None
+
+    renderer.metrics = JobMetrics()
+    cache_before = font_cache_stats()
+    renderer.render(chunk, chunk_path)
+    count_font_cache(renderer.metrics, cache_before)
+    return renderer.metrics.snapshot()
+
+
+class GenerationCancelled(Exception):
+    """Генерация остановлена пользователем"""
+
+
+# === ОТРИСОВКА PDF ===
+class LabelRenderer:
+    def __init__(
+            self, line_width=5.0, offset_x=0.0, offset_y=0.0, use_forms=USE_OUTLINE_FORMS,
+            template=DEFAULT_TEMPLATE
+    ):
+        """
+        Параметры отрисовки бирок.
+        :param line_width: толщина контура (мм)
+        :param offset_x: компенсация принтера по X на обратной стороне (мм)
+        :param offset_y: компенсация принтера по Y на обратной стороне (мм)
+        :param use_forms: контуры через PDF Form XObject (описываются один раз на документ)
+        :param template: шаблон листа (LabelTemplate)
+        """
+        self.line_width = line_width
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.use_forms = use_forms
+        self.layout = SheetLayout(offset_x, offset_y, line_width, template)
+        self._forms = set()  # Формы, уже описанные в текущем canvas
+        self.bookmarks = True  # Закладки PDF по подсистемам
+        self.metrics = None  # JobMetrics — замеры листов и треугольников (если заданы)
+
+    def render(self, data, output_path, progress=None, cancel=None, workers=1):
+        """
+        Рисует все листы (лицевая + обратная сторона) и сохраняет PDF.
+        :param data: последовательность бирок (record, copy)
+        :param output_path: путь к PDF
+        :param progress: функция progress(done, total) — вызывается после каждого листа
+        :param cancel: threading.Event — проверяется между листами
+        :param workers: количество процессов; больше 1 — параллельный режим по частям
+        :raises GenerationCancelled: если генерация остановлена
+        """
+        per_chunk = self.layout.per_page * PARALLEL_CHUNK_SHEETS
+        if workers > 1 and len(data) > per_chunk:
+            self.render_parallel(data, output_path, workers, progress, cancel)
+            return
+
+        c = self.new_canvas(output_path)
+        self.draw_sheets(c, data, progress, cancel)
+        if self.metrics is not None:
+            with self.metrics.stage("save"):
+                c.save()
+        else:
+            c.save()
+
+    def new_canvas(self, output_path):
+        """
+        Создаёт canvas под раскладку листа.
+        :param output_path: путь к PDF или файловый объект
+        """
+        from reportlab.pdfgen import canvas
+
+        ensure_font()
+        c = canvas.Canvas(output_path, pagesize=self.layout.pagesize)
+        c.setFont(FONT_NAME, 12)
+        self._forms = set()
+        return c
+
+    def draw_sheets(self, c, data, progress=None, cancel=None):
+        """
+        Рисует все листы (лицевая + обратная сторона) в canvas без сохранения.
+        :param c: canvas из new_canvas
+        :param data: последовательность бирок (record, copy)
+        :param progress: функция progress(done, total) — вызывается после каждого листа
+        :param cancel: threading.Event — проверяется между листами
+        :raises GenerationCancelled: если генерация остановлена
+        """
+        index = 0
+        total_sides = -(-len(data) // self.layout.per_page) * 2
+        done_sides = 0
+        # Подсистемы, начинающиеся на листе: номер листа → названия
+        outline = {}
+        if self.bookmarks:
+            for title, sheet in subsystem_outline(data, self.layout.per_page):
+                outline.setdefault(sheet, []).append(title)
+            if outline:
+                c.showOutline()
+
+        metrics = self.metrics
+        while index < len(data):
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelled()
+            if metrics is not None:
+                page_start = time.perf_counter()
+
+            # Лицевая сторона
+            for number, title in enumerate(outline.get(index // self.layout.per_page, ())):
+                key = f"system_{index}_{number}"
+                c.bookmarkPage(key)
+                c.addOutlineEntry(title, key, level=0)
+            self.draw_page(c, data, index, side='front')
+            c.showPage()
+
+            # Обратная сторона
+            self.draw_page(c, data, index, side='back')
+            c.showPage()
+
+            if metrics is not None:
+                metrics.page(time.perf_counter() - page_start)
+            done_sides += 2
+            if progress is not None:
+                progress(done_sides, total_sides)
+
+            index += self.layout.per_page
+
+    def render_parallel(self, data, output_path, workers, progress=None, cancel=None):
+        """
+        Параллельный режим: последовательность делится на части по целым листам
+        (PARALLEL_CHUNK_SHEETS листов по 25 бирок), части рисуются в пуле процессов,
+        затем PDF частей склеиваются по порядку. Порядок лицевых и обратных
+        страниц внутри каждого листа тот же, что и в последовательном режиме.
+        :param workers: размер пула процессов
+        """
+        per_chunk = self.layout.per_page * PARALLEL_CHUNK_SHEETS
+        total_sides = -(-len(data) // self.layout.per_page) * 2
+        done_sides = 0
+
+        tmp_dir = tempfile.mkdtemp(prefix="cable_signs_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            chunk_paths = []
+            # Шрифт разбирается один раз при старте процесса пула, а не в каждой части
+            with ProcessPoolExecutor(max_workers=workers, initializer=ensure_font) as executor:
+                futures = {}
+                for number, start in enumerate(range(0, len(data), per_chunk)):
+                    chunk = data.slice(start, start + per_chunk)
+                    chunk_path = os.path.join(tmp_dir, f"chunk_{number:05d}.pdf")
+                    chunk_paths.append(chunk_path)
+                    futures[executor.submit(_render_chunk, self, chunk, chunk_path)] = len(chunk)
+
+                try:
+                    for future in as_completed(futures):
+                        if cancel is not None and cancel.is_set():
+                            raise GenerationCancelled()
+                        snapshot = future.result()
+                        if snapshot is not None:
+                            self.metrics.merge(snapshot)
+                        done_sides += -(-futures[future] // self.layout.per_page) * 2
+                        if progress is not None:
+                            progress(done_sides, total_sides)
+                except BaseException:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+
+            outline = subsystem_outline(data, self.layout.per_page) if self.bookmarks else None
+            if self.metrics is not None:
+                with self.metrics.stage("merge"):
+                    merge_pdfs(chunk_paths, output_path, outline)
+            else:
+                merge_pdfs(chunk_paths, output_path, outline)
+            logger.info(f"🧩 PDF собран из {len(chunk_paths)} частей ({workers} процессов)")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def render_volumes(
+            self, data, output_path, volume_sheets=None, volume_mb=None, progress=None, cancel=None, workers=1
+    ):
+        """
+        Делит вывод на тома по volume_sheets листов или примерно по volume_mb МБ:
+        cable_labels_001.pdf, cable_labels_002.pdf, ... Каждый том сохраняется и закрывается
+        сразу после отрисовки — память не растёт, печать можно начинать до конца генерации.
+        Размер тома заранее неизвестен: первый том — VOLUME_PROBE_SHEETS листов,
+        дальше число листов оценивается по размерам уже записанных томов (_volume_capacity).
+        :param volume_sheets: максимум листов в томе
+        :param volume_mb: ориентировочный максимум размера тома, МБ
+        :return: список путей томов
+        """
+        per_page = self.layout.per_page
+        total_sheets = -(-len(data) // per_page)
+        total_sides = total_sheets * 2
+        limit_bytes = volume_mb * 2 ** 20 if volume_mb else None
+        samples = []  # (листов, байт) записанных томов
+
+        paths = []
+        sheet = 0
+        while sheet < total_sheets:
+            count = volume_sheets or total_sheets
+            if limit_bytes:
+                fit = _volume_capacity(limit_bytes, samples) if samples else VOLUME_PROBE_SHEETS
+                count = max(1, min(count, fit))
+            count = min(count, total_sheets - sheet)
+
+            path = volume_path(output_path, len(paths) + 1)
+            part = data.slice(sheet * per_page, (sheet + count) * per_page)
+            offset = sheet * 2
+            self.render(
+                    part, path,
+                    progress=(lambda done, total: progress(offset + done, total_sides)) if progress else None,
+                    cancel=cancel, workers=workers
+            )
+
+            size = os.path.getsize(path)
+            samples.append((count, size))
+            if limit_bytes and size > limit_bytes:
+                logger.warning(f"⚠️ Том {path} больше заданного размера: {size / 2 ** 20:.1f} МБ")
+            logger.info(f"📦 Том {len(paths) + 1}: листы {sheet + 1}–{sheet + count}, {size} байт")
+            paths.append(path)
+            sheet += count
+        return paths
+
+    def cache_key(self):
+        """Параметры отрисовки, от которых зависит содержимое листа"""
+        layout = self.layout
+        return repr((
+                SHEET_CACHE_VERSION, FONT_NAME, self.use_forms, self.line_width, self.offset_x, self.offset_y,
+                layout.page_width, layout.page_height, layout.cols, layout.rows,
+                layout.triangle_base, layout.triangle_height, layout.x_start, layout.y_start, layout.fonts,
+        ))
+
+    def sheet_hashes(self, data):
+        """
+        Хэш каждого листа: тексты всех его бирок (лицевая + обратная) и параметры отрисовки.
+        :param data: последовательность бирок (record, copy)
+        :return: список хэшей по порядку листов
+        """
+        key = self.cache_key().encode("utf-8")
+        per_page = self.layout.per_page
+        hashes = []
+        digest = None
+        for i, (item, _) in enumerate(data):
+            if i % per_page == 0:
+                if digest is not None:
+                    hashes.append(digest.hexdigest())
+                digest = hashlib.sha1(key)
+            digest.update(f"\x1e{item.system}\x1f{item.track}\x1f{item.cable}\x1f{item.length}".encode("utf-8"))
+        if digest is not None:
+            hashes.append(digest.hexdigest())
+        return hashes
+
+    def render_incremental(self, data, output_path, progress=None, cancel=None, workers=1):
+        """
+        Инкрементальный режим: рядом с PDF хранится кэш листов (<имя>.pdf.sheets) —
+        страницы прошлой генерации и хэши их листов. Заново рисуются только листы
+        с изменившимся хэшем, остальные страницы копируются из кэша без отрисовки.
+        Листы одной дорисовки делят шрифт и формы, но у каждой дорисовки они свои —
+        поэтому выводы из многих дорисовок (SHEET_CACHE_MAX_REVISIONS) рисуются заново целиком.
+        :return: (отрисовано листов, взято из кэша)
+        """
+        from pypdf import PdfReader, PdfWriter
+
+        per_page = self.layout.per_page
+        hashes = self.sheet_hashes(data)
+        if not hashes:
+            self.render(data, output_path)
+            return 0, 0
+        cache_dir = output_path + SHEET_CACHE_SUFFIX
+        store_path = os.path.join(cache_dir, "sheets.pdf")
+        index_path = os.path.join(cache_dir, "index.json")
+
+        # Хэш листа → [номер его лицевой страницы в sheets.pdf, номер дорисовки]
+        cached = {}
+        store = None
+        revision = 0
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == SHEET_CACHE_VERSION:
+                store = PdfReader(store_path)
+                if len(store.pages) == index["pages"]:
+                    cached = index["sheets"]
+                    revision = index["revision"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"Кэш листов не используется: {e}")
+        except Exception as e:
+            # Повреждённый PDF кэша — просто рисуем всё заново
+            logger.warning(f"⚠️ Кэш листов повреждён и будет пересоздан: {e}")
+
+        missing = [number for number, digest in enumerate(hashes) if digest not in cached]
+        if missing and cached:
+            kept = {cached[digest][1] for digest in hashes if digest in cached}
+            if len(kept) + 1 > SHEET_CACHE_MAX_REVISIONS or len(missing) >= len(hashes) * SHEET_CACHE_FULL_SHARE:
+                # Уплотнение: один шрифт и одни формы на весь вывод
+                logger.info(f"♻️ Кэш листов уплотняется: дорисовок в выводе {len(kept) + 1}, изменено {len(missing)} листов")
+                cached = {}
+                missing = list(range(len(hashes)))
+        logger.info(f"♻️ Листов: {len(hashes)}, из кэша: {len(hashes) - len(missing)}, заново: {len(missing)}")
+        if missing:
+            revision += 1
+
+        os.makedirs(cache_dir, exist_ok=True)
+        delta_path = os.path.join(cache_dir, "changed.pdf")
+        assembled_path = os.path.join(cache_dir, "assembled.pdf")
+        try:
+            # Изменённые листы — одним документом (шрифт и формы описываются один раз)
+            delta = None
+            if missing:
+                changed = LabelSequence()
+                for number in missing:
+                    for record in data.slice(number * per_page, (number + 1) * per_page).records:
+                        changed.append(record)
+                self.render(changed, delta_path, progress=progress, cancel=cancel, workers=workers)
+                delta = PdfReader(delta_path)
+
+            # Сборка: общие шрифты и формы одного источника копируются один раз
+            writer = PdfWriter()
+            delta_pages = {number: position * 2 for position, number in enumerate(missing)}
+            for number, digest in enumerate(hashes):
+                if number in delta_pages:
+                    source, page = delta, delta_pages[number]
+                else:
+                    source, page = store, cached[digest][0]
+                writer.add_page(source.pages[page])
+                writer.add_page(source.pages[page + 1])
+            if self.bookmarks:
+                add_outline(writer, subsystem_outline(data, per_page))
+            with open(assembled_path, "wb") as f:
+                writer.write(f)
+            writer.close()
+
+            # Прошлый вывод заменяется только готовым файлом
+            shutil.copyfile(assembled_path, partial_path(output_path))
+            os.replace(partial_path(output_path), output_path)
+            os.replace(assembled_path, store_path)
+            sheets = {}
+            for number, digest in enumerate(hashes):
+                if digest not in sheets:
+                    sheets[digest] = [number * 2, revision if number in delta_pages else cached[digest][1]]
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump({
+                        "version": SHEET_CACHE_VERSION, "pages": len(hashes) * 2, "revision": revision,
+                        "sheets": sheets,
+                }, f)
+        finally:
+            for path in (delta_path, assembled_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        if self.metrics is not None:
+            self.metrics.count("sheets_rendered", len(missing))
+            self.metrics.count("sheets_cached", len(hashes) - len(missing))
+        return len(missing), len(hashes) - len(missing)
+
+    def page_labels(self, data, start_index, side):
+        """
+        Тексты бирок одной стороны листа.
+        :return: список (main_text, sub_text, main_font, sub_font, main_fit) по порядку ячеек
+        """
+        stop = min(start_index + self.layout.per_page, len(data))
+        fonts = self.layout.fonts
+        labels = []
+        for i in range(start_index, stop):
+            item, _ = data[i]
+
+            # Тексты и разбивка cable готовы заранее (normalize_rows)
+            if side == 'front':
+                main_fit = fit_main_text(item.system, side, fonts)
+                labels.append((item.system, item.track, fonts.system, fonts.track, main_fit))
+            else:
+                main_fit = fit_cable_lines(*item.cable_lines, fonts)
+                labels.append((item.cable, item.length_text, fonts.cable, fonts.length, main_fit))
+        return labels
+
+    def draw_page(self, c, data, start_index, side):
+        """
+        Рисует одну страницу с этикетками.
+        :param c: объект canvas (PDF)
+        :param data: последовательность бирок (record, copy)
+        :param start_index: с какого элемента начинать
+        :param side: 'front' или 'back'
+        """
+        # Позиции ячеек рассчитаны заранее (с зеркалированием и компенсацией принтера)
+        slots = self.layout.slots(side)
+        labels = self.page_labels(data, start_index, side)
+
+        # Полный лист без пустых бирок — все контуры одной формой
+        grid_drawn = False
+        if self.use_forms and len(labels) == len(slots) and all(
+                main_text or sub_text for main_text, sub_text, _, _, _ in labels
+        ):
+            c.doForm(self._grid_form(c, side))
+            grid_drawn = True
+
+        metrics = self.metrics
+        for slot, (main_text, sub_text, main_font, sub_font, main_fit) in zip(slots, labels):
+            if metrics is not None:
+                start = time.perf_counter()
+            self.draw_triangle(
+                    c, slot, main_text, sub_text, main_font, sub_font, side,
+                    draw_outline=not grid_drawn, main_fit=main_fit
+            )
+            if metrics is not None:
+                metrics.add_time("draw_triangle", time.perf_counter() - start)
+
+    def _grid_form(self, c, side):
+        """Форма со всеми контурами стороны листа; описывается при первом использовании"""
+        name = f"grid_{side}"
+        if name not in self._forms:
+            c.beginForm(name)
+            c.setLineWidth(self.line_width)
+            c.setStrokeColorRGB(0, 0, 0)
+            for slot in self.layout.slots(side):
+                c.lines(slot.segments)
+            c.endForm()
+            self._forms.add(name)
+        return name
+
+    def _outline_form(self, c, upside_down):
+        """
+        Форма контура одного треугольника с началом координат в точке (center_x, y_base) ячейки.
+        Описывается при первом использовании.
+        """
+        name = "outline_down" if upside_down else "outline_up"
+        if name not in self._forms:
+            half = self.layout.triangle_base / 2
+            height = self.layout.triangle_height
+            pad = self.line_width
+            if upside_down:
+                points = ((-half, 0), (half, 0), (0, -height))
+            else:
+                points = ((-half, -height), (half, -height), (0, 0))
+            c.beginForm(name, -half - pad, -height - pad, half + pad, pad)
+            c.setLineWidth(self.line_width)
+            c.setStrokeColorRGB(0, 0, 0)
+            c.lines([
+                    (points[k][0], points[k][1], points[(k + 1) % 3][0], points[(k + 1) % 3][1])
+                    for k in range(3)
+            ])
+            c.endForm()
+            self._forms.add(name)
+        return name
+
+    def draw_triangle(
+            self, c, slot, main_text, sub_text, main_font_size, sub_font_size, side, draw_outline=True,
+            main_fit=None
+    ):
+        """
+        Рисует один треугольник с текстом.
+        :param c: canvas
+        :param slot: ячейка листа (Slot) — центр, основание, ориентация, вершины
+        :param main_text: основной текст (system/cable)
+        :param sub_text: подзаголовок (track/length)
+        :param main_font_size: размер шрифта основного текста
+        :param sub_font_size: размер шрифта подзаголовка
+        :param side: 'front' или 'back'
+        :param draw_outline: False — контур уже нарисован формой всего листа
+        :param main_fit: готовая раскладка основного текста (иначе считается по main_text)
+        """
+
+        if not main_text.strip() and not sub_text.strip():
+            return
+
+        center_x = slot.center_x
+        y_base = slot.y_base
+
+        # Рисуем контур
+        if draw_outline and self.use_forms:
+            c.saveState()
+            c.translate(center_x, y_base)
+            c.doForm(self._outline_form(c, slot.upside_down))
+            c.restoreState()
+        elif draw_outline:
+            c.setLineWidth(self.line_width)
+
+            c.setStrokeColorRGB(0, 0, 0)
+            c.lines(slot.segments)
+
+        c.saveState()
+
+        if slot.upside_down:
+            # Поворачиваем вокруг центра основания
+            c.translate(center_x, y_base)
+            c.rotate(180)
+            c.translate(-center_x, -y_base)
+
+        y_main = slot.y_main
+        y_sub = slot.y_sub
+
+        # --- ОСНОВНОЙ ТЕКСТ (system или cable) и ПОДЗАГОЛОВОК (track или length) ---
+        # Разбивка на строки, размеры шрифта и ширины берутся из кэша
+        current_size = None
+        if main_fit is None:
+            main_fit = fit_main_text(main_text, side, self.layout.fonts)
+        for line, font_size, dx, dy in main_fit:
+            if font_size != current_size:
+                c.setFont(FONT_NAME, font_size)
+                current_size = font_size
+            c.drawString(center_x + dx, y_main + dy, line)
+
+        current_size = None
+        for line, font_size, dx, dy in fit_sub_text(sub_text, side, sub_font_size, self.layout.fonts):
+            if font_size != current_size:
+                c.setFont(FONT_NAME, font_size)
+                current_size = font_size
+            c.drawString(center_x + dx, y_sub + dy, line)
+
+        c.restoreState()
+
+
+def generate_pdf(
+        input_path, output_path, line_width=5.0, offset_x=0.0, offset_y=0.0,
+        max_qty=MAX_QUANTITY, workers=RENDER_WORKERS, progress=None, cancel=None,
+        metrics_path=METRICS_FILE, profile_path=None, incremental=False, sheets=None,
+        pack=False, fill_path=None, volume_sheets=None, volume_mb=None, font_report=False,
+        output_format="pdf", dpi=None, template=None, cache_dir=None, selection=None, manifest="csv"
+):
+    """
+    Полный цикл: чтение журнала, сборка бирок и отрисовка PDF.
+    :param input_path: путь к журналу (.xlsx, .csv, .parquet) или список путей —
+                       бирки всех журналов идут подряд в одном PDF
+    :param output_path: путь к PDF
+    :param line_width: толщина контура
+    :param offset_x: компенсация принтера по X (мм)
+    :param offset_y: компенсация принтера по Y (мм)
+    :param max_qty: максимальное количество копий на одну строку
+    :param workers: количество процессов рендеринга (и одновременно читаемых журналов)
+    :param progress: функция progress(done, total)
+    :param cancel: threading.Event для остановки между листами
+    :param metrics_path: файл JSON Lines для итога задания (None — не писать)
+    :param profile_path: файл профиля cProfile (None — без профилирования)
+    :param incremental: перерисовывать только изменившиеся листы (кэш листов рядом с PDF)
+    :param sheets: листы книг Excel: None — активный, ALL_SHEETS — все, список — выбранные
+    :param pack: журналы — отдельные задания, их неполные листы упаковываются на общие
+    :param fill_path: очередь допечатки для пустых ячеек (только при pack)
+    :param volume_sheets: делить вывод на тома по столько листов (output_001.pdf, ...)
+    :param volume_mb: делить вывод на тома примерно по столько МБ
+    :param font_report: посчитать размер встроенного шрифта и PDF без подмножеств
+    :param output_format: 'pdf', 'tiff' (многостраничный TIFF) или 'png' (файл на сторону листа);
+                          растр пишется рядом с output_path под тем же именем
+    :param dpi: разрешение растра (None — RASTER_DPI)
+    :param template: шаблон листа — LabelTemplate, имя встроенного (a4, a3, roll-100, ...)
+                     или путь к JSON; None — A4 5×5
+    :param cache_dir: папка кэша готовых файлов (None — без кэша): при тех же бирках и параметрах
+                      файлы копируются из кэша без отрисовки
+    :param selection: отбор для допечатки — selection.Selection или словарь
+                      {"tracks", "systems", "rows", "sheet_numbers", "index"}; без "index" номера листов
+                      берутся из индекса исходного вывода (journal_reprint.pdf → journal.pdf).
+                      Рядом с выводом всегда пишется индекс <имя>.index.json (трасса → листы, ячейки, файлы и страницы)
+    :param manifest: формат перечня бирок рядом с выводом — 'csv', 'jsonl' или None (не писать):
+                     лист, страница, сторона, ячейка, тексты и строка журнала каждой бирки
+    :return: количество бирок
+    :raises MissingColumnsError: если не найдены необходимые столбцы
+    :raises GenerationCancelled: если генерация остановлена (прошлый вывод остаётся, временные файлы удаляются)
+    :raises ValueError: если тома запрошены вместе с инкрементальным режимом
+                        или растр — вместе с томами или инкрементальным режимом,
+                        или шаблон не найден, или отбор задан неверно, или под него не подошло ни одной бирки,
+                        или формат манифеста неизвестен
+    """
+    volumes = bool(volume_sheets or volume_mb)
+    if volumes and incremental:
+        raise ValueError("Тома и инкрементальный режим не совмещаются")
+    raster = output_format != "pdf"
+    if raster and (volumes or incremental):
+        raise ValueError("Растровый вывод не совмещается с томами и инкрементальным режимом")
+    template = get_template(template)
+    from manifest import MANIFEST_FORMATS, write_manifest
+    from selection import build_index, make_selection, page_locations, write_index
+
+    if manifest and manifest not in MANIFEST_FORMATS:
+        raise ValueError(f"Неизвестный формат манифеста: {manifest}")
+
+    # Индекс исходного задания читается до отрисовки; вывод допечатки не может его перезаписать
+    selection = make_selection(selection, output_path)
+
+    metrics = JobMetrics(job=input_path)
+    cache_before = font_cache_stats()
+
+    with profiled(profile_path), metrics.stage("total"):
+        if raster:
+            from raster import RASTER_DPI, RasterRenderer
+
+            renderer = RasterRenderer(line_width, offset_x, offset_y, dpi or RASTER_DPI, template)
+        else:
+            renderer = LabelRenderer(line_width, offset_x, offset_y, template=template)
+        if template is not DEFAULT_TEMPLATE:
+            logger.info(f"📐 Шаблон {describe_template(template)}")
+        renderer.metrics = metrics
+        packing = None
+        with metrics.stage("ingest"):
+            # Строки хранятся компактно — по одной записи на строку файла
+            if pack:
+                data, issues, packing = load_packed(
+                        input_path, renderer.layout.per_page, max_qty, sheets, workers, fill_path, selection
+                )
+            else:
+                data, issues = load_labels(input_path, max_qty, sheets, workers, selection)
+        log_issues(issues)
+        if selection is not None:
+            if not len(data):
+                raise ValueError(f"Под отбор ({selection.describe()}) не подошло ни одной бирки")
+            logger.info(f"🔎 Отбор: {selection.describe()} — строк {len(data.records)}, бирок {len(data)}")
+        # При упаковке в последовательности есть пустые ячейки — считаем только бирки заданий
+        label_count = sum(entry["labels"] for entry in packing) if packing is not None else len(data)
+
+        # Кэш готовых файлов: те же бирки и те же параметры — копия без отрисовки
+        cached = None
+        if cache_dir:
+            from output_cache import OutputCache
+
+            output_cache = OutputCache(cache_dir)
+            cache_key = output_cache.key(data, repr((
+                    renderer.cache_key(), font_file_hash(), output_format,
+                    getattr(renderer, "dpi", None), volume_sheets, volume_mb,
+            )))
+            cached = output_cache.lookup(cache_key)
+        # Файлы пишутся под временным именем и заменяют прошлый вывод только после успешной отрисовки
+        # (инкрементальный режим заменяет PDF сам — его кэш листов привязан к имени вывода)
+        work_path = output_path if incremental else partial_path(output_path)
+        try:
+            with metrics.stage("render"):
+                if cached is not None:
+                    outputs = output_cache.restore(cached, work_path)
+                    metrics.count("output_cache_hits")
+                    if progress is not None:
+                        progress(1, 1)
+                elif raster:
+                    outputs = renderer.render(
+                            data, work_path, output_format,
+                            progress=progress, cancel=cancel, workers=workers
+                    )
+                elif volumes:
+                    outputs = renderer.render_volumes(
+                            data, work_path, volume_sheets, volume_mb,
+                            progress=progress, cancel=cancel, workers=workers
+                    )
+                else:
+                    render = renderer.render_incremental if incremental else renderer.render
+                    render(data, work_path, progress=progress, cancel=cancel, workers=workers)
+                    outputs = [work_path]
+        except Exception:
+            # Недописанные файлы этого задания не оставляем; прошлый вывод не трогаем
+            if work_path != output_path:
+                remove_partial(work_path)
+            raise
+        if work_path != output_path:
+            outputs = publish_outputs(outputs, work_path, output_path)
+        if volumes:
+            stale = remove_stale_volumes(output_path, len(outputs))
+            if stale:
+                logger.info(f"🗑 Удалены старые тома: {', '.join(stale)}")
+        if cached is not None:
+            logger.info(f"♻️ Готовый вывод взят из кэша ({cache_key[:12]}): {', '.join(outputs)}")
+        elif volumes:
+            logger.info(f"📦 Тома: {', '.join(outputs)}")
+        if cache_dir and cached is None:
+            with metrics.stage("cache_store"):
+                output_cache.store(cache_key, output_path, outputs, label_count)
+        with metrics.stage("index"):
+            # Файл и страница каждого листа — тома и растр нумеруются по своим файлам
+            per_page = renderer.layout.per_page
+            files, locations = page_locations(outputs, output_format, -(-len(data) // per_page))
+            write_index(build_index(data, per_page, files, locations, template.name), output_path)
+            manifest_file = (
+                    write_manifest(data, per_page, files, locations, output_path, manifest) if manifest else None
+            )
+
+    count_font_cache(metrics, cache_before)
+    summary = metrics.summary(
+            output=output_path,
+            labels=label_count,
+            records=len(data.records),
+            workers=workers,
+            incremental=incremental,
+            row_issues=len(issues),
+            bytes_written=sum(os.path.getsize(path) for path in outputs),
+    )
+    summary["font_ttf"] = ensure_font()
+    summary["template"] = {"name": template.name, "per_page": renderer.layout.per_page}
+    if cache_dir:
+        summary["output_cache"] = "hit" if cached is not None else "miss"
+    if selection is not None:
+        summary["selection"] = selection.describe()
+    if manifest_file:
+        summary["manifest"] = manifest_file
+    if volumes:
+        summary["volumes"] = outputs
+    if raster:
+        summary["raster"] = {"format": output_format, "dpi": renderer.dpi, "files": len(outputs)}
+    if font_report and not raster:
+        summary["font"] = [font_size_report(path) for path in outputs]
+        for report in summary["font"]:
+            logger.info(
+                    f"🔤 Шрифт: {report['font_subsets']} подмножеств, {report['font_subset_bytes']} байт; "
+                    f"PDF {report['pdf_bytes']} байт, без подмножеств было бы "
+                    f"~{report['pdf_bytes_without_subsetting']} байт"
+            )
+    if packing is not None:
+        from packing import log_packing
+
+        per_page = renderer.layout.per_page
+        log_packing(packing, per_page, -(-len(data) // per_page))
+        summary["packing"] = packing
+    emit(summary, metrics_path)
+    logger.info(
+            f"📈 {summary['labels']} бирок, {summary['pages']['count']} листов за "
+            f"{summary['stages']['total']:.2f} с ({summary['labels_per_second']} бирок/с), "
+            f"{summary['bytes_written']} байт"
+    )
+    return label_count
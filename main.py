@@ -1,45 +1,40 @@
 import os
 import sys
-import shutil
+import time
 import logging
+import multiprocessing
+import queue
+import threading
 from datetime import datetime
 
 
-# ДЕТАЛЬНАЯ ДИАГНОСТИКА
-if hasattr(sys, '_MEIPASS'):
-    base_path = sys._MEIPASS
-    print(f"Base path: {base_path}")
+# Время запуска процесса — для замера холодного старта (см. measure_startup.py)
+_START_TIME = time.perf_counter()
 
-    # Проверим все возможные расположения
+
+def _find_tk_library(base_path):
+    """
+    Находит папку tk8.6 (с tk.tcl) внутри распакованного exe.
+    PyInstaller кладёт её в tk/tk8.6 или tcl/tk8.6 — путь передаётся в TK_LIBRARY
+    как есть, без копирования: при --onefile временная папка новая на каждый запуск,
+    и копирование всей tk8.6 выполнялось бы при каждом старте.
+    """
     possible_paths = [
-            os.path.join(base_path, 'tk', 'tk8.6'),
             os.path.join(base_path, 'tcl', 'tk8.6'),
+            os.path.join(base_path, 'tk', 'tk8.6'),
             os.path.join(base_path, 'tk8.6'),
     ]
-
     for path in possible_paths:
-        exists = os.path.exists(path)
-        print(f"Path: {path} - exists: {exists}")
-        if exists:
-            files = os.listdir(path)
-            print(f"  Files: {len(files)}")
-            if 'tk.tcl' in files:
-                print("  ✅ tk.tcl FOUND!")
-
-    # Если tk8.6 в корне как tk/tk8.6, перемещаем
-    tk_root_path = os.path.join(base_path, 'tk', 'tk8.6')
-    tk_correct_path = os.path.join(base_path, 'tcl', 'tk8.6')
-
-    if os.path.exists(tk_root_path):
-        print(f"Found tk8.6 at: {tk_root_path}")
-        if not os.path.exists(tk_correct_path):
-            os.makedirs(os.path.dirname(tk_correct_path), exist_ok=True)
-            shutil.copytree(tk_root_path, tk_correct_path)
-            print(f"✅ Copied tk8.6 to: {tk_correct_path}")
-
-    # Устанавливаем пути
+        if os.path.isfile(os.path.join(path, 'tk.tcl')):
+            return path
+    return possible_paths[0]
+
+
+# Пути Tcl/Tk внутри собранного exe
+if hasattr(sys, '_MEIPASS'):
+    base_path = sys._MEIPASS
     os.environ['TCL_LIBRARY'] = os.path.join(base_path, 'tcl', 'tcl8.6')
-    os.environ['TK_LIBRARY'] = os.path.join(base_path, 'tcl', 'tk8.6')
+    os.environ['TK_LIBRARY'] = _find_tk_library(base_path)
 
     print(f"Final TCL_LIBRARY: {os.environ['TCL_LIBRARY']} - exists: {os.path.exists(os.environ['TCL_LIBRARY'])}")
     print(f"Final TK_LIBRARY: {os.environ['TK_LIBRARY']} - exists: {os.path.exists(os.environ['TK_LIBRARY'])}")
@@ -50,15 +45,18 @@ with open('debug_log.txt', 'a') as f:
     f.write("Tkinter imported successfully\n")
 
 # import tkinter as tk
-import openpyxl
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 # Для кастомной темы
 from tkinter import ttk, filedialog, messagebox
 
+from calibration import get_profile, load_profiles, render_calibration, save_profile
+from engine import (
+    ALL_SHEETS, MAX_QUANTITY, RENDER_WORKERS, GenerationCancelled, MissingColumnsError,
+    ensure_font, font_available, generate_pdf, partial_path, sanitize_filename, volume_path,
+)
+from output_cache import CACHE_DIR
+from server import SERVER_URL, submit_job, wait_job
+from templates import DEFAULT_TEMPLATE, TEMPLATES
+
 # Настройка логирования в файл И в консоль
 log_filename = f"cable_signs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
 
@@ -106,82 +104,20 @@ logger.addHandler(console_handler)
 logging.info("=== Cable Signs Application Started ===")
 logging.info(f"Working directory: {os.getcwd()}")
 
-# Теперь все логи будут и в файл, и в консоль
-logging.info("This message goes to both file and console")
-logging.warning("This warning is visible in console")
-logging.error("Errors also appear in console")
-
 # Указываем Python, где искать Tcl/Tk внутри виртуального окружения
+# (в собранном exe пути уже заданы выше и не перезаписываются)
 base_prefix = getattr(sys, 'base_prefix', sys.prefix)  # Получаем путь к окружению
 tcl_dir = os.path.join(base_prefix, 'tcl')
 
 # Важно: задаем переменные окружения ДО создания окна Tk
-os.environ["TCL_LIBRARY"] = os.path.join(tcl_dir, "tcl8.6")
-os.environ["TK_LIBRARY"] = os.path.join(tcl_dir, "tk8.6")
-
-# === РЕГИСТРАЦИЯ ШРИФТА ===
-# Попробуем загрузить Times New Roman Bold для красивого шрифта
-try:
-    pdfmetrics.registerFont(TTFont('Times-Bold', 'timesbd.ttf'))
-except:
-    pass  # Если не найден — используем fallback (стандартный жирный шрифт)
-
-# === ГЛОБАЛЬНЫЕ ПАРАМЕТРЫ ===
-TRIANGLE_BASE = 60 * mm  # Ширина основания треугольника
-TRIANGLE_HEIGHT = 49 * mm  # Высота треугольника
-PAGE_WIDTH, PAGE_HEIGHT = A4  # Размер листа A4
-
-MAX_COLS = 5  # Количество треугольников в ряду
-MAX_ROWS = 5  # Количество рядов
-
-FONT_SYSTEM = 18  # Размер шрифта для system
-FONT_TRACK = 14  # Размер шрифта для track
-FONT_CABLE = 16  # Размер шрифта для cable (чуть больше)
-FONT_LENGTH = 14  # Размер шрифта для length
-
-MIN_FONT_SIZE = 10  # Минимальный размер шрифта при уменьшении
-PRINTER_OFFSET_X = 0.0 * mm  # Компенсация смещения принтера на обратной стороне по оси X
-PRINTER_OFFSET_Y = 0.0 * mm  # Компенсация смещения принтера на обратной стороне по оси Y
-# Запрещённые символы в именах файлов Windows
-INVALID_FILENAME_CHARS = r'<>:"/\\|?*'
-
-
-# === ФУНКЦИЯ: РАЗДЕЛЕНИЕ ТЕКСТА CABLE НА 2 СТРОКИ ===
-def split_cable_text(text):
-    """
-    Разделяет текст из колонки 'cable' на 2 строки:
-    - Первая строка: первое слово
-    - Вторая строка: всё остальное
-    Если одно слово — делит пополам.
-    Пример: "ParLan 4x2x0,57" → ["ParLan", "4x2x0,57"]
-    """
-    if not text or not text.strip():
-        return ["", ""]
-    words = text.strip().split()
-    if len(words) == 0:
-        return ["", ""]
-    elif len(words) == 1:
-        w = words[0]
-        mid = len(w) // 2
-        return [w[:mid], w[mid:]]
-    else:
-        return [words[0], " ".join(words[1:])]
-
-
-def find_column(headers, *names):
-    """
-    Ищет первый столбец по списку возможных имён.
-    :param headers: список заголовков Excel
-    :param names: возможные названия столбца
-    :return: индекс столбца или None
-    """
-    lower_headers = [h.lower() if h else "" for h in headers]
-
-    for name in names:
-        if name.lower() in lower_headers:
-            return lower_headers.index(name.lower())
+if not hasattr(sys, '_MEIPASS') and os.path.isdir(tcl_dir):
+    os.environ["TCL_LIBRARY"] = os.path.join(tcl_dir, "tcl8.6")
+    os.environ["TK_LIBRARY"] = os.path.join(tcl_dir, "tk8.6")
 
-    return None
+POLL_INTERVAL_MS = 100  # Период опроса фонового потока генерации
+# Режим замера старта: окно закрывается сразу после первой отрисовки
+STARTUP_PROBE = os.environ.get("CABLE_SIGNS_STARTUP_PROBE") == "1"
+INPUT_SEPARATOR = "; "  # Разделитель путей в поле «Журналы»
 
 
 # === ОСНОВНОЙ КЛАСС ПРИЛОЖЕНИЯ ===
@@ -197,6 +133,16 @@ class CableLabelApp:
         # Внутренние float-значения
         self._offset_x = 0.0
         self._offset_y = 0.0
+        # Профиль принтера: компенсация профиля по умолчанию подставляется при запуске
+        self.printer_var = tk.StringVar()
+        found = get_profile()
+        if found is not None:
+            name, profile = found
+            self.printer_var.set(name)
+            self.printer_offset_x.set(str(profile["offset_x"]))
+            self.printer_offset_y.set(str(profile["offset_y"]))
+            self._offset_x = profile["offset_x"]
+            self._offset_y = profile["offset_y"]
         self.root = root
         # --- Настройка тёмной темы ---
         self.root.tk_setPalette(
@@ -206,9 +152,29 @@ class CableLabelApp:
         # Переменная для толщины контура
         self.line_width_var = tk.StringVar(value="5.0")
         self._line_width = 5.0  # внутреннее значение в мм
+        # Ограничение количества бирок на одну строку
+        self.max_qty_var = tk.StringVar(value=str(MAX_QUANTITY))
+        self._max_qty = MAX_QUANTITY
+        # Количество процессов рендеринга
+        self.workers_var = tk.StringVar(value=str(RENDER_WORKERS))
+        self._workers = RENDER_WORKERS
+        # Листов в одном томе PDF (0 — без деления)
+        self.volume_sheets_var = tk.StringVar(value="0")
+        self._volume_sheets = 0
+        # Шаблон листа (templates.TEMPLATES)
+        self.template_var = tk.StringVar(value=DEFAULT_TEMPLATE.name)
+        # Отправлять задание в очередь локального сервера печати (cli.py serve)
+        self.server_var = tk.BooleanVar(value=False)
+        # Перерисовывать только листы, изменившиеся с прошлой генерации
+        self.incremental_var = tk.BooleanVar(value=False)
+        # Читать все листы книг Excel, а не только активный
+        self.all_sheets_var = tk.BooleanVar(value=False)
 
         # 🔔 Подписываемся на изменение
         self.line_width_var.trace_add('write', self.update_offsets)
+        self.max_qty_var.trace_add('write', self.update_offsets)
+        self.workers_var.trace_add('write', self.update_offsets)
+        self.volume_sheets_var.trace_add('write', self.update_offsets)
 
         style = ttk.Style()
         style.theme_use('clam')  # или 'alt'
@@ -223,18 +189,41 @@ class CableLabelApp:
         # Цвет текста справки — светло-серый
         self.help_color = "#ccccff"
         self.root.title('Генератор бирок')
-        self.root.geometry("580x630")
+        self.root.geometry("580x820")
 
         self.input_file = tk.StringVar()  # Путь к Excel
         self.output_dir = tk.StringVar()  # Путь к папке сохранения
 
+        # Фоновая генерация: события из потока и флаг остановки
+        self._events = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._worker = None
+
         self.create_widgets()
+        self.root.after_idle(self._report_startup)
+
+    def _report_startup(self):
+        """Логирует время от запуска процесса до готового окна"""
+        elapsed = time.perf_counter() - _START_TIME
+        logger.info(f"⏱ Окно готово за {elapsed:.2f} с")
+        if STARTUP_PROBE:
+            print(f"STARTUP_SECONDS={elapsed:.3f}", flush=True)
+            self.root.destroy()
+            return
+        # Шрифт разбирается после показа окна — первая генерация уже не ждёт
+        self.root.after(200, self._check_font)
+
+    def _check_font(self):
+        """Проверяет, что TTF с кириллицей загружен; иначе бирки напечатаются без букв"""
+        if not font_available() or not ensure_font():
+            messagebox.showwarning(
+                    "Шрифт",
+                    "Не удалось загрузить timesbd.ttf.\nКириллица на бирках не будет напечатана."
+            )
 
     def sanitize_filename(self, name):
         """Заменяет запрещённые символы на _"""
-        for char in INVALID_FILENAME_CHARS:
-            name = name.replace(char, '_')
-        return name.strip()
+        return sanitize_filename(name)
 
     def reset_filename(self):
         """Сбросить имя файла на значение по умолчанию"""
@@ -254,7 +243,7 @@ class CableLabelApp:
         )
 
         # Excel файл
-        ttk.Label(frame, text="Excel файл:").grid(row=1, column=0, sticky="w", pady=5)
+        ttk.Label(frame, text="Журналы:").grid(row=1, column=0, sticky="w", pady=5)
         ttk.Entry(frame, textvariable=self.input_file, width=40).grid(row=1, column=1, padx=5, pady=5)
         ttk.Button(frame, text="Обзор", command=self.browse_input).grid(row=1, column=2, padx=5)
 
@@ -331,6 +320,20 @@ class CableLabelApp:
                 validatecommand=validate_cmd
         ).grid(row=8, column=1, sticky="w", padx=(0, 10))
 
+        # Профиль принтера: выбор подставляет компенсацию, «Сохранить» запоминает текущую
+        self.printer_combo = ttk.Combobox(
+                frame,
+                textvariable=self.printer_var,
+                values=list(load_profiles()["printers"]),
+                width=12
+        )
+        self.printer_combo.grid(row=7, column=2, sticky="w", pady=(15, 5))
+        self.printer_combo.bind("<<ComboboxSelected>>", self.load_printer)
+        printer_buttons = ttk.Frame(frame)
+        printer_buttons.grid(row=8, column=2, sticky="w")
+        ttk.Button(printer_buttons, text="Сохранить", command=self.save_printer).pack(side="left")
+        ttk.Button(printer_buttons, text="Калибровка", command=self.calibrate).pack(side="left", padx=(5, 0))
+
         # Подпишемся на изменения
         self.printer_offset_x.trace_add('write', self.update_offsets)
         self.printer_offset_y.trace_add('write', self.update_offsets)
@@ -338,18 +341,82 @@ class CableLabelApp:
         # Подсказка
         offset_hint = ttk.Label(
                 frame,
-                text="Смещение применяется только на обратной стороне\nИспользуйте переплет по длинному краю ",
+                text=(
+                        "Смещение применяется только на обратной стороне\nИспользуйте переплет по длинному краю "
+                        "\nКалибровка — лист со шкалами: показания прибавьте к компенсации и сохраните профиль"
+                ),
                 font=("Arial", 8),
                 foreground="gray"
         )
         offset_hint.grid(row=9, column=0, columnspan=4, sticky="w", pady=(0, 10))
 
-        # Кнопка генерации
-        ttk.Button(frame, text="Создать PDF", command=self.generate).grid(row=10, column=0, columnspan=3, pady=10)
+        # Ограничение количества
+        ttk.Label(frame, text="Макс. бирок на строку:").grid(row=10, column=0, sticky="w", pady=5)
+        ttk.Entry(
+                frame,
+                textvariable=self.max_qty_var,
+                width=8,
+                validate='key',
+                validatecommand=(self.root.register(str.isdigit), '%S')
+        ).grid(row=10, column=1, sticky="w", padx=(0, 10))
+
+        # Параллельный рендеринг
+        ttk.Label(frame, text="Процессов рендеринга:").grid(row=11, column=0, sticky="w", pady=5)
+        ttk.Entry(
+                frame,
+                textvariable=self.workers_var,
+                width=8,
+                validate='key',
+                validatecommand=(self.root.register(str.isdigit), '%S')
+        ).grid(row=11, column=1, sticky="w", padx=(0, 10))
+
+        # Деление вывода на тома (0 — один файл)
+        ttk.Label(frame, text="Листов в томе (0 — один PDF):").grid(row=12, column=0, sticky="w", pady=5)
+        ttk.Entry(
+                frame,
+                textvariable=self.volume_sheets_var,
+                width=8,
+                validate='key',
+                validatecommand=(self.root.register(str.isdigit), '%S')
+        ).grid(row=12, column=1, sticky="w", padx=(0, 10))
+
+        # Шаблон листа: размер, сетка и шрифты (A4 5×5 по умолчанию)
+        ttk.Label(frame, text="Шаблон листа:").grid(row=13, column=0, sticky="w", pady=5)
+        ttk.Combobox(
+                frame,
+                textvariable=self.template_var,
+                values=list(TEMPLATES),
+                width=12,
+                state="readonly"
+        ).grid(row=13, column=1, sticky="w", padx=(0, 10))
+        ttk.Checkbutton(
+                frame,
+                text="Через сервер печати",
+                variable=self.server_var
+        ).grid(row=13, column=2, sticky="w", pady=5)
+
+        # Инкрементальная генерация (кэш листов рядом с PDF)
+        ttk.Checkbutton(
+                frame,
+                text="Перерисовать только изменённые листы",
+                variable=self.incremental_var
+        ).grid(row=14, column=0, columnspan=2, sticky="w", pady=5)
+        ttk.Checkbutton(
+                frame,
+                text="Все листы книги",
+                variable=self.all_sheets_var
+        ).grid(row=14, column=2, sticky="w", pady=5)
+
+        # Кнопки генерации и остановки
+        self.generate_button = ttk.Button(frame, text="Создать PDF", command=self.generate)
+        self.generate_button.grid(row=15, column=0, columnspan=2, pady=10)
+        self.cancel_button = ttk.Button(frame, text="Отмена", command=self.cancel)
+        self.cancel_button.grid(row=15, column=2, pady=10)
+        self.cancel_button.state(["disabled"])
 
         # Прогресс бар
         self.progress = ttk.Progressbar(frame, mode="determinate")
-        self.progress.grid(row=11, column=0, columnspan=3, pady=10, sticky="ew")
+        self.progress.grid(row=16, column=0, columnspan=3, pady=10, sticky="ew")
 
         # Подпись компании — в левый нижний угол
         copyright_label = tk.Label(
@@ -360,7 +427,7 @@ class CableLabelApp:
                 bg="#2e2e2e",  # Совпадает с фоном (для тёмной темы)
                 anchor="w"
         )
-        copyright_label.grid(row=12, column=0, columnspan=2, sticky="w", pady=(10, 0))
+        copyright_label.grid(row=17, column=0, columnspan=2, sticky="w", pady=(10, 0))
 
     def validate_float_input(self, value_if_allowed):
         """
@@ -397,11 +464,86 @@ class CableLabelApp:
         except:
             self._line_width = 5.0
 
+        try:
+            q_val = self.max_qty_var.get().strip()
+            self._max_qty = max(int(q_val), 1) if q_val else MAX_QUANTITY
+        except ValueError:
+            self._max_qty = MAX_QUANTITY
+
+        try:
+            n_val = self.workers_var.get().strip()
+            self._workers = min(max(int(n_val), 1), os.cpu_count() or 1) if n_val else RENDER_WORKERS
+        except ValueError:
+            self._workers = RENDER_WORKERS
+
+        try:
+            v_val = self.volume_sheets_var.get().strip()
+            self._volume_sheets = int(v_val) if v_val else 0
+        except ValueError:
+            self._volume_sheets = 0
+
+    def load_printer(self, *args):
+        """Подставляет компенсацию выбранного профиля принтера"""
+        _, profile = get_profile(self.printer_var.get())
+        self.printer_offset_x.set(str(profile["offset_x"]))
+        self.printer_offset_y.set(str(profile["offset_y"]))
+
+    def save_printer(self):
+        """Сохраняет текущую компенсацию под именем принтера и делает профиль профилем по умолчанию"""
+        name = self.printer_var.get().strip()
+        if not name:
+            messagebox.showwarning("Предупреждение", "Введите имя принтера.")
+            return
+        try:
+            save_profile(name, self._offset_x, self._offset_y)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Профиль не сохранён:\n{e}")
+            return
+        self.printer_combo["values"] = list(load_profiles()["printers"])
+        messagebox.showinfo(
+                "Профиль сохранён",
+                f"Принтер «{name}»: X={self._offset_x:+.2f} мм, Y={self._offset_y:+.2f} мм\n"
+                "Компенсация будет подставляться при следующих запусках."
+        )
+
+    def calibrate(self):
+        """Калибровочный лист с текущей компенсацией и шаблоном в папку сохранения"""
+        if not self.output_dir.get():
+            messagebox.showerror("Ошибка", "Укажите папку сохранения!")
+            return
+        name = self.printer_var.get().strip()
+        filename = f"calibration_{self.sanitize_filename(name)}.pdf" if name else "calibration.pdf"
+        output_path = os.path.join(self.output_dir.get(), filename)
+        try:
+            render_calibration(
+                    output_path, self._offset_x, self._offset_y, TEMPLATES[self.template_var.get()], name or None
+            )
+        except Exception as e:
+            logger.exception("🚨 Калибровочный лист не создан")
+            messagebox.showerror("Ошибка", f"Ошибка: {e}")
+            return
+        messagebox.showinfo(
+                "Калибровка",
+                f"Калибровочный лист сохранён:\n{output_path}\n\n"
+                "Напечатайте его с двух сторон (переплёт по длинному краю), посмотрите на просвет "
+                "и прибавьте показания шкал к компенсации X и Y."
+        )
+
     def browse_input(self):
-        """Выбор Excel файла"""
-        file = filedialog.askopenfilename(title="Выберите Excel", filetypes=[("Excel", "*.xlsx")])
-        if file:
-            self.input_file.set(file)
+        """Выбор журналов: Excel, CSV или Parquet (можно несколько)"""
+        files = filedialog.askopenfilenames(
+                title="Выберите журналы",
+                filetypes=[
+                        ("Журналы", "*.xlsx *.csv *.parquet"),
+                        ("Excel", "*.xlsx"),
+                        ("CSV", "*.csv"),
+                        ("Parquet", "*.parquet"),
+                ]
+        )
+        # Несколько журналов — через '; ', бирки всех файлов идут подряд в одном PDF
+        if files:
+            self.input_file.set(INPUT_SEPARATOR.join(files))
+        for file in files:
             # Получаем информацию о файле
             file_size = os.path.getsize(file)  # Размер в байтах
             file_time = datetime.fromtimestamp(
@@ -421,7 +563,7 @@ class CableLabelApp:
             logger.info(f"📁 Выбрана папка для сохранения по пути: {folder}")
 
     def generate(self):
-        """Основная логика генерации PDF"""
+        """Проверяет параметры и запускает генерацию PDF в фоновом потоке"""
         input_path = self.input_file.get()
         output_dir = self.output_dir.get()
 
@@ -431,69 +573,6 @@ class CableLabelApp:
             return
 
         try:
-            wb = openpyxl.load_workbook(input_path)
-            ws = wb.active
-            headers = [cell.value for cell in ws[1]]
-
-            # Поиск индексов столбцов
-            system_idx = find_column(headers, "system", "Подсистема", "Система")
-            track_idx = find_column(headers, "track", "Трасса", "Обозначение")
-            cable_idx = find_column(headers, "cable", "Кабель")
-            length_idx = find_column(headers, "length", "Длина")
-            quantity_idx = find_column(headers, "quantity", "Количество", "Кол-во")
-            list_idx = [system_idx, track_idx, cable_idx, length_idx, quantity_idx]
-
-            headers_not_none = [item for item in headers if item is not None]
-            border = '-'
-            border_headers_not_none = 0 + 28
-            for header in headers_not_none:
-                len_header = len(header)
-                border_headers_not_none += len_header
-
-            logging.info(
-                f"🚀 Загруженный файл excel имеет заголовки:\n"
-                f"{border * border_headers_not_none}\n"
-                f"| {headers_not_none} |\n"
-                f"{border * border_headers_not_none}\n"
-                )
-
-            if None in (system_idx, track_idx, cable_idx, length_idx, quantity_idx):
-                if None in list_idx:
-                    for i, idx in enumerate(list_idx):
-                        if idx is None:
-                            list_idx[i] = f"{i + 1} (не найден)"
-                        elif idx is not None:
-                            list_idx[i] = f"{i + 1} ({headers[idx]})"
-                messagebox.showerror(
-                        "Ошибка", "Не найдены необходимые столбцы!"
-                                  "\nПроверьте Excel файл и повторите попытку.\n"
-                                  f"\nНайденные столбцы:\n {list_idx}\n"
-                                  f"Не забудьте сохранить файл после редактирования!"
-                )
-                logging.error(f"🚨 Ошибка: Не найдены необходимые столбцы!\n")
-
-                return
-
-            data = []
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                system = str(row[system_idx] or "").strip()
-                track = str(row[track_idx] or "").strip()
-                cable = str(row[cable_idx] or "").strip()
-                length_val = str(row[length_idx] or "").strip()
-                try:
-                    qty = int(row[quantity_idx])
-                except:
-                    qty = 1
-                for _ in range(qty):
-                    data.append(
-                            {
-                                    "system": system,
-                                    "track": track,
-                                    "cable": cable,
-                                    "length": length_val
-                            }
-                    )
-
             # Получаем имя файла от пользователя
             file_name = self.output_name.get().strip()
             if not file_name.endswith(".pdf"):
@@ -522,287 +601,139 @@ class CableLabelApp:
             normalized_path = output_path.replace('\\', '/')
             logger.info(f"📝 Выходной файл pdf сохранен по пути: {normalized_path}")
 
-            # Проверяем, можно ли создать файл
+            # Проверяем, можно ли создать файл (временный — прошлый PDF не трогаем)
             try:
-                with open(output_path, 'w'):
+                with open(partial_path(output_path), 'w'):
                     pass
-                os.remove(output_path)  # чистим тестовый файл
+                os.remove(partial_path(output_path))  # чистим тестовый файл
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Невозможно создать файл:\n{clean_name}\n\n{str(e)}")
                 logger.error(f"🚨 Ошибка при создании файла: {str(e)}")
                 return
 
-            c = canvas.Canvas(output_path, pagesize=A4)
-            c.setFont("Times-Bold", 12)
-
-            index = 0
-            total_sides = len(data) * 2
-            self.progress["maximum"] = total_sides
+            # Параметры фиксируются до запуска — поток не обращается к Tk
+            options = {
+                    "line_width": self._line_width,
+                    "offset_x": self._offset_x,
+                    "offset_y": self._offset_y,
+                    "max_qty": self._max_qty,
+                    "workers": self._workers,
+                    "incremental": self.incremental_var.get(),
+                    "sheets": ALL_SHEETS if self.all_sheets_var.get() else None,
+                    "volume_sheets": self._volume_sheets or None,
+                    "template": self.template_var.get(),
+                    # Повторная генерация с теми же данными и настройками — копия из кэша
+                    "cache_dir": CACHE_DIR,
+            }
             self.progress["value"] = 0
-
-            while index < len(data):
-                # Лицевая сторона
-                self.draw_page(c, data, index, side='front')
-                c.showPage()
-                self.progress["value"] += 1
-
-                # Обратная сторона
-                self.draw_page(c, data, index, side='back')
-                if index + MAX_COLS * MAX_ROWS < len(data):
-                    c.showPage()
-                self.progress["value"] += 1
-
-                index += MAX_COLS * MAX_ROWS
-
-            c.save()
-            messagebox.showinfo("Готово", f"PDF сохранён:\n{output_path}")
-            logger.info(f"📝 Выходной файл pdf сохранен по пути: {normalized_path}")
+            self.generate_button.state(["disabled"])
+            self.cancel_button.state(["!disabled"])
+            self._cancel_event.clear()
+
+            self._worker = threading.Thread(
+                    target=self._generate_worker,
+                    args=(self._input_paths(input_path), output_path, options, self.server_var.get()),
+                    daemon=True
+            )
+            self._worker.start()
+            self.root.after(POLL_INTERVAL_MS, self._poll_worker)
 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка: {str(e)}")
             logger.error(f"🚨 Ошибка: {str(e)}")
 
-    def draw_page(self, c, data, start_index, side):
-        """
-        Рисует одну страницу с этикетками.
-        :param c: объект canvas (PDF)
-        :param data: список данных
-        :param start_index: с какого элемента начинать
-        :param side: 'front' или 'back'
-        """
-        col_step = TRIANGLE_BASE / 2
-        x_centers_original = [45 * mm, 75 * mm, 105 * mm, 135 * mm, 165 * mm]
-        Y_START = 76.5 * mm
-
-        # Компенсация принтера — только на обратной стороне
-        shift_x = self._offset_x * mm if side == 'back' else 0
-        shift_y = self._offset_y * mm if side == 'back' else 0
-
-        # Для обратной стороны — отзеркаливаем X координаты
-        count = 0
-        for i in range(start_index, min(start_index + MAX_COLS * MAX_ROWS, len(data))):
-            item = data[i]
-            col = count % MAX_COLS
-            row = count // MAX_COLS
-
-            if row >= MAX_ROWS:
-                break
-
-            # Базовая координата X (для лицевой стороны)
-            center_x_base = x_centers_original[col]
-
-            # Для обратной стороны — отзеркаливаем относительно центра листа
-            if side == 'back':
-                center_x = PAGE_WIDTH - center_x_base + shift_x
-                # center_x = x_centers_original[col] + shift_x
-            else:
-                center_x = center_x_base + shift_x
-
-            # y_base = Y_START + row * TRIANGLE_HEIGHT
-            y_base = Y_START + row * TRIANGLE_HEIGHT + shift_y
-            is_upside_down = col % 2 == 1
+    @staticmethod
+    def _input_paths(value):
+        """Путь из поля «Журналы» или список путей, если выбрано несколько файлов"""
+        paths = [path.strip() for path in value.split(INPUT_SEPARATOR.strip()) if path.strip()]
+        return paths[0] if len(paths) == 1 else paths
 
-            if side == 'front':
-                main_text = item["system"]
-                sub_text = item["track"]
-                main_font = FONT_SYSTEM
-                sub_font = FONT_TRACK
-            else:
-                main_text = item["cable"]
-                raw_length = str(item["length"]).strip()
-                sub_text = f"L={raw_length} м" if raw_length.replace('.', '').isdigit() else raw_length
-                main_font = FONT_CABLE
-                sub_font = FONT_LENGTH
-
-            self.draw_triangle(
-                    c, center_x, y_base, is_upside_down, main_text, sub_text,
-                    main_font, sub_font, side
-            )
+    def cancel(self):
+        """Останавливает генерацию после текущего листа"""
+        if self._worker is not None and self._worker.is_alive():
+            self._cancel_event.set()
+            self.cancel_button.state(["disabled"])
+            logger.info("⏹ Запрошена остановка генерации")
 
-            count += 1
-
-    def draw_triangle(
-            self, c, center_x, y_base, upside_down, main_text, sub_text,
-            main_font_size, sub_font_size, side
-    ):
+    def _generate_worker(self, input_path, output_path, options, use_server=False):
         """
-        Рисует один треугольник с текстом.
-        :param c: canvas
-        :param center_x: X центра основания
-        :param y_base: Y основания (зависит от ориентации)
-        :param upside_down: True если треугольник остриём вниз
-        :param main_text: основной текст (system/cable)
-        :param sub_text: подзаголовок (track/length)
-        :param main_font_size: размер шрифта основного текста
-        :param sub_font_size: размер шрифта подзаголовка
-        :param side: 'front' или 'back'
+        Фоновый поток: чтение Excel, отрисовка и сохранение PDF.
+        Состояние передаётся в GUI только через очередь self._events.
+        :param options: параметры generate_pdf (толщина контура, смещения, ...)
+        :param use_server: отправить задание серверу печати и следить за его прогрессом
         """
+        events = self._events
 
-        if not main_text.strip() and not sub_text.strip():
-            return
-
-        base = TRIANGLE_BASE
-        height = TRIANGLE_HEIGHT
-        x_left = center_x - base / 2
-        x_right = center_x + base / 2
+        def progress(done, total):
+            events.put(("progress", done, total))
 
-        # Определяем вершины треугольника
-        if upside_down:
-            points = [(x_left, y_base), (x_right, y_base), (center_x, y_base - height)]
-        else:
-            points = [(x_left, y_base - height), (x_right, y_base - height), (center_x, y_base)]
-
-        # Рисуем контур
-        c.setLineWidth(self._line_width)
-
-        c.setStrokeColorRGB(0, 0, 0)
-        c.lines(
-                [
-                        (points[0][0], points[0][1], points[1][0], points[1][1]),
-                        (points[1][0], points[1][1], points[2][0], points[2][1]),
-                        (points[2][0], points[2][1], points[0][0], points[0][1])
-                ]
-        )
-
-        # Относительные смещения текста от основания
-        dy_main = height * 0.35  # Основной текст ближе к центру
-        dy_sub = height * 0.1  # Подзаголовок у основания
-
-        c.saveState()
-
-        if upside_down:
-            # Поворачиваем вокруг центра основания
-            c.translate(center_x, y_base)
-            c.rotate(180)
-            c.translate(-center_x, -y_base)
-            y_main = y_base + dy_main
-            y_sub = y_base + dy_sub
-        else:
-            base_y = y_base - height
-            y_main = base_y + dy_main
-            y_sub = base_y + dy_sub
-
-        # --- ОСНОВНОЙ ТЕКСТ (system или cable) ---
-        lines = []
-
-        if side == 'back':  # Это обратная сторона — cable
-            parts = split_cable_text(main_text)
-            line1, line2 = parts[0], parts[1]
-            lines = [line1, line2]
-
-            # Шрифт для первой строки — всегда FONT_CABLE (16)
-            fs_line1 = FONT_CABLE
-
-            # Шрифт для второй строки — уменьшаем, если длинная
-            if len(line2) >= 15:
-                fs_line2 = 12
-            elif len(line2) >= 10:
-                fs_line2 = 14
-            else:
-                fs_line2 = FONT_CABLE  # 16
-
-            # Позиции строк (ваш идеальный центр)
-            y_upper = y_main - fs_line1 * 0.5
-            y_lower = y_main + fs_line2 * 0.5
-            y_positions = [y_lower, y_upper]  # первая строка выше, вторая ниже
-
-            # Рисуем каждую строку отдельно
-            c.setFont("Times-Bold", fs_line1)
-            try:
-                tw1 = pdfmetrics.stringWidth(line1, "Times-Bold", fs_line1)
-            except:
-                tw1 = len(line1) * fs_line1 * 0.6
-            x_pos1 = center_x - tw1 / 2
-            c.drawString(x_pos1, y_positions[0], line1)  # первая строка
-
-            c.setFont("Times-Bold", fs_line2)
-            try:
-                tw2 = pdfmetrics.stringWidth(line2, "Times-Bold", fs_line2)
-            except:
-                tw2 = len(line2) * fs_line2 * 0.6
-            x_pos2 = center_x - tw2 / 2
-            c.drawString(x_pos2, y_positions[1], line2)  # вторая строка
-
-        else:  # Лицевая сторона — system
-            lines = [main_text]
-            if len(main_text) >= 8:
-                fs = 16
+        try:
+            if use_server:
+                job_id = submit_job(input_path, output_path, options, SERVER_URL)
+                logger.info(f"📥 Задание {job_id} отправлено на сервер печати {SERVER_URL}")
+                wait_job(job_id, SERVER_URL, progress=progress, cancel=self._cancel_event)
             else:
-                fs = FONT_SYSTEM
-
-            if fs < MIN_FONT_SIZE:
-                fs = MIN_FONT_SIZE
-
-            y_positions = [y_main]
-
-            c.setFont("Times-Bold", fs)
-            for j, line in enumerate(lines):
-                try:
-                    tw = pdfmetrics.stringWidth(line, "Times-Bold", fs)
-                except:
-                    tw = len(line) * fs * 0.6
-                x_pos = center_x - tw / 2
-                y_pos = y_positions[j]
-                c.drawString(x_pos, y_pos, line)
-
-        # --- ПОДЗАГОЛОВОК (track или length) ---
-        max_chars_per_line = 28  # Подобрано под 60 мм и font=14
-        if side == 'front' and len(sub_text) == 18:
-            track_font_size = 13.5
-            max_chars_per_line = 33  # При меньшем шрифте — можно больше символов
-        elif side == 'front' and len(sub_text) == 19:
-            track_font_size = 13
-            max_chars_per_line = 33  # При меньшем шрифте — можно больше символов
-        elif side == 'front' and len(sub_text) >= 20:
-            track_font_size = 11.5
-            max_chars_per_line = 39  # При меньшем шрифте — можно больше символов
-        else:
-            track_font_size = sub_font_size  # 14
-
-        # Разбивка на 2 строки по длине
-        max_len = 30 if track_font_size > 12 else 38
-        line1 = sub_text[:max_len].strip()
-        line2 = sub_text[max_len:max_len * 2].strip()
-
-        lines = []
-        if line1:
-            lines.append(line1)
-        if line2:
-            lines.append(line2)
-
-        # Устанавливаем шрифт
-        c.setFont("Times-Bold", track_font_size)
-
-        line_height = track_font_size * 1.5
-
-        for j, line in enumerate(lines):
-            if not line.strip():
-                continue
+                generate_pdf(input_path, output_path, progress=progress, cancel=self._cancel_event, **options)
+            # При делении на тома — путь первого тома
+            if options.get("volume_sheets"):
+                output_path = volume_path(output_path, 1) + ", ..."
+            events.put(("done", output_path))
+        except MissingColumnsError as e:
+            events.put(("columns", e.found))
+        except GenerationCancelled:
+            events.put(("cancelled",))
+        except Exception as e:
+            events.put(("error", str(e)))
 
-        # ⚡️ Реальная ширина через stringWidth
+    def _poll_worker(self):
+        """Обрабатывает события фонового потока и перезапускает опрос через root.after"""
+        finished = False
         try:
-            tw = pdfmetrics.stringWidth(line, "Times-Bold", track_font_size)
-            # print(f"📏 Точная ширина: '{line}' → {tw:.1f} pt")
-        except:
-            # Fallback: улучшенная оценка с коэффициентом для кириллицы
-            # Коэффициент 0.65 вместо 0.55 — лучше для широких букв
-            estimated_width_per_char = {
-                    'Ш': 1.2, 'Щ': 1.2, 'Ж': 1.15, 'Д': 1.1, 'П': 1.05,
-                    'А': 0.9, 'В': 0.95, 'Е': 0.9, 'К': 0.95, 'Х': 0.9
-            }
-            total_width = 0
-            for char in line.upper():
-                total_width += estimated_width_per_char.get(char, 1.0)
-            tw = total_width * track_font_size * 0.58
-
-        x_pos = center_x - tw / 2
-        y_pos = y_sub - j * line_height
-        c.drawString(x_pos, y_pos, line)
-
-        c.restoreState()
+            while True:
+                event = self._events.get_nowait()
+                kind = event[0]
+                if kind == "progress":
+                    _, done, total = event
+                    self.progress["maximum"] = max(total, 1)
+                    self.progress["value"] = done
+                elif kind == "done":
+                    finished = True
+                    output_path = event[1]
+                    normalized_path = output_path.replace('\\', '/')
+                    messagebox.showinfo("Готово", f"PDF сохранён:\n{output_path}")
+                    logger.info(f"📝 Выходной файл pdf сохранен по пути: {normalized_path}")
+                elif kind == "cancelled":
+                    finished = True
+                    self.progress["value"] = 0
+                    messagebox.showinfo("Остановлено", "Генерация PDF остановлена.")
+                    logger.info("⏹ Генерация остановлена пользователем")
+                elif kind == "columns":
+                    finished = True
+                    messagebox.showerror(
+                            "Ошибка", "Не найдены необходимые столбцы!"
+                                      "\nПроверьте Excel файл и повторите попытку.\n"
+                                      f"\nНайденные столбцы:\n {event[1]}\n"
+                                      f"Не забудьте сохранить файл после редактирования!"
+                    )
+                    logging.error(f"🚨 Ошибка: Не найдены необходимые столбцы!\n")
+                elif kind == "error":
+                    finished = True
+                    messagebox.showerror("Ошибка", f"Ошибка: {event[1]}")
+                    logger.error(f"🚨 Ошибка: {event[1]}")
+        except queue.Empty:
+            pass
+
+        if finished:
+            self.generate_button.state(["!disabled"])
+            self.cancel_button.state(["disabled"])
+            self._worker = None
+        else:
+            self.root.after(POLL_INTERVAL_MS, self._poll_worker)
 
 
 if __name__ == "__main__":
+    # Нужно для пула процессов в собранном exe
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = CableLabelApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Перечень бирок готового вывода (манифест): где на каком листе и в какой ячейке
+напечатана каждая бирка и из какой строки журнала она взята.
+
+Пишется рядом с выводом под его именем без расширения — <имя>.manifest.csv (разделитель «;»,
+UTF-8 с BOM для Excel) или <имя>.manifest.jsonl. По строке на каждую сторону бирки: лицевая
+(подсистема, трасса) и обратная (кабель, длина) — на разных страницах. Файл и страница —
+те, где сторона действительно напечатана (том, TIFF, PNG стороны). Пустые ячейки упаковки не попадают.
+"""
+import os
+import csv
+import json
+
+MANIFEST_FORMATS = ("csv", "jsonl")
+MANIFEST_FIELDS = ("sheet", "file", "page", "side", "slot", "system", "track", "cable", "length", "source", "row")
+
+
+def manifest_path(output_path, fmt):
+    """Манифест вывода — по имени без расширения: journal.pdf → journal.manifest.csv"""
+    return f"{os.path.splitext(output_path)[0]}.manifest.{fmt}"
+
+
+def manifest_rows(data, per_page, files, locations):
+    """
+    Строки манифеста по порядку страниц (генератор — бирки не разворачиваются в память).
+    Лист — сквозной номер, страница — в файле стороны; номера с 1. Ячейка обратной стороны
+    та же, что и лицевой (на листе она зеркальна).
+    :param data: LabelSequence в порядке печати
+    :param files: имена файлов вывода (selection.page_locations)
+    :param locations: файл и страницы каждого листа (selection.page_locations)
+    """
+    for start in range(0, len(data), per_page):
+        sheet = start // per_page + 1
+        part = data.slice(start, start + per_page)
+        front_file, front_page, back_file, back_page = locations[sheet - 1]
+        for file, page, side in ((front_file, front_page, "front"), (back_file, back_page, "back")):
+            slot = 0
+            for record in part.records:
+                for _ in range(record.qty):
+                    slot += 1
+                    if record.row is None:
+                        continue
+                    yield (
+                            sheet, files[file], page, side, slot, record.system, record.track, record.cable, record.length,
+                            record.source, record.row,
+                    )
+
+
+def write_manifest(data, per_page, files, locations, output_path, fmt="csv"):
+    """
+    Записывает манифест рядом с выводом.
+    :param files: имена файлов вывода (selection.page_locations)
+    :param locations: файл и страницы каждого листа (selection.page_locations)
+    :param fmt: 'csv' или 'jsonl'
+    :return: путь к манифесту
+    :raises ValueError: если формат неизвестен
+    """
+    if fmt not in MANIFEST_FORMATS:
+        raise ValueError(f"Неизвестный формат манифеста: {fmt}")
+    path = manifest_path(output_path, fmt)
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(MANIFEST_FIELDS)
+            writer.writerows(manifest_rows(data, per_page, files, locations))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            for row in manifest_rows(data, per_page, files, locations):
+                f.write(json.dumps(dict(zip(MANIFEST_FIELDS, row)), ensure_ascii=False))
+                f.write("\n")
+    return path
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+# Цель холодного старта собранного --onefile exe (распаковка + окно готово), секунды
+STARTUP_TARGET_SECONDS = 3.0
+RUNS = 5
+
+
+def measure(exe_path, runs=RUNS):
+    """
+    Запускает exe в режиме замера (CABLE_SIGNS_STARTUP_PROBE=1): окно закрывается
+    сразу после первой отрисовки. Время считается снаружи — вместе с распаковкой onefile.
+    """
+    env = dict(os.environ, CABLE_SIGNS_STARTUP_PROBE="1")
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([exe_path], env=env, capture_output=True, text=True, timeout=60)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"❌ Run {i + 1}: exit code {result.returncode}")
+            print(result.stderr)
+            sys.exit(1)
+        timings.append(elapsed)
+        print(f"Run {i + 1}: {elapsed:.2f} s")
+    return timings
+
+
+if __name__ == '__main__':
+    exe = sys.argv[1] if len(sys.argv) > 1 else os.path.join('dist', 'main.exe')
+    if not os.path.exists(exe):
+        print(f"Executable not found: {exe}")
+        sys.exit(1)
+
+    timings = measure(exe)
+    median = statistics.median(timings)
+    print(f"\nCold start (first run): {timings[0]:.2f} s")
+    print(f"Median: {median:.2f} s, target: {STARTUP_TARGET_SECONDS:.2f} s")
+
+    if timings[0] > STARTUP_TARGET_SECONDS:
+        print("❌ Startup target exceeded!")
+        sys.exit(1)
+    print("✅ Startup within target")
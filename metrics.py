@@ -0,0 +1,128 @@
+"""
+Замеры заданий генерации: длительность этапов и листов, счётчики, итог в JSON Lines.
+Дёшево (только perf_counter и сложения) — можно оставлять включённым в работе.
+"""
+import os
+import json
+import time
+import logging
+import cProfile
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from appdata import data_path
+
+logger = logging.getLogger(__name__)
+
+# Файл итогов заданий (одна JSON-строка на задание) — в папке данных пользователя;
+# переопределяется CABLE_SIGNS_METRICS (пустое значение — не писать)
+METRICS_FILE = os.environ.get("CABLE_SIGNS_METRICS", data_path("metrics.jsonl"))
+
+
+class JobMetrics:
+    """Счётчики и таймеры одного задания"""
+
+    def __init__(self, job=None):
+        """
+        :param job: имя задания (обычно путь к входному файлу)
+        """
+        self.job = job
+        self.started = datetime.now()
+        self.timers = defaultdict(float)  # Имя этапа → секунды
+        self.counters = defaultdict(int)  # Имя счётчика → значение
+        self.page_times = []  # Длительность каждого листа (лицевая + обратная), секунды
+
+    @contextmanager
+    def stage(self, name):
+        """Замер этапа: with metrics.stage('render'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def add_time(self, name, seconds, count=1):
+        """Добавляет время к таймеру и увеличивает одноимённый счётчик вызовов"""
+        self.timers[name] += seconds
+        self.counters[name] += count
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def page(self, seconds):
+        """Время одного листа"""
+        self.page_times.append(seconds)
+
+    def snapshot(self):
+        """Состояние в виде простых типов — для передачи из процесса пула"""
+        return {
+                "timers": dict(self.timers),
+                "counters": dict(self.counters),
+                "page_times": list(self.page_times),
+        }
+
+    def merge(self, snapshot):
+        """Добавляет замеры из snapshot() другого процесса"""
+        for name, seconds in snapshot["timers"].items():
+            self.timers[name] += seconds
+        for name, value in snapshot["counters"].items():
+            self.counters[name] += value
+        self.page_times.extend(snapshot["page_times"])
+
+    def summary(self, **extra):
+        """
+        Итог задания для JSON Lines.
+        :param extra: дополнительные поля (labels, bytes_written, font_cache, ...)
+        """
+        pages = sorted(self.page_times)
+        total = self.timers.get("total", sum(self.timers.values()))
+        labels = extra.get("labels")
+        result = {
+                "job": self.job,
+                "started": self.started.isoformat(timespec="seconds"),
+                "stages": {name: round(seconds, 4) for name, seconds in self.timers.items()},
+                "counters": dict(self.counters),
+                "pages": {
+                        "count": len(pages),
+                        "mean_ms": round(sum(pages) / len(pages) * 1000, 2) if pages else None,
+                        "p95_ms": round(pages[min(len(pages) - 1, int(len(pages) * 0.95))] * 1000, 2)
+                        if pages else None,
+                        "max_ms": round(pages[-1] * 1000, 2) if pages else None,
+                },
+                "labels_per_second": round(labels / total, 1) if labels and total else None,
+        }
+        result.update(extra)
+        return result
+
+
+def emit(summary, path=METRICS_FILE):
+    """Дописывает итог задания одной JSON-строкой"""
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    except OSError as e:
+        # Замеры не должны ронять генерацию
+        logger.warning(f"⚠️ Не удалось записать замеры в {path}: {e}")
+
+
+@contextmanager
+def profiled(path):
+    """
+    Профилирование cProfile по запросу: при заданном path профиль сохраняется
+    в файл (смотреть через python -m pstats или snakeviz).
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"🔬 Профиль сохранён: {path}")
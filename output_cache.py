@@ -0,0 +1,186 @@
+"""
+Кэш готовых файлов (PDF, тома, TIFF/PNG) по содержимому задания.
+
+Ключ — хэш нормализованных бирок (тексты и количество копий) и всех параметров
+отрисовки: толщина контура, смещения, шаблон, шрифт (файл TTF), формат вывода.
+Повторная генерация того же журнала с теми же настройками (допечатка, второй оператор,
+повторная выгрузка) копирует файлы из кэша без отрисовки.
+
+Записи: <папка кэша>/<ключ>/ — файлы вывода и entry.json. Размер кэша ограничен,
+при переполнении удаляются записи, которые дольше всех не использовались.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+
+from appdata import data_path
+
+logger = logging.getLogger(__name__)
+
+# Папка (в папке данных пользователя) и размер кэша; переопределяются CABLE_SIGNS_CACHE и CABLE_SIGNS_CACHE_MB
+CACHE_DIR = data_path("cache", "CABLE_SIGNS_CACHE")
+CACHE_MAX_MB = float(os.environ.get("CABLE_SIGNS_CACHE_MB", 500))
+CACHE_VERSION = 2  # Меняется при изменении формата записи
+ENTRY_FILE = "entry.json"
+
+
+def records_digest(data):
+    """
+    Хэш напечатанного содержимого: тексты обеих сторон и количество копий каждой записи.
+    :param data: LabelSequence
+    """
+    digest = hashlib.sha256()
+    for record in data.records:
+        digest.update(
+                f"{record.system}\x1f{record.track}\x1f{record.cable}\x1f{record.length_text}\x1f{record.qty}\x1e"
+                .encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """Кэш файлов вывода с вытеснением давно не использованных записей (LRU)"""
+
+    def __init__(self, path=CACHE_DIR, max_mb=CACHE_MAX_MB):
+        """
+        :param path: папка кэша
+        :param max_mb: предельный размер кэша, МБ
+        """
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    @staticmethod
+    def key(data, params):
+        """
+        Ключ записи.
+        :param data: LabelSequence — нормализованные бирки
+        :param params: строка параметров отрисовки (всё, от чего зависят байты вывода)
+        """
+        digest = hashlib.sha256(f"{CACHE_VERSION}\x1e{params}\x1e".encode("utf-8"))
+        digest.update(records_digest(data).encode("ascii"))
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.path, key)
+
+    def lookup(self, key):
+        """
+        Запись по ключу; отмечает её использование (для LRU).
+        :return: словарь entry.json или None
+        """
+        entry_path = os.path.join(self._entry_dir(key), ENTRY_FILE)
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry["used"] = time.time()
+        self._write_entry(self._entry_dir(key), entry)
+        return entry
+
+    def restore(self, entry, output_path):
+        """
+        Копирует файлы записи под имя output_path (cable_labels.pdf, cable_labels_001.pdf, ...).
+        :return: список скопированных файлов
+        """
+        stem = os.path.splitext(output_path)[0]
+        outputs = []
+        for suffix in entry["files"]:
+            target = stem + suffix
+            shutil.copyfile(os.path.join(self._entry_dir(entry["key"]), "file" + suffix), target)
+            outputs.append(target)
+        return outputs
+
+    def store(self, key, output_path, outputs, labels):
+        """
+        Сохраняет файлы вывода в кэш и вытесняет старые записи при переполнении.
+        Запись собирается во временной папке и переименовывается — параллельные задания
+        не увидят недописанную запись.
+        :param outputs: файлы вывода; имена начинаются с имени output_path без расширения
+        """
+        stem = os.path.splitext(output_path)[0]
+        suffixes = [path[len(stem):] for path in outputs]
+        size = sum(os.path.getsize(path) for path in outputs)
+        if size > self.max_bytes:
+            logger.info(f"ℹ️ Вывод ({size} байт) больше кэша — не сохраняется")
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=self.path)
+        try:
+            for path, suffix in zip(outputs, suffixes):
+                shutil.copyfile(path, os.path.join(temp_dir, "file" + suffix))
+            now = time.time()
+            self._write_entry(temp_dir, {
+                    "key": key,
+                    "output": os.path.basename(output_path),
+                    "files": suffixes,
+                    "bytes": size,
+                    "labels": labels,
+                    "created": now,
+                    "used": now,
+            })
+            os.replace(temp_dir, self._entry_dir(key))
+        except OSError:
+            # Та же запись уже сохранена другим заданием (или нет места) — кэш не обязателен
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    @staticmethod
+    def _write_entry(entry_dir, entry):
+        with open(os.path.join(entry_dir, ENTRY_FILE), "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+
+    def entries(self):
+        """Записи кэша, недавно использованные первыми"""
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for name in os.listdir(self.path):
+            try:
+                with open(os.path.join(self.path, name, ENTRY_FILE), encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        entries.sort(key=lambda entry: entry["used"], reverse=True)
+        return entries
+
+    def remove(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def evict(self):
+        """
+        Удаляет давно не использованные записи, пока кэш больше предела.
+        :return: количество удалённых записей
+        """
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            entry = entries.pop()
+            self.remove(entry["key"])
+            total -= entry["bytes"]
+            removed += 1
+        if removed:
+            logger.info(f"🧹 Из кэша вытеснено записей: {removed}")
+        return removed
+
+    def purge(self, older_than_days=None):
+        """
+        Очищает кэш.
+        :param older_than_days: удалить только записи, не использованные столько дней (None — все)
+        :return: (записей удалено, байт освобождено)
+        """
+        removed = freed = 0
+        limit = time.time() - older_than_days * 86400 if older_than_days is not None else None
+        for entry in self.entries():
+            if limit is None or entry["used"] < limit:
+                self.remove(entry["key"])
+                removed += 1
+                freed += entry["bytes"]
+        return removed, freed
@@ -0,0 +1,115 @@
+"""
+Упаковка нескольких заданий (журналов, списков допечатки) на общие листы.
+
+Целые листы каждого задания печатаются подряд, а неполные «хвосты» заданий
+раскладываются по общим листам (первый подходящий, от больших к меньшим) —
+хвост задания не разрывается между листами, чтобы его бирки лежали вместе.
+Оставшиеся пустые ячейки заполняются из очереди допечатки.
+"""
+import logging
+
+from engine import LabelRecord, LabelSequence
+
+logger = logging.getLogger(__name__)
+
+FILLER_JOB = "очередь допечатки"  # Имя задания для бирок из очереди
+
+
+def _blank(count):
+    """Пустые ячейки (ничего не рисуется) — дырка в середине последовательности"""
+    return LabelRecord("", "", "", "", count)
+
+
+def pack_jobs(jobs, per_page, filler=None):
+    """
+    Раскладывает задания по листам с минимумом пустых ячеек.
+    :param jobs: список пар (имя задания, LabelSequence)
+    :param per_page: бирок на листе
+    :param filler: LabelSequence очереди допечатки — заполняет пустые ячейки общих листов,
+                   остаток печатается в конце
+    :return: (LabelSequence для отрисовки, отчёт — список словарей по заданиям)
+    """
+    packed = LabelSequence()
+    report = []
+
+    def add(entry, part):
+        """Дописывает часть задания и отмечает занятые ею листы"""
+        first = len(packed) // per_page + 1
+        packed.extend(part)
+        last = -(-len(packed) // per_page)
+        entry["slots"] += len(part)
+        entry["sheets"].update(range(first, last + 1))
+
+    # Целые листы каждого задания
+    tails = []
+    for number, (name, labels) in enumerate(jobs):
+        entry = {"job": name, "labels": len(labels), "slots": 0, "sheets": set()}
+        report.append(entry)
+        full = len(labels) // per_page * per_page
+        if full:
+            add(entry, labels.slice(0, full))
+        if len(labels) > full:
+            tails.append((len(labels) - full, number))
+
+    # Хвосты по общим листам: первый подходящий лист, от больших хвостов к меньшим
+    bins = []  # [свободно ячеек, номера заданий]
+    for size, number in sorted(tails, key=lambda tail: -tail[0]):
+        for sheet in bins:
+            if sheet[0] >= size:
+                sheet[0] -= size
+                sheet[1].append(number)
+                break
+        else:
+            bins.append([per_page - size, [number]])
+    # Самые заполненные листы — первыми, почти пустой — последним
+    bins.sort(key=lambda sheet: sheet[0])
+
+    filler = filler if filler is not None else LabelSequence()
+    filler_entry = {"job": FILLER_JOB, "labels": len(filler), "slots": 0, "sheets": set()}
+    taken = 0
+    for position, (free, numbers) in enumerate(bins):
+        for number in numbers:
+            labels = jobs[number][1]
+            add(report[number], labels.slice(len(labels) // per_page * per_page, len(labels)))
+        if free and taken < len(filler):
+            part = filler.slice(taken, taken + free)
+            add(filler_entry, part)
+            taken += len(part)
+            free -= len(part)
+        if free and position < len(bins) - 1:
+            packed.append(_blank(free))
+
+    if taken < len(filler):
+        add(filler_entry, filler.slice(taken, len(filler)))
+    if len(filler):
+        report.append(filler_entry)
+
+    for entry in report:
+        entry["sheets"] = sorted(entry["sheets"])
+        # Доля бумаги задания в листах: занятые ячейки / ячейки на листе
+        entry["paper"] = round(entry["slots"] / per_page, 2)
+    return packed, report
+
+
+def _format_sheets(sheets):
+    """Номера листов диапазонами: [1, 2, 3, 7] → '1–3, 7'"""
+    runs = []
+    for sheet in sheets:
+        if runs and sheet == runs[-1][1] + 1:
+            runs[-1][1] = sheet
+        else:
+            runs.append([sheet, sheet])
+    return ", ".join(f"{first}–{last}" if last > first else str(first) for first, last in runs) or "—"
+
+
+def log_packing(report, per_page, total_sheets):
+    """Отчёт об упаковке в лог: бумага по заданиям и экономия против печати по отдельности"""
+    separate = 0
+    for entry in report:
+        own = -(-entry["labels"] // per_page)
+        separate += own
+        logger.info(
+                f"🧮 {entry['job']}: {entry['labels']} бирок, бумаги {entry['paper']} л. "
+                f"(листы {_format_sheets(entry['sheets'])}, отдельно было бы {own})"
+        )
+    logger.info(f"🧮 Листов: {total_sheets}, по отдельности: {separate}, экономия: {separate - total_sheets}")
@@ -0,0 +1,214 @@
+"""
+Растровый вывод бирок (многостраничный TIFF или PNG на каждую сторону листа)
+для термотрансферных принтеров. Рисуется Pillow по той же раскладке SheetLayout,
+что и PDF: зеркалирование обратной стороны и компенсация принтера совпадают.
+"""
+import os
+import copy
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from engine import FONT_FILE, GenerationCancelled, LabelRenderer, ensure_font, fit_sub_text
+from templates import DEFAULT_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+RASTER_DPI = 300  # Разрешение по умолчанию
+RASTER_FORMATS = ("tiff", "png")
+RASTER_CHUNK_SHEETS = 8  # Листов в одной части для пула процессов
+
+
+@lru_cache(maxsize=64)
+def _font(size_px):
+    """Шрифт Pillow нужного размера в пикселях (один раз на процесс и размер)"""
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype(FONT_FILE, size_px)
+    except OSError:
+        logger.error(f"🚨 Шрифт {FONT_FILE} не загружен: растровые бирки рисуются встроенным шрифтом")
+        return ImageFont.load_default(size_px)
+
+
+@lru_cache(maxsize=4096)
+def _text_mask(text, size_px):
+    """
+    Маска строки (белым по чёрному) — бирки повторяются, и каждая строка растеризуется
+    один раз на процесс, дальше только накладывается.
+    :return: (маска, маска повёрнутая на 180°, left, top, right, bottom — рамка относительно
+             начала базовой линии)
+    """
+    from PIL import Image, ImageDraw
+
+    font = _font(size_px)
+    left, top, right, bottom = font.getbbox(text, anchor="ls")
+    mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor="ls")
+    return mask, mask.rotate(180), left, top, right, bottom
+
+
+def raster_paths(output_path, fmt, sheets):
+    """
+    Имена выходных файлов.
+    tiff: cable_labels.pdf → cable_labels.tif;
+    png: cable_labels_0001_front.png, cable_labels_0001_back.png, ...
+    """
+    stem = os.path.splitext(output_path)[0]
+    if fmt == "tiff":
+        return [stem + ".tif"]
+    return [f"{stem}_{sheet:04d}_{side}.png" for sheet in range(1, sheets + 1) for side in ("front", "back")]
+
+
+def _render_sheet_chunk(renderer, chunk, png_paths=None):
+    """
+    Рисует листы части в отдельном процессе (на уровне модуля для pickle).
+    :param png_paths: имена PNG сторон части — файлы пишутся здесь же, в процессе пула
+    :return: (стороны (mode, size, bytes) по порядку — пусто, если записаны PNG; время каждого листа)
+    """
+    pages = []
+    times = []
+    per_page = renderer.layout.per_page
+    dpi = (renderer.dpi, renderer.dpi)
+    for number, start in enumerate(range(0, len(chunk), per_page)):
+        page_start = time.perf_counter()
+        for side_number, side in enumerate(("front", "back")):
+            image = renderer.draw_side(chunk, start, side)
+            if png_paths is not None:
+                image.save(png_paths[number * 2 + side_number], format="PNG", dpi=dpi)
+            else:
+                pages.append((image.mode, image.size, image.tobytes()))
+        times.append(time.perf_counter() - page_start)
+    return pages, times
+
+
+class RasterRenderer(LabelRenderer):
+    """Отрисовка листов в растр той же раскладкой, что и PDF"""
+
+    def __init__(self, line_width=5.0, offset_x=0.0, offset_y=0.0, dpi=RASTER_DPI, template=DEFAULT_TEMPLATE):
+        """
+        :param line_width: толщина контура (как в PDF)
+        :param offset_x: компенсация принтера по X на обратной стороне (мм)
+        :param offset_y: компенсация принтера по Y на обратной стороне (мм)
+        :param dpi: разрешение растра
+        :param template: шаблон листа (LabelTemplate)
+        """
+        super().__init__(line_width, offset_x, offset_y, use_forms=False, template=template)
+        self.dpi = dpi
+        self.scale = dpi / 72  # Пикселей в пункте PDF
+
+    def render(self, data, output_path, fmt="tiff", progress=None, cancel=None, workers=1):
+        """
+        Рисует все листы и записывает файлы по мере готовности.
+        :param fmt: 'tiff' — один многостраничный TIFF (сжатие CCITT G4), 'png' — файл на сторону листа
+        :param workers: количество процессов; листы делятся на части по RASTER_CHUNK_SHEETS
+        :return: список записанных файлов
+        :raises GenerationCancelled: если генерация остановлена (записанные файлы удаляются)
+        """
+        from PIL import Image, TiffImagePlugin
+
+        if fmt not in RASTER_FORMATS:
+            raise ValueError(f"Неизвестный растровый формат: {fmt}")
+
+        per_page = self.layout.per_page
+        total_sheets = -(-len(data) // per_page)
+        paths = raster_paths(output_path, fmt, total_sheets)
+        per_chunk = per_page * RASTER_CHUNK_SHEETS
+        starts = range(0, len(data), per_chunk)
+        chunks = (data.slice(start, start + per_chunk) for start in starts)
+        if fmt == "png":
+            # Стороны части: 2 файла на лист, начиная с листа start // per_page
+            chunk_paths = [paths[start // per_page * 2:(start + per_chunk) // per_page * 2] for start in starts]
+        else:
+            chunk_paths = [None] * len(starts)
+        # Замеры собираются здесь — в процессы пула они не передаются
+        worker = copy.copy(self)
+        worker.metrics = None
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=ensure_font) if workers > 1 else None
+        done_sheets = 0
+        try:
+            if executor is not None:
+                # map сохраняет порядок частей; листы внутри части — по порядку
+                results = executor.map(_render_sheet_chunk, [worker] * len(starts), chunks, chunk_paths)
+            else:
+                results = map(_render_sheet_chunk, [worker] * len(starts), chunks, chunk_paths)
+
+            tiff = TiffImagePlugin.AppendingTiffWriter(paths[0], True) if fmt == "tiff" else None
+            try:
+                for pages, times in results:
+                    if self.metrics is not None:
+                        for seconds in times:
+                            self.metrics.page(seconds)
+                    # TIFF дописывается по страницам по мере готовности частей
+                    for mode, size, raw in pages:
+                        Image.frombytes(mode, size, raw).save(
+                                tiff, format="TIFF", compression="group4", dpi=(self.dpi, self.dpi)
+                        )
+                        tiff.newFrame()
+                    done_sheets += len(times)
+                    if progress is not None:
+                        progress(done_sheets * 2, total_sheets * 2)
+                    if cancel is not None and cancel.is_set():
+                        raise GenerationCancelled()
+            finally:
+                if tiff is not None:
+                    tiff.close()
+        except BaseException as e:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if isinstance(e, GenerationCancelled):
+                # Недописанные файлы не оставляем
+                for path in paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+            raise
+        if executor is not None:
+            executor.shutdown()
+
+        logger.info(f"🖼 Растр {fmt.upper()} {self.dpi} dpi: {total_sheets} листов → {paths[0]}")
+        return paths
+
+    def draw_side(self, data, start_index, side):
+        """
+        Рисует одну сторону листа в двухцветное изображение.
+        :return: PIL.Image в режиме '1'
+        """
+        from PIL import Image, ImageDraw
+
+        scale = self.scale
+        width, height = self.layout.pagesize
+        image = Image.new("L", (round(width * scale), round(height * scale)), 255)
+        draw = ImageDraw.Draw(image)
+        line_px = max(1, round(self.line_width * scale))
+
+        for slot, (main_text, sub_text, _, sub_font, main_fit) in zip(
+                self.layout.slots(side), self.page_labels(data, start_index, side)
+        ):
+            if not main_text.strip() and not sub_text.strip():
+                continue
+
+            for x1, y1, x2, y2 in slot.segments:
+                draw.line((self._px(x1, y1), self._px(x2, y2)), fill=0, width=line_px)
+
+            lines = [(slot.y_main, line) for line in main_fit]
+            lines += [(slot.y_sub, line) for line in fit_sub_text(sub_text, side, sub_font, self.layout.fonts)]
+            # Перевёрнутая ячейка: как в PDF, поворот на 180° вокруг (center_x, y_base)
+            pivot_x, pivot_y = self._px(slot.center_x, slot.y_base)
+            for base_y, (text, font_size, dx, dy) in lines:
+                if not text:
+                    continue
+                mask, rotated, left, top, right, bottom = _text_mask(text, font_size * scale)
+                x, y = self._px(slot.center_x + dx, base_y + dy)
+                if slot.upside_down:
+                    image.paste(0, (round(2 * pivot_x - x - right), round(2 * pivot_y - y - bottom)), rotated)
+                else:
+                    image.paste(0, (round(x + left), round(y + top)), mask)
+
+        # Без полутонов — термопринтеру нужен чистый двухцветный растр
+        return image.point(lambda value: 255 if value >= 128 else 0, "1")
+
+    def _px(self, x, y):
+        """Точка PDF (начало внизу слева) → пиксель изображения (начало вверху слева)"""
+        return x * self.scale, (self.layout.page_height - y) * self.scale
@@ -0,0 +1,300 @@
+"""
+Чтение журналов: Excel (.xlsx), CSV и Parquet.
+Все форматы проходят одно определение столбцов (find_column / COLUMN_ALIASES)
+и выдают одинаковые кортежи (row, system, track, cable, length, qty).
+"""
+import io
+import os
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+CSV_ENCODINGS = ("utf-8-sig", "cp1251")  # Выгрузки из 1С и Excel часто в cp1251
+CSV_DELIMITERS = ";,\t"  # Разделители, из которых выбирает csv.Sniffer
+ALL_SHEETS = "*"  # Читать все листы книги
+
+
+def cell_text(value):
+    """Значение ячейки в текст бирки как есть (30.0 из Excel так и печатается — '30.0')"""
+    return str(value or "").strip()
+
+
+def _parquet_text(value):
+    """Значение столбца Parquet в текст; целые числа из float — без '.0' (пустые ячейки дают float-столбец)"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def find_column(headers, *names):
+    """
+    Ищет первый столбец по списку возможных имён.
+    :param headers: список заголовков входного файла
+    :param names: возможные названия столбца
+    :return: индекс столбца или None
+    """
+    # Заголовки бывают не текстом (число или дата в первой строке титульного листа)
+    lower_headers = [str(h).strip().lower() if h is not None else "" for h in headers]
+
+    for name in names:
+        if name.lower() in lower_headers:
+            return lower_headers.index(name.lower())
+
+    return None
+
+
+# Возможные названия столбцов: system, track, cable, length, quantity
+COLUMN_ALIASES = (
+        ("system", "Подсистема", "Система"),
+        ("track", "Трасса", "Обозначение"),
+        ("cable", "Кабель"),
+        ("length", "Длина"),
+        ("quantity", "Количество", "Кол-во"),
+)
+
+
+class MissingColumnsError(Exception):
+    """Не найдены необходимые столбцы во входном файле"""
+
+    def __init__(self, headers, indexes):
+        self.headers = headers
+        self.indexes = indexes
+        # Описание найденных столбцов для сообщения пользователю
+        self.found = [
+                f"{i + 1} ({headers[idx]})" if idx is not None else f"{i + 1} (не найден)"
+                for i, idx in enumerate(indexes)
+        ]
+        super().__init__(f"Не найдены необходимые столбцы: {self.found}")
+
+
+def resolve_columns(headers):
+    """
+    Определяет индексы столбцов system, track, cable, length, quantity.
+    :param headers: список заголовков
+    :return: список из 5 индексов
+    :raises MissingColumnsError: если хотя бы один столбец не найден
+    """
+    indexes = [find_column(headers, *names) for names in COLUMN_ALIASES]
+    if None in indexes:
+        raise MissingColumnsError(headers, indexes)
+    return indexes
+
+
+def read_excel_rows(input_path, sheet=None):
+    """
+    Потоково читает строки Excel без загрузки всей книги в память.
+    Книга открывается в режиме read-only, читаются только нужные столбцы.
+    Столбцы проверяются сразу, строки читаются лениво.
+    :param input_path: путь к .xlsx
+    :param sheet: имя листа (None — активный лист)
+    :return: (total_rows, rows) — оценка числа строк данных и генератор кортежей
+             (row, system, track, cable, length, qty), где row — номер строки в файле,
+             а остальное — исходные значения ячеек (приводятся в normalize_rows)
+    :raises MissingColumnsError: если не найдены необходимые столбцы
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        headers, indexes = _sheet_columns(ws)
+    except Exception:
+        wb.close()
+        raise
+
+    _log_headers(headers, "excel")
+
+    # max_row в read-only режиме берётся из размеров листа и может отсутствовать
+    total_rows = max((ws.max_row or 1) - 1, 0)
+    return total_rows, _iter_sheet_rows(wb, ws, indexes)
+
+
+def read_excel_sheets(input_path, sheets=ALL_SHEETS):
+    """
+    Читает несколько листов книги по очереди; столбцы определяются на каждом листе заново.
+    При чтении всех листов листы без столбцов бирок (титул, спецификация) пропускаются.
+    :param input_path: путь к .xlsx
+    :param sheets: ALL_SHEETS или список имён листов
+    :return: генератор пар (имя листа, генератор строк как у read_excel_rows)
+    :raises MissingColumnsError: если на выбранном листе (или ни на одном листе) нет столбцов
+    :raises ValueError: если выбранного листа нет в книге
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        names = wb.sheetnames if sheets == ALL_SHEETS else list(sheets)
+        missing = None
+        found = False
+        for name in names:
+            if name not in wb.sheetnames:
+                raise ValueError(f"Лист «{name}» не найден в {os.path.basename(input_path)}")
+            ws = wb[name]
+            try:
+                headers, indexes = _sheet_columns(ws)
+            except MissingColumnsError as e:
+                if sheets != ALL_SHEETS:
+                    raise
+                logger.info(f"ℹ️ Лист «{name}» пропущен: нет столбцов бирок")
+                missing = missing or e
+                continue
+            _log_headers(headers, f"excel, лист «{name}»")
+            found = True
+            yield name, _iter_worksheet(ws, indexes)
+        if not found and missing is not None:
+            raise missing
+    finally:
+        wb.close()
+
+
+def _sheet_columns(ws):
+    """Заголовки первой строки листа и индексы столбцов бирок"""
+    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    headers = list(header_row)
+    return headers, resolve_columns(headers)
+
+
+def _iter_sheet_rows(wb, ws, indexes):
+    """Генератор строк листа; закрывает книгу по окончании чтения"""
+    try:
+        yield from _iter_worksheet(ws, indexes)
+    finally:
+        wb.close()
+
+
+def _iter_worksheet(ws, indexes):
+    """Генератор строк листа (row, system, track, cable, length, qty)"""
+    system_idx, track_idx, cable_idx, length_idx, quantity_idx = indexes
+    max_col = max(indexes) + 1
+    for row_number, row in enumerate(ws.iter_rows(min_row=2, max_col=max_col, values_only=True), start=2):
+        # В read-only режиме короткие строки могут быть не дополнены до max_col
+        if len(row) < max_col:
+            row = tuple(row) + (None,) * (max_col - len(row))
+        yield row_number, row[system_idx], row[track_idx], row[cable_idx], row[length_idx], row[quantity_idx]
+
+
+def _log_headers(headers, kind):
+    """Заголовки загруженного файла — в лог"""
+    headers_not_none = [str(item) for item in headers if item is not None]
+    border = '-' * (28 + sum(len(header) for header in headers_not_none))
+    logger.info(
+            f"🚀 Загруженный файл {kind} имеет заголовки:\n"
+            f"{border}\n"
+            f"| {headers_not_none} |\n"
+            f"{border}\n"
+    )
+
+
+# === CSV И PARQUET (ПОКОЛОНОЧНО) ===
+def _iter_columns(system, track, cable, length, quantity):
+    """Генератор строк из столбцов; номер строки — как в файле (после заголовка)"""
+    for row_number, row in enumerate(zip(system, track, cable, length, quantity), start=2):
+        yield row_number, *row
+
+
+def _read_csv_text(input_path):
+    """Текст CSV в первой подходящей кодировке"""
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            with open(input_path, encoding=encoding, newline="") as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    with open(input_path, encoding=CSV_ENCODINGS[-1], errors="replace", newline="") as f:
+        return f.read()
+
+
+def read_csv_rows(input_path):
+    """
+    Читает CSV целиком и разбирает только нужные столбцы.
+    Разделитель (; , или табуляция) определяется по началу файла.
+    :param input_path: путь к .csv
+    :return: (total_rows, rows) — как у read_excel_rows
+    :raises MissingColumnsError: если не найдены необходимые столбцы
+    """
+    text = _read_csv_text(input_path)
+    sample = text[:4096]
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+
+    table = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    headers = [header.strip() for header in table[0]] if table else []
+    indexes = resolve_columns(headers)
+    _log_headers(headers, "csv")
+
+    # Разбор по столбцам; пустые и короткие строки дополняются пустыми значениями
+    body = table[1:]
+    columns = [[row[idx] if idx < len(row) else "" for row in body] for idx in indexes]
+    return len(body), _iter_columns(*columns)
+
+
+def read_parquet_rows(input_path):
+    """
+    Читает из Parquet только нужные столбцы (нужен pyarrow).
+    :param input_path: путь к .parquet
+    :return: (total_rows, rows) — как у read_excel_rows
+    :raises MissingColumnsError: если не найдены необходимые столбцы
+    :raises RuntimeError: если pyarrow не установлен
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для чтения Parquet установите pyarrow: pip install pyarrow")
+
+    headers = pq.read_schema(input_path).names
+    indexes = resolve_columns(headers)
+    _log_headers(headers, "parquet")
+
+    names = [headers[idx] for idx in indexes]
+    table = pq.read_table(input_path, columns=list(dict.fromkeys(names)))
+    columns = [[_parquet_text(value) for value in table.column(name).to_pylist()] for name in names[:4]]
+    columns.append(table.column(names[4]).to_pylist())
+    return table.num_rows, _iter_columns(*columns)
+
+
+# Читатели по расширению файла
+READERS = {
+        ".xlsx": read_excel_rows,
+        ".xlsm": read_excel_rows,
+        ".csv": read_csv_rows,
+        ".txt": read_csv_rows,
+        ".parquet": read_parquet_rows,
+}
+
+
+def read_rows(input_path):
+    """
+    Выбирает читателя по расширению файла.
+    :param input_path: путь к журналу (.xlsx, .csv, .parquet)
+    :return: (total_rows, rows) — оценка числа строк и генератор кортежей
+             (row, system, track, cable, length, qty) с исходными значениями ячеек
+    :raises ValueError: если формат файла не поддерживается
+    :raises MissingColumnsError: если не найдены необходимые столбцы
+    """
+    ext = os.path.splitext(input_path)[1].lower()
+    reader = READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Неподдерживаемый формат файла: {ext or input_path}")
+    return reader(input_path)
+
+
+def read_sources(input_path, sheets=None):
+    """
+    Листы одного журнала: у Excel — выбранные листы, у CSV и Parquet — весь файл.
+    :param input_path: путь к журналу
+    :param sheets: None — активный лист, ALL_SHEETS — все листы, список — выбранные листы
+    :return: генератор пар (имя источника, генератор строк), имя — 'файл' или 'файл:лист'
+    """
+    name = os.path.basename(input_path)
+    ext = os.path.splitext(input_path)[1].lower()
+    if sheets is None or READERS.get(ext) is not read_excel_rows:
+        _, rows = read_rows(input_path)
+        yield name, rows
+        return
+    for sheet, rows in read_excel_sheets(input_path, sheets):
+        yield f"{name}:{sheet}", rows
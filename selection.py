@@ -0,0 +1,297 @@
+"""
+Отбор бирок для допечатки и индекс расположения бирок в готовом PDF.
+
+Отбор задаётся шаблонами трасс и подсистем (*, ? — как в именах файлов, без учёта регистра),
+диапазонами строк журнала или номерами листов прошлого задания. Строки отбираются
+по мере чтения журнала — до нормализации и разворачивания копий.
+
+Индекс пишется рядом с каждым выводом под его именем без расширения (<имя>.index.json —
+для journal.pdf, томов journal_001.pdf, ... и растра journal.tif или journal_0001_front.png):
+    files — файлы вывода по порядку;
+    records — [источник, строка, первая бирка, копий] по порядку бирок;
+    tracks — {трасса: [[лист, ячейка, файл, страница], ...]} (лист — сквозной номер, файл — номер в files,
+    страница — лицевая сторона в этом файле; всё с 1, кроме номера файла, ячейки — по лицевой стороне).
+По records номера листов прошлого задания переводятся в строки журналов и число копий.
+"""
+import os
+import re
+import json
+import logging
+from fnmatch import fnmatchcase
+
+from readers import cell_text
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index.json"  # Индекс рядом с выводом: journal.pdf → journal.index.json
+INDEX_VERSION = 2
+REPRINT_SUFFIX = "_reprint"  # Допечатка: journal.pdf → journal_reprint.pdf
+# Части вывода: тома (journal_001.pdf) и страницы растра (journal_0001_front.png)
+PART_SUFFIX = re.compile(r"_(\d{3}|\d{4}_(front|back))$")
+
+
+def index_path(output_path):
+    """Индекс вывода — по имени без расширения, одинаковому у PDF, томов и растра"""
+    return os.path.splitext(output_path)[0] + INDEX_SUFFIX
+
+
+def find_index(path):
+    """
+    Индекс по пути к нему самому, к выводу или к его части (тому, странице растра).
+    :return: путь к индексу (может не существовать)
+    """
+    if path.endswith(INDEX_SUFFIX):
+        return path
+    candidate = index_path(path)
+    if not os.path.exists(candidate):
+        stem = os.path.splitext(path)[0]
+        if PART_SUFFIX.search(stem):
+            return PART_SUFFIX.sub("", stem) + INDEX_SUFFIX
+    return candidate
+
+
+def reprint_path(output_path):
+    """Имя вывода допечатки — рядом с исходным, не поверх него"""
+    stem, ext = os.path.splitext(output_path)
+    return output_path if stem.endswith(REPRINT_SUFFIX) else stem + REPRINT_SUFFIX + ext
+
+
+def original_path(output_path):
+    """Исходный вывод для имени допечатки: journal_reprint.pdf → journal.pdf"""
+    stem, ext = os.path.splitext(output_path)
+    return stem[:-len(REPRINT_SUFFIX)] + ext if stem.endswith(REPRINT_SUFFIX) else output_path
+
+
+def parse_ranges(value):
+    """
+    Диапазоны номеров: '3,7-9' → [(3, 3), (7, 9)].
+    :raises ValueError: если диапазон записан неверно
+    """
+    ranges = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last.strip() else first
+        except ValueError:
+            raise ValueError(f"Неверный диапазон: «{part}» (пример: 3,7-9)") from None
+        if first < 1 or last < first:
+            raise ValueError(f"Неверный диапазон: «{part}» (пример: 3,7-9)")
+        ranges.append((first, last))
+    return ranges
+
+
+def _in_ranges(number, ranges):
+    return any(first <= number <= last for first, last in ranges)
+
+
+class Selection:
+    """
+    Отбор строк журнала. Условия разных видов объединяются по «и», шаблоны одного вида — по «или».
+    Передаётся в процессы чтения журналов (pickle).
+    """
+
+    def __init__(self, tracks=None, systems=None, rows=None, sheet_numbers=None, index=None):
+        """
+        :param tracks: шаблоны трасс
+        :param systems: шаблоны подсистем
+        :param rows: диапазоны строк журнала ('5-10,20') — номера строк в каждом файле/листе
+        :param sheet_numbers: диапазоны листов прошлого задания ('3,7-9')
+        :param index: путь к индексу прошлого задания (нужен для sheet_numbers)
+        :raises ValueError: если диапазоны записаны неверно или индекс не читается
+        """
+        self.tracks = [pattern.casefold() for pattern in tracks or ()]
+        self.systems = [pattern.casefold() for pattern in systems or ()]
+        self.rows = parse_ranges(rows) if rows else None
+        self.sheet_numbers = parse_ranges(sheet_numbers) if sheet_numbers else None
+        self.index = index if self.sheet_numbers else None
+        # (источник, строка) → сколько копий было на выбранных листах
+        self.copies = None
+        if self.sheet_numbers:
+            self.copies = sheet_copies(load_index(index), self.sheet_numbers)
+
+    def __bool__(self):
+        return bool(self.tracks or self.systems or self.rows or self.sheet_numbers)
+
+    def describe(self):
+        parts = []
+        if self.tracks:
+            parts.append(f"трассы {', '.join(self.tracks)}")
+        if self.systems:
+            parts.append(f"подсистемы {', '.join(self.systems)}")
+        if self.rows:
+            parts.append(f"строки {_format_ranges(self.rows)}")
+        if self.sheet_numbers:
+            parts.append(f"листы {_format_ranges(self.sheet_numbers)} прошлого задания")
+        return "; ".join(parts)
+
+    def filter_rows(self, source, rows):
+        """
+        Отбирает строки из потока read_rows; при отборе по листам количество
+        заменяется числом копий, которые были на этих листах.
+        :param source: имя источника ('файл' или 'файл:лист') — как в индексе
+        :param rows: итератор строк (номер, подсистема, трасса, кабель, длина, количество)
+        """
+        for row in rows:
+            number, system, track = row[0], row[1], row[2]
+            if self.rows and not _in_ranges(number, self.rows):
+                continue
+            if self.tracks and not _matches(cell_text(track), self.tracks):
+                continue
+            if self.systems and not _matches(cell_text(system), self.systems):
+                continue
+            if self.copies is not None:
+                copies = self.copies.get((source, number))
+                if not copies:
+                    continue
+                row = (*row[:5], copies)
+            yield row
+
+
+def _matches(value, patterns):
+    value = value.casefold()
+    return any(fnmatchcase(value, pattern) for pattern in patterns)
+
+
+def _format_ranges(ranges):
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def make_selection(value, output_path=None):
+    """
+    Отбор из параметров задания.
+    :param value: Selection, словарь {"tracks", "systems", "rows", "sheet_numbers", "index"} или None
+    :param output_path: вывод задания — без "index" листы ищутся в индексе исходного вывода
+                        (для journal_reprint.pdf — в индексе journal.pdf)
+    :return: Selection или None, если условий нет
+    :raises ValueError: если вывод задания перезаписал бы индекс, по которому отобраны листы
+    """
+    if value is None or isinstance(value, Selection):
+        selection = value or None
+    else:
+        options = dict(value)
+        if options.get("sheet_numbers") and not options.get("index") and output_path:
+            options["index"] = index_path(original_path(output_path))
+        selection = Selection(**options) or None
+    if (
+            selection is not None and selection.index and output_path
+            and os.path.abspath(selection.index) == os.path.abspath(index_path(output_path))
+    ):
+        raise ValueError(
+                f"Допечатка перезаписала бы индекс {selection.index}, по которому отобраны листы: "
+                "сохраните её под другим именем"
+        )
+    return selection
+
+
+# === ИНДЕКС ===
+def page_locations(outputs, output_format, sheets):
+    """
+    Файл и страница в нём для каждой стороны каждого листа.
+    :param outputs: файлы вывода по порядку — PDF, тома, TIFF или PNG на каждую сторону
+    :param output_format: 'pdf', 'tiff' или 'png'
+    :param sheets: листов в выводе
+    :return: (имена файлов, [[файл, страница лицевой, файл, страница обратной], ...] по листам) —
+             файл — номер в списке имён, страницы с 1
+    """
+    files = [os.path.basename(path) for path in outputs]
+    if output_format == "png":
+        return files, [[number * 2, 1, number * 2 + 1, 1] for number in range(sheets)]
+    if len(outputs) == 1:
+        return files, [[0, number * 2 + 1, 0, number * 2 + 2] for number in range(sheets)]
+
+    # Тома: листов в каждом — по числу страниц
+    from pypdf import PdfReader
+
+    locations = []
+    for file, path in enumerate(outputs):
+        for number in range(len(PdfReader(path).pages) // 2):
+            locations.append([file, number * 2 + 1, file, number * 2 + 2])
+    return files, locations
+
+
+def build_index(data, per_page, files, locations, template_name):
+    """
+    Индекс расположения бирок.
+    :param data: LabelSequence в порядке печати (пустые ячейки упаковки — записи без номера строки)
+    :param files: имена файлов вывода (page_locations)
+    :param locations: файл и страницы каждого листа (page_locations)
+    """
+    records = []
+    tracks = {}
+    start = 0
+    for record in data.records:
+        if record.row is not None:
+            records.append([record.source, record.row, start, record.qty])
+            positions = tracks.setdefault(record.track, [])
+            for label in range(start, start + record.qty):
+                sheet = label // per_page
+                file, page = locations[sheet][:2]
+                positions.append([sheet + 1, label % per_page + 1, file, page])
+        start += record.qty
+    return {
+            "version": INDEX_VERSION,
+            "files": files,
+            "template": template_name,
+            "per_page": per_page,
+            "sheets": -(-len(data) // per_page),
+            "records": records,
+            "tracks": tracks,
+    }
+
+
+def write_index(index, output_path):
+    """Записывает индекс рядом с выводом; возвращает путь"""
+    path = index_path(output_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+def load_index(path):
+    """:raises ValueError: если индекса нет или он другого формата"""
+    if not path:
+        raise ValueError("Для отбора по листам нужен индекс прошлого задания (<имя>.index.json)")
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Индекс {path} не прочитан: {e}") from None
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"Индекс {path}: неизвестная версия {index.get('version')}")
+    return index
+
+
+def locate_tracks(index, tracks):
+    """
+    Листы и ячейки трасс: точное имя ищется напрямую, шаблон (*, ?) — перебором имён.
+    :return: {трасса: [[лист, ячейка, файл, страница], ...]} в порядке запроса
+    """
+    found = {}
+    for track in tracks:
+        if track in index["tracks"]:
+            found[track] = index["tracks"][track]
+            continue
+        pattern = track.casefold()
+        for name, positions in index["tracks"].items():
+            if fnmatchcase(name.casefold(), pattern):
+                found[name] = positions
+    return found
+
+
+def sheet_copies(index, sheet_numbers):
+    """
+    Строки журналов, бирки которых были на выбранных листах.
+    :return: {(источник, строка): копий на этих листах}
+    """
+    per_page = index["per_page"]
+    spans = [((first - 1) * per_page, last * per_page) for first, last in sheet_numbers]
+    copies = {}
+    for source, row, start, qty in index["records"]:
+        count = sum(max(0, min(start + qty, stop) - max(start, begin)) for begin, stop in spans)
+        if count:
+            copies[(source, row)] = copies.get((source, row), 0) + count
+    return copies
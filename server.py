@@ -0,0 +1,533 @@
+"""
+Локальный сервер печати: очередь заданий в SQLite и ограниченный пул процессов рендеринга.
+
+Задания принимаются по HTTP от окна приложения, командной строки или скриптов,
+переживают перезапуск сервера и выполняются по очереди не более чем SERVER_WORKERS
+одновременно. Состояние и прогресс каждого задания можно запросить.
+
+Авторизации нет, а задание читает и пишет любые файлы пользователя, поэтому сервер
+слушает только loopback-адрес, отвечает только запросам с локальным Host (защита
+от DNS rebinding) и принимает POST только с Content-Type: application/json — такой
+запрос чужая страница в браузере не отправит без проверки CORS.
+
+    python cli.py serve --workers 2
+    python cli.py generate journal.xlsx -o out --server http://127.0.0.1:8765
+    python cli.py status
+
+API (JSON):
+    POST /jobs               {"inputs": [...], "output": "...", "options": {...}} → {"id": 1}
+    GET  /jobs               последние задания
+    GET  /jobs/<id>          состояние и прогресс задания
+    POST /jobs/<id>/cancel   снять из очереди или остановить после текущего листа
+"""
+import os
+import json
+import time
+import signal
+import ipaddress
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from appdata import data_path
+from engine import GenerationCancelled, MissingColumnsError, ensure_font, generate_pdf
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = "127.0.0.1"  # Только локальные подключения — пути к файлам локальные
+SERVER_PORT = 8765
+SERVER_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
+SERVER_WORKERS = 2  # Заданий одновременно
+# Файл очереди — в папке данных пользователя; переопределяется CABLE_SIGNS_QUEUE
+QUEUE_FILE = data_path("queue.sqlite3", "CABLE_SIGNS_QUEUE")
+QUEUE_POLL_SECONDS = 1.0  # Проверка очереди, если не пришло новых заданий
+PROGRESS_INTERVAL = 0.5  # Не чаще — запись прогресса и проверка отмены в процессе задания
+JOB_LIST_LIMIT = 50  # Заданий в ответе GET /jobs
+
+# Параметры generate_pdf, которые можно передать с заданием
+JOB_OPTIONS = (
+        "line_width", "offset_x", "offset_y", "max_qty", "workers", "incremental", "sheets",
+        "pack", "fill_path", "volume_sheets", "volume_mb", "font_report", "output_format", "dpi", "template",
+        "cache_dir", "selection", "manifest",
+)
+
+# Состояния задания
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+def is_loopback(host):
+    """Адрес или имя хоста только этого компьютера (localhost, 127.0.0.0/8, ::1)"""
+    host = (host or "").strip("[]").lower()
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class JobQueue:
+    """
+    Очередь заданий в SQLite. Соединение открывается на каждую операцию —
+    очередь используют потоки HTTP-сервера и процессы пула.
+    """
+
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # WAL — чтение состояния не ждёт записи прогресса
+        self._execute("PRAGMA journal_mode=WAL")
+        self._execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, status TEXT NOT NULL, "
+                "inputs TEXT NOT NULL, output TEXT NOT NULL, options TEXT NOT NULL, "
+                "submitted TEXT, started TEXT, finished TEXT, "
+                "done INTEGER DEFAULT 0, total INTEGER DEFAULT 0, labels INTEGER, "
+                "error TEXT, cancel INTEGER DEFAULT 0)"
+        )
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _execute(self, sql, params=()):
+        """Изменение; :return: число затронутых строк"""
+        db = self._connect()
+        try:
+            return db.execute(sql, params).rowcount
+        finally:
+            db.close()
+
+    def _query(self, sql, params=()):
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def submit(self, inputs, output_path, options):
+        """
+        Ставит задание в очередь.
+        :return: номер задания
+        """
+        db = self._connect()
+        try:
+            cursor = db.execute(
+                    "INSERT INTO jobs (status, inputs, output, options, submitted) VALUES (?, ?, ?, ?, ?)",
+                    (QUEUED, json.dumps(inputs, ensure_ascii=False), output_path,
+                     json.dumps(options, ensure_ascii=False), _now())
+            )
+            return cursor.lastrowid
+        finally:
+            db.close()
+
+    def claim(self):
+        """
+        Забирает первое задание из очереди (отмечает как выполняемое) или возвращает None.
+        Задание с тем же файлом вывода, что у выполняемого, ждёт его окончания —
+        два процесса не пишут один PDF одновременно.
+        """
+        db = self._connect()
+        try:
+            # BEGIN IMMEDIATE — два диспетчера не заберут одно задание
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                    "SELECT * FROM jobs WHERE status = ? "
+                    "AND output NOT IN (SELECT output FROM jobs WHERE status = ?) ORDER BY id LIMIT 1",
+                    (QUEUED, RUNNING)
+            ).fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ?", (RUNNING, _now(), row["id"]))
+            db.execute("COMMIT")
+            return self._job(row) if row is not None else None
+        finally:
+            db.close()
+
+    def recover(self):
+        """После перезапуска сервера прерванные задания возвращаются в очередь"""
+        recovered = self._execute(
+                "UPDATE jobs SET status = ?, started = NULL, done = 0 WHERE status = ? AND cancel = 0",
+                (QUEUED, RUNNING)
+        )
+        # Отменённые во время работы — остаются отменёнными
+        self._execute("UPDATE jobs SET status = ?, finished = ? WHERE status = ?", (CANCELLED, _now(), RUNNING))
+        return recovered
+
+    def progress(self, job_id, done, total):
+        self._execute("UPDATE jobs SET done = ?, total = ? WHERE id = ?", (done, total, job_id))
+
+    def finish(self, job_id, status, labels=None, error=None):
+        self._execute(
+                "UPDATE jobs SET status = ?, finished = ?, labels = ?, error = ? WHERE id = ?",
+                (status, _now(), labels, error, job_id)
+        )
+
+    def cancel(self, job_id):
+        """
+        Отмена: задание из очереди снимается сразу, выполняемое — останавливается после текущего листа.
+        :return: состояние задания после запроса или None, если задания нет
+        """
+        self._execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                (CANCELLED, _now(), job_id, QUEUED)
+        )
+        self._execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        job = self.get(job_id)
+        return job["status"] if job is not None else None
+
+    def cancel_requested(self, job_id):
+        rows = self._query("SELECT cancel FROM jobs WHERE id = ?", (job_id,))
+        return bool(rows and rows[0]["cancel"])
+
+    def get(self, job_id):
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._job(rows[0]) if rows else None
+
+    def list(self, limit=JOB_LIST_LIMIT):
+        """Последние задания, новые первыми"""
+        rows = self._query("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [self._job(row) for row in rows]
+
+    @staticmethod
+    def _job(row):
+        """Строка таблицы → словарь для ответа API"""
+        job = dict(row)
+        job["inputs"] = json.loads(job["inputs"])
+        job["options"] = json.loads(job["options"])
+        job["cancel"] = bool(job["cancel"])
+        return job
+
+
+class _QueueCancel:
+    """Флаг отмены для generate_pdf в процессе пула: читается из очереди не чаще PROGRESS_INTERVAL"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self._checked = 0.0
+        self._set = False
+
+    def is_set(self):
+        now = time.monotonic()
+        if not self._set and now - self._checked >= PROGRESS_INTERVAL:
+            self._checked = now
+            self._set = self.queue.cancel_requested(self.job_id)
+        return self._set
+
+
+def _run_job(queue_path, job):
+    """
+    Выполняет задание в процессе пула (на уровне модуля для pickle).
+    Прогресс, итог и ошибка записываются в очередь.
+    """
+    queue = JobQueue(queue_path)
+    job_id = job["id"]
+    last = [0.0]
+
+    def progress(done, total):
+        now = time.monotonic()
+        if now - last[0] >= PROGRESS_INTERVAL or done == total:
+            last[0] = now
+            queue.progress(job_id, done, total)
+
+    inputs = job["inputs"]
+    try:
+        labels = generate_pdf(
+                inputs[0] if len(inputs) == 1 else inputs, job["output"],
+                progress=progress, cancel=_QueueCancel(queue, job_id), **job["options"]
+        )
+    except GenerationCancelled:
+        queue.finish(job_id, CANCELLED)
+        logger.info(f"⏹ Задание {job_id} остановлено")
+    except MissingColumnsError as e:
+        queue.finish(job_id, FAILED, error=f"Не найдены необходимые столбцы: {e.found}")
+        logger.error(f"🚨 Задание {job_id}: не найдены необходимые столбцы {e.found}")
+    except Exception as e:
+        queue.finish(job_id, FAILED, error=str(e))
+        logger.error(f"🚨 Задание {job_id}: {e}")
+    else:
+        queue.finish(job_id, DONE, labels=labels)
+        logger.info(f"✅ Задание {job_id}: {labels} бирок → {job['output']}")
+
+
+def _init_worker(level, log_format):
+    """Процесс пула: лог как у сервера и шрифт, разобранный один раз на процесс"""
+    # Ctrl+C в консоли получает вся группа процессов — останавливает сервер, а задание дорисовывается
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=level, format=log_format)
+    ensure_font()
+
+
+class PrintServer:
+    """Диспетчер очереди: забирает задания и выполняет их в пуле из workers процессов"""
+
+    def __init__(self, queue, workers=SERVER_WORKERS, log_format=None):
+        """
+        :param queue: JobQueue
+        :param workers: заданий одновременно
+        :param log_format: формат лога процессов пула (spawn — настройки лога не наследуются)
+        """
+        self.queue = queue
+        self.workers = workers
+        self.log_format = log_format or logging.BASIC_FORMAT
+        self._wake = threading.Event()  # Новое задание или освободился процесс
+        self._stop = threading.Event()
+        self._running = {}  # Номер задания → Future
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run(self):
+        """Цикл диспетчера (в отдельном потоке); пул живёт, пока сервер запущен"""
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"♻️ Возвращено в очередь прерванных заданий: {recovered}")
+        # spawn (как в Windows) — процессы пула не наследуют сокет HTTP-сервера
+        # и не держат порт после его остановки
+        with ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(logging.getLogger().getEffectiveLevel(), self.log_format)
+        ) as executor:
+            while not self._stop.is_set():
+                while len(self._running) < self.workers:
+                    job = self.queue.claim()
+                    if job is None:
+                        break
+                    logger.info(f"🚀 Задание {job['id']}: {', '.join(job['inputs'])}")
+                    future = executor.submit(_run_job, self.queue.path, job)
+                    future.add_done_callback(lambda f, job_id=job["id"]: self._finished(job_id, f))
+                    self._running[job["id"]] = future
+                self._wake.wait(QUEUE_POLL_SECONDS)
+                self._wake.clear()
+
+    def _finished(self, job_id, future):
+        """Процесс освободился; падение самого процесса (а не задания) отмечается в очереди"""
+        self._running.pop(job_id, None)
+        error = future.exception()
+        if error is not None:
+            self.queue.finish(job_id, FAILED, error=f"Процесс рендеринга завершился аварийно: {error}")
+            logger.error(f"🚨 Задание {job_id}: {error}")
+        self._wake.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP API очереди; сервер и очередь — атрибуты класса HTTP-сервера"""
+
+    def _allowed(self, post=False):
+        """
+        Запрос от локального клиента: Host — loopback (страница с чужого домена,
+        перенаправленного на 127.0.0.1, получит отказ), POST — с JSON (не простая форма браузера).
+        :return: True, иначе ответ 403 уже отправлен
+        """
+        host = self.headers.get("Host", "")
+        # Порт отрезается по последнему ':' только вне [IPv6]
+        name = host.rsplit(":", 1)[0] if host.rfind(":") > host.rfind("]") else host
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if not is_loopback(name) or (post and content_type != "application/json"):
+            self._reply(403, {"error": "Сервер печати принимает только локальные запросы с JSON"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._allowed():
+            return
+        parts = self.path.strip("/").split("/")
+        if parts == ["jobs"]:
+            self._reply(200, self.server.queue.list())
+        elif len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            job = self.server.queue.get(int(parts[1]))
+            if job is None:
+                self._reply(404, {"error": "Задание не найдено"})
+            else:
+                self._reply(200, job)
+        else:
+            self._reply(404, {"error": "Неизвестный адрес"})
+
+    def do_POST(self):
+        if not self._allowed(post=True):
+            return
+        parts = self.path.strip("/").split("/")
+        if parts == ["jobs"]:
+            self._submit()
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[1].isdigit() and parts[2] == "cancel":
+            status = self.server.queue.cancel(int(parts[1]))
+            if status is None:
+                self._reply(404, {"error": "Задание не найдено"})
+            else:
+                self._reply(200, {"id": int(parts[1]), "status": status})
+        else:
+            self._reply(404, {"error": "Неизвестный адрес"})
+
+    def _submit(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            inputs = request["inputs"]
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            output_path = request["output"]
+            options = request.get("options", {})
+            unknown = set(options) - set(JOB_OPTIONS)
+            if unknown:
+                raise ValueError(f"Неизвестные параметры: {sorted(unknown)}")
+            missing = [path for path in inputs if not os.path.isfile(path)]
+            if not inputs or missing:
+                raise ValueError(f"Файлы не найдены: {missing or inputs}")
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+
+        job_id = self.server.queue.submit(inputs, output_path, options)
+        self.server.dispatcher.notify()
+        logger.info(f"📥 Задание {job_id} в очереди: {', '.join(inputs)} → {output_path}")
+        self._reply(201, {"id": job_id, "status": QUEUED})
+
+    def _reply(self, code, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Запросы — в отладочный лог, а не в stderr
+        logger.debug(f"🌐 {self.address_string()} {format % args}")
+
+
+def _terminate(signum, frame):
+    """SIGTERM (остановка службы) — как Ctrl+C"""
+    raise KeyboardInterrupt
+
+
+def _draining(signum, frame):
+    """Повторный Ctrl+C или SIGTERM во время остановки: выполняемые задания всё равно дорисовываются"""
+    logger.warning("⏳ Сервер печати уже останавливается — ждём окончания выполняемых заданий")
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS, queue_path=QUEUE_FILE, log_format=None):
+    """
+    Запускает сервер печати и блокируется до Ctrl+C или SIGTERM.
+    При остановке выполняемые задания дорисовываются, задания из очереди ждут следующего запуска.
+    :raises ValueError: если host — не loopback-адрес (API без авторизации читает и пишет файлы)
+    """
+    if not is_loopback(host):
+        raise ValueError(f"Сервер печати слушает только локальный адрес (127.0.0.1, localhost), а не {host!r}")
+    signal.signal(signal.SIGTERM, _terminate)
+    queue = JobQueue(queue_path)
+    dispatcher = PrintServer(queue, workers, log_format)
+    thread = threading.Thread(target=dispatcher.run, name="dispatcher", daemon=True)
+    thread.start()
+
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.queue = queue
+    httpd.dispatcher = dispatcher
+    logger.info(f"🖨 Сервер печати: http://{host}:{port}, процессов: {workers}, очередь: {queue_path}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("⏹ Сервер печати останавливается: выполняемые задания дорисовываются, очередь сохранится")
+    finally:
+        # Ожидание заданий не прерывается повторным сигналом (иначе — KeyboardInterrupt в join)
+        signal.signal(signal.SIGINT, _draining)
+        signal.signal(signal.SIGTERM, _draining)
+        httpd.server_close()
+        dispatcher.stop()
+        thread.join()
+    logger.info("⏹ Сервер печати остановлен")
+
+
+# === КЛИЕНТ ===
+def _request(url, method="GET", body=None, timeout=10):
+    """Запрос к серверу печати; ошибка API — RuntimeError с текстом сервера"""
+    import urllib.error
+    import urllib.request
+
+    data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(
+            url, data=data, method=method, headers={"Content-Type": "application/json; charset=utf-8"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        raise RuntimeError(f"Сервер печати: {message}")
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"Сервер печати {url} недоступен: {e.reason}")
+
+
+def submit_job(inputs, output_path, options, url=SERVER_URL):
+    """
+    Отправляет задание на сервер печати. Пути передаются абсолютными — у сервера своя текущая папка.
+    :param inputs: путь к журналу или список путей
+    :param options: параметры generate_pdf из JOB_OPTIONS (значения — простые типы JSON)
+    :return: номер задания
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    options = dict(options)
+    for key in ("fill_path", "cache_dir"):
+        if options.get(key):
+            options[key] = os.path.abspath(options[key])
+    if options.get("selection") and options["selection"].get("index"):
+        options["selection"] = dict(options["selection"], index=os.path.abspath(options["selection"]["index"]))
+    body = {
+            "inputs": [os.path.abspath(path) for path in inputs],
+            "output": os.path.abspath(output_path),
+            "options": options,
+    }
+    return _request(f"{url}/jobs", "POST", body)["id"]
+
+
+def job_status(job_id, url=SERVER_URL):
+    return _request(f"{url}/jobs/{job_id}")
+
+
+def list_jobs(url=SERVER_URL):
+    return _request(f"{url}/jobs")
+
+
+def cancel_job(job_id, url=SERVER_URL):
+    return _request(f"{url}/jobs/{job_id}/cancel", "POST", {})
+
+
+def wait_job(job_id, url=SERVER_URL, progress=None, cancel=None, interval=PROGRESS_INTERVAL):
+    """
+    Ждёт завершения задания, передавая прогресс как generate_pdf.
+    :param cancel: threading.Event — при установке задание отменяется на сервере
+    :return: состояние завершённого задания
+    :raises GenerationCancelled: если задание отменено
+    :raises RuntimeError: если задание завершилось ошибкой
+    """
+    cancel_sent = False
+    while True:
+        job = job_status(job_id, url)
+        if progress is not None and job["total"]:
+            progress(job["done"], job["total"])
+        if job["status"] == DONE:
+            return job
+        if job["status"] == CANCELLED:
+            raise GenerationCancelled()
+        if job["status"] == FAILED:
+            raise RuntimeError(job["error"])
+        if cancel is not None and cancel.is_set() and not cancel_sent:
+            cancel_job(job_id, url)
+            cancel_sent = True
+        time.sleep(interval)
@@ -0,0 +1,218 @@
+"""
+Шаблоны листов: размер листа, сетка треугольников, размеры треугольника и лестница шрифтов.
+
+Встроенные шаблоны — в TEMPLATES; свой шаблон описывается файлом JSON (размеры в мм):
+    {"name": "a3-small", "page_width_mm": 297, "page_height_mm": 420,
+     "triangle_base_mm": 50, "triangle_height_mm": 41, "margin_mm": 8}
+Если сетка (cols, rows) не задана, она подбирается самая плотная для листа:
+треугольники ряда чередуются вершиной вверх и вниз, лист пробуется в обеих ориентациях.
+Для рулона задаётся ширина и число рядов — длина «листа» считается по рядам.
+"""
+import os
+import json
+from collections import namedtuple
+
+from reportlab.lib.pagesizes import A3, A4
+from reportlab.lib.units import mm
+
+# Лестница шрифтов бирки (пт). *_steps — ((длина строки от, размер), ...) по возрастанию длины:
+# берётся последняя подходящая ступень. sub_wrap — символов в строке подзаголовка,
+# sub_wrap_small — при шрифте не больше small_size
+FontLadder = namedtuple(
+        "FontLadder",
+        "system system_long track track_steps cable cable_steps length min_size small_size sub_wrap sub_wrap_small",
+)
+
+DEFAULT_FONTS = FontLadder(
+        system=18,  # system
+        system_long=16,  # system от 8 символов
+        track=14,  # track
+        track_steps=((18, 13.5), (19, 13), (20, 11.5)),
+        cable=16,  # cable (чуть больше), первая строка
+        cable_steps=((10, 14), (15, 12)),  # вторая строка cable
+        length=14,  # length
+        min_size=10,  # минимальный размер при уменьшении
+        small_size=12,
+        sub_wrap=30,
+        sub_wrap_small=38,
+)
+
+LabelTemplate = namedtuple(
+        "LabelTemplate",
+        "name page_width page_height triangle_base triangle_height cols rows x_start y_start fonts",
+)
+
+DEFAULT_MARGIN = 10 * mm  # Поля листа при подборе сетки
+
+
+def scale_fonts(fonts, factor):
+    """Лестница шрифтов для бирки другого размера: размеры умножаются, длины строк — нет"""
+    def size(value):
+        return round(value * factor * 2) / 2  # Шаг 0.5 пт
+
+    return fonts._replace(
+            system=size(fonts.system),
+            system_long=size(fonts.system_long),
+            track=size(fonts.track),
+            track_steps=tuple((length, size(value)) for length, value in fonts.track_steps),
+            cable=size(fonts.cable),
+            cable_steps=tuple((length, size(value)) for length, value in fonts.cable_steps),
+            length=size(fonts.length),
+            min_size=size(fonts.min_size),
+            small_size=size(fonts.small_size),
+    )
+
+
+def _grid_size(width, height, triangle_base, triangle_height, margin):
+    """
+    Сколько треугольников помещается в ряд и сколько рядов на листе.
+    В ряду из n треугольников занято (n + 1) · base / 2 по ширине, каждый ряд — height по высоте.
+    """
+    cols = max(int((width - 2 * margin) / (triangle_base / 2) + 1e-9) - 1, 0)
+    rows = max(int((height - 2 * margin) / triangle_height + 1e-9), 0)
+    return cols, rows
+
+
+def densest_tiling(page_width, page_height, triangle_base, triangle_height, margin=DEFAULT_MARGIN):
+    """
+    Самая плотная сетка чередующихся треугольников на листе.
+    Лист пробуется в книжной и альбомной ориентации; при равенстве остаётся исходная.
+    :return: (page_width, page_height, cols, rows) — размеры листа в выбранной ориентации
+    """
+    best = None
+    for width, height in ((page_width, page_height), (page_height, page_width)):
+        cols, rows = _grid_size(width, height, triangle_base, triangle_height, margin)
+        if best is None or cols * rows > best[2] * best[3]:
+            best = (width, height, cols, rows)
+    return best
+
+
+def make_template(
+        name, page_width, page_height=None, triangle_base=60 * mm, triangle_height=49 * mm,
+        cols=None, rows=None, margin=DEFAULT_MARGIN, fonts=None
+):
+    """
+    Собирает шаблон; недостающая сетка подбирается densest_tiling, сетка центрируется на листе.
+    :param page_width: ширина листа (рулона), пт
+    :param page_height: высота листа, пт; None — рулон: длина по rows рядам плюс поля
+    :param cols: треугольников в ряду (None — подобрать)
+    :param rows: рядов (None — подобрать; для рулона обязательно)
+    :param margin: поля листа при подборе, пт
+    :param fonts: FontLadder; None — DEFAULT_FONTS, масштабированные по основанию треугольника
+    :return: LabelTemplate
+    :raises ValueError: если на лист не помещается ни одного треугольника
+    """
+    if page_height is None:
+        if not rows:
+            raise ValueError(f"Шаблон «{name}»: для рулона нужно число рядов (rows)")
+        page_height = rows * triangle_height + 2 * margin
+    if cols is None and rows is None:
+        page_width, page_height, cols, rows = densest_tiling(
+                page_width, page_height, triangle_base, triangle_height, margin
+        )
+    elif cols is None or rows is None:
+        # Часть сетки задана — ориентация листа не меняется
+        fit_cols, fit_rows = _grid_size(page_width, page_height, triangle_base, triangle_height, margin)
+        cols = fit_cols if cols is None else cols
+        rows = fit_rows if rows is None else rows
+    if cols < 1 or rows < 1:
+        raise ValueError(f"Шаблон «{name}»: треугольник не помещается на лист")
+    if fonts is None:
+        fonts = DEFAULT_FONTS if triangle_base == 60 * mm else scale_fonts(DEFAULT_FONTS, triangle_base / (60 * mm))
+
+    # Сетка по центру листа: x_start — центр первого треугольника, y_start — основание первого ряда
+    x_start = (page_width - (cols + 1) * triangle_base / 2) / 2 + triangle_base / 2
+    y_start = (page_height - rows * triangle_height) / 2 + triangle_height
+    return LabelTemplate(
+            name, page_width, page_height, triangle_base, triangle_height, cols, rows, x_start, y_start, fonts
+    )
+
+
+# Исходная раскладка A4 5×5 (координаты подобраны под резку — не центрируется)
+A4_TEMPLATE = LabelTemplate(
+        name="a4",
+        page_width=A4[0],
+        page_height=A4[1],
+        triangle_base=60 * mm,
+        triangle_height=49 * mm,
+        cols=5,
+        rows=5,
+        x_start=45 * mm,
+        y_start=76.5 * mm,
+        fonts=DEFAULT_FONTS,
+)
+
+DEFAULT_TEMPLATE = A4_TEMPLATE
+
+# Встроенные шаблоны
+TEMPLATES = {
+        "a4": A4_TEMPLATE,
+        "a3": make_template("a3", *A3),
+        "roll-100": make_template("roll-100", 100 * mm, rows=10, margin=3 * mm),
+        "roll-200": make_template("roll-200", 200 * mm, rows=10, margin=3 * mm),
+}
+
+
+def load_template(path):
+    """
+    Шаблон из файла JSON (размеры в мм, см. описание модуля).
+    Необязательные поля: page_height_mm (нет — рулон), triangle_base_mm, triangle_height_mm,
+    cols, rows, margin_mm, fonts — поля FontLadder (недостающие берутся из масштабированной лестницы).
+    :raises ValueError: если в файле нет ширины листа или поле неизвестно
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    name = spec.get("name") or os.path.splitext(os.path.basename(path))[0]
+    if "page_width_mm" not in spec:
+        raise ValueError(f"Шаблон {path}: не задана ширина листа (page_width_mm)")
+    base = spec.get("triangle_base_mm", 60) * mm
+    fonts = None
+    if spec.get("fonts"):
+        unknown = set(spec["fonts"]) - set(FontLadder._fields)
+        if unknown:
+            raise ValueError(f"Шаблон {path}: неизвестные поля шрифтов {sorted(unknown)}")
+        # Ступени из JSON приходят списками — в лестнице они кортежи (ключ кэша)
+        values = {
+                key: tuple(tuple(step) for step in value) if key.endswith("_steps") else value
+                for key, value in spec["fonts"].items()
+        }
+        fonts = scale_fonts(DEFAULT_FONTS, base / (60 * mm))._replace(**values)
+    height = spec.get("page_height_mm")
+    return make_template(
+            name,
+            spec["page_width_mm"] * mm,
+            height * mm if height is not None else None,
+            triangle_base=base,
+            triangle_height=spec.get("triangle_height_mm", 49) * mm,
+            cols=spec.get("cols"),
+            rows=spec.get("rows"),
+            margin=spec.get("margin_mm", DEFAULT_MARGIN / mm) * mm,
+            fonts=fonts,
+    )
+
+
+def get_template(value=None):
+    """
+    Шаблон по имени, пути к JSON или готовый LabelTemplate.
+    :param value: None — DEFAULT_TEMPLATE
+    :raises ValueError: если шаблон не найден
+    """
+    if value is None:
+        return DEFAULT_TEMPLATE
+    if isinstance(value, LabelTemplate):
+        return value
+    if value in TEMPLATES:
+        return TEMPLATES[value]
+    if os.path.isfile(value):
+        return load_template(value)
+    raise ValueError(f"Шаблон «{value}» не найден: встроенные — {', '.join(TEMPLATES)}, или файл .json")
+
+
+def describe_template(template):
+    """Краткое описание шаблона для лога и списка шаблонов"""
+    return (
+            f"{template.name}: лист {template.page_width / mm:.0f}×{template.page_height / mm:.0f} мм, "
+            f"треугольник {template.triangle_base / mm:.0f}×{template.triangle_height / mm:.0f} мм, "
+            f"сетка {template.cols}×{template.rows} = {template.cols * template.rows} бирок"
+    )
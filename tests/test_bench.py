@@ -0,0 +1,43 @@
+"""Сравнение бенчмарка с базовой линией"""
+from benchmarks.bench_pipeline import STAGES, compare, make_schedule
+
+
+def result(seconds=1.0, memory=10.0, pdf_bytes=1000):
+    return {
+            "seconds": {stage: seconds for stage in STAGES},
+            "peak_memory_mb": {stage: memory for stage in STAGES},
+            "pdf_bytes": pdf_bytes,
+    }
+
+
+def test_within_tolerance_is_not_a_regression():
+    baseline = {"results": {"1000": result()}}
+    assert compare({"results": {"1000": result(seconds=1.15, memory=11.5)}}, baseline) == []
+
+
+def test_slower_bigger_and_heavier_runs_are_reported():
+    baseline = {"results": {"1000": result()}}
+    regressions = compare({"results": {"1000": result(seconds=1.5, memory=13, pdf_bytes=1300)}}, baseline)
+    assert len(regressions) == 2 * len(STAGES) + 1
+    assert any("pdf size" in line for line in regressions)
+
+
+def test_tiny_time_differences_are_noise():
+    # 5 мс против 2 мс — x2.5, но меньше MIN_DELTA_SECONDS
+    baseline = {"results": {"1000": result(seconds=0.002)}}
+    assert compare({"results": {"1000": result(seconds=0.005)}}, baseline) == []
+
+
+def test_sizes_without_baseline_are_skipped():
+    assert compare({"results": {"10000": result(seconds=5)}}, {"results": {"1000": result()}}) == []
+
+
+def test_schedule_has_requested_label_count(tmp_path):
+    import openpyxl
+
+    path = str(tmp_path / "schedule.xlsx")
+    rows = make_schedule(path, 200)
+    sheet = openpyxl.load_workbook(path, read_only=True).active
+    quantities = [row[4] for row in sheet.iter_rows(min_row=2, values_only=True)]
+    assert len(quantities) == rows
+    assert sum(quantities) == 200
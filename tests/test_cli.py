@@ -0,0 +1,35 @@
+"""Имена вывода командной строки"""
+import os
+
+import pytest
+
+from cli import output_path_for, output_paths
+
+
+def test_output_path_for(tmp_path):
+    out = str(tmp_path)
+    assert output_path_for("journals/j.xlsx", out) == os.path.join(out, "j.pdf")
+    assert output_path_for("journals/j.xlsx", out, reprint=True) == os.path.join(out, "j_reprint.pdf")
+
+
+def test_distinct_names_are_kept(tmp_path):
+    out = str(tmp_path)
+    assert output_paths(["a/j.xlsx", "b/k.csv"], out) == [os.path.join(out, "j.pdf"), os.path.join(out, "k.pdf")]
+
+
+def test_same_name_alone_and_in_batch(tmp_path):
+    # Имя не зависит от соседей по запуску — индекс и кэш листов находятся по нему
+    out = str(tmp_path)
+    alone = output_paths(["sub/j.xlsx"], out)
+    batch = output_paths(["a/k.xlsx", "sub/j.xlsx", "m.csv"], out)
+    assert batch[1] == alone[0] == os.path.join(out, "j.pdf")
+
+
+@pytest.mark.parametrize("inputs", [
+        ["j.xlsx", "j.csv"],
+        [os.path.join("a", "j.xlsx"), os.path.join("b", "J.xlsx")],
+        ["j.xlsx", "./j.xlsx"],
+])
+def test_colliding_names_fail(tmp_path, inputs):
+    with pytest.raises(ValueError, match="-o"):
+        output_paths(inputs, str(tmp_path))
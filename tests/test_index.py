@@ -0,0 +1,43 @@
+"""Индекс расположения бирок: тома, PNG и поиск индекса по имени части"""
+import pytest
+
+from engine import LabelRecord, LabelSequence
+from selection import build_index, find_index, page_locations
+
+
+def test_find_index_for_parts(tmp_path):
+    assert find_index(str(tmp_path / "j.index.json")) == str(tmp_path / "j.index.json")
+    assert find_index(str(tmp_path / "j_002.pdf")) == str(tmp_path / "j.index.json")
+    assert find_index(str(tmp_path / "j_0003_back.png")) == str(tmp_path / "j.index.json")
+    # Собственный индекс файла важнее: journal_001.pdf может быть и обычным выводом
+    (tmp_path / "j_001.index.json").write_text("{}")
+    assert find_index(str(tmp_path / "j_001.pdf")) == str(tmp_path / "j_001.index.json")
+
+
+def sequence(*records):
+    data = LabelSequence()
+    for source, row, track, qty in records:
+        data.append(LabelRecord("АПС", track, "КВВГ", "10", qty, row=row, source=source))
+    return data
+
+
+def test_index_positions_point_into_volumes_and_png():
+    data = sequence(("j.xlsx", 2, "A", 9))
+    files, locations = page_locations(["j_0001_front.png", "j_0001_back.png"] * 3, "png", 3)
+    index = build_index(data, 4, files, locations, "a4")
+    assert index["tracks"]["A"][-1] == [3, 1, 4, 1]
+
+
+def test_page_locations_count_sheets_per_volume(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    volumes = []
+    for number, pages in ((1, 4), (2, 2)):
+        writer = pypdf.PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=100, height=100)
+        path = str(tmp_path / f"j_{number:03d}.pdf")
+        writer.write(path)
+        volumes.append(path)
+    files, locations = page_locations(volumes, "pdf", 3)
+    assert files == ["j_001.pdf", "j_002.pdf"]
+    assert locations == [[0, 1, 0, 2], [0, 3, 0, 4], [1, 1, 1, 2]]
@@ -0,0 +1,43 @@
+"""Последовательность бирок"""
+import pytest
+
+from engine import LabelRecord, LabelSequence
+
+
+def make_sequence(*quantities):
+    data = LabelSequence()
+    for number, qty in enumerate(quantities, start=1):
+        data.append(LabelRecord("АПС", f"ТР-{number}", "КВВГ 4x1,5", "10", qty, row=number))
+    return data
+
+
+def test_length_and_indexing():
+    data = make_sequence(3, 1, 2)
+    assert len(data) == 6
+    assert [(record.row, copy) for record, copy in data] == [(1, 0), (1, 1), (1, 2), (2, 0), (3, 0), (3, 1)]
+    assert data[3][0].row == 2
+    assert data[-1] == (data.records[2], 1)
+    with pytest.raises(IndexError):
+        data[6]
+
+
+def test_zero_quantity_is_skipped():
+    data = make_sequence(2, 0, 1)
+    assert len(data.records) == 2
+    assert len(data) == 3
+
+
+def test_slice_splits_boundary_records():
+    data = make_sequence(3, 4, 2)
+    part = data.slice(2, 6)
+    assert [(record.row, record.qty) for record in part.records] == [(1, 1), (2, 3)]
+    assert list(part) == [(part.records[0], 0), *((part.records[1], copy) for copy in range(3))]
+    # Записи целиком не копируются
+    assert data.slice(3, 7).records[0] is data.records[1]
+
+
+def test_slice_past_end_and_empty():
+    data = make_sequence(2, 2)
+    assert len(data.slice(3, 100)) == 1
+    assert len(data.slice(4, 10)) == 0
+    assert len(LabelSequence().slice(0, 5)) == 0
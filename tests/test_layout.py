@@ -0,0 +1,30 @@
+"""Раскладка ячеек листа"""
+import pytest
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+from engine import SheetLayout
+from templates import A4_TEMPLATE
+
+
+def test_slots_alternate_and_fill_rows():
+    layout = SheetLayout(template=A4_TEMPLATE)
+    front = layout.slots("front")
+    assert layout.per_page == len(front) == 25
+    assert [slot.upside_down for slot in front[:5]] == [False, True, False, True, False]
+    # Соседние треугольники сдвинуты на половину основания, ряды — на высоту
+    assert front[1].center_x - front[0].center_x == pytest.approx(30 * mm)
+    assert front[5].y_base - front[0].y_base == pytest.approx(49 * mm)
+    assert front[0].center_x == pytest.approx(45 * mm)
+
+
+def test_back_is_mirrored_and_shifted():
+    plain = SheetLayout(template=A4_TEMPLATE)
+    shifted = SheetLayout(offset_x=1.5, offset_y=-2, template=A4_TEMPLATE)
+    for front, back, moved in zip(plain.slots("front"), plain.slots("back"), shifted.slots("back")):
+        assert back.center_x == pytest.approx(A4[0] - front.center_x)
+        assert back.y_base == pytest.approx(front.y_base)
+        assert moved.center_x - back.center_x == pytest.approx(1.5 * mm)
+        assert moved.y_base - back.y_base == pytest.approx(-2 * mm)
+    # Компенсация принтера не сдвигает лицевую сторону
+    assert shifted.slots("front") == plain.slots("front")
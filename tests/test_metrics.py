@@ -0,0 +1,32 @@
+"""Файл замеров заданий"""
+import os
+import sys
+import json
+import subprocess
+
+from metrics import emit
+
+
+def default_metrics_file(**env):
+    code = "import metrics; print(metrics.METRICS_FILE)"
+    environ = {key: value for key, value in os.environ.items() if key != "CABLE_SIGNS_METRICS"}
+    environ.update(env)
+    return subprocess.run(
+            [sys.executable, "-c", code], env=environ, capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout.strip()
+
+
+def test_metrics_file_lives_in_app_data(tmp_path):
+    home = str(tmp_path / "home")
+    assert default_metrics_file(CABLE_SIGNS_HOME=home) == os.path.join(home, "metrics.jsonl")
+    assert default_metrics_file(CABLE_SIGNS_HOME=home, CABLE_SIGNS_METRICS="m.jsonl") == "m.jsonl"
+    assert default_metrics_file(CABLE_SIGNS_HOME=home, CABLE_SIGNS_METRICS="") == ""
+
+
+def test_emit_creates_folder_and_appends(tmp_path):
+    path = str(tmp_path / "new" / "metrics.jsonl")
+    emit({"job": "a"}, path)
+    emit({"job": "b"}, path)
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["job"] for line in f] == ["a", "b"]
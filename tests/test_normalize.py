@@ -0,0 +1,75 @@
+"""Нормализация строк журнала: количество, пустые ячейки, замечания"""
+import pytest
+
+from engine import normalize_rows
+from readers import cell_text
+
+
+def rows(*quantities):
+    return [(number, "АПС", "ТР-1", "КВВГ", "10", qty) for number, qty in enumerate(quantities, start=2)]
+
+
+def test_normalize_quantities():
+    labels, issues = normalize_rows(rows(2, "3", "4,0", None, ""), source="j.xlsx")
+    assert [record.qty for record in labels.records] == [2, 3, 4, 1, 1]
+    assert issues == []
+    assert labels.records[0].source == "j.xlsx"
+    assert labels.records[0].length_text == "L=10 м"
+
+
+@pytest.mark.parametrize("value", ["x", "inf", "-inf", "nan", "1e400", float("inf"), float("nan")])
+def test_normalize_reports_bad_quantity(value):
+    labels, issues = normalize_rows(rows(value), source="j.xlsx")
+    assert labels.records[0].qty == 1
+    assert [(issue.row, issue.field, issue.source) for issue in issues] == [(2, "quantity", "j.xlsx")]
+
+
+def test_normalize_limits_and_negative_quantity():
+    labels, issues = normalize_rows(rows(5000, -2), max_qty=100)
+    assert [record.qty for record in labels.records] == [100]
+    assert [issue.row for issue in issues] == [2, 3]
+
+
+def test_normalize_reports_blank_track_and_cable():
+    labels, issues = normalize_rows([(2, "АПС", None, "  ", 10, 1), (3, None, None, None, None, None)])
+    assert {(issue.row, issue.field) for issue in issues} == {(2, "track"), (2, "cable")}
+    # Пустая строка печатается пустой биркой без замечаний
+    assert len(labels) == 2
+    assert labels.records[0].length == "10"
+
+
+def test_normalize_chunks_match_single_pass(monkeypatch):
+    import engine
+
+    source = [(number, "АПС", f"ТР-{number % 7}", "КВВГ", str(number % 3), number % 4) for number in range(2, 60)]
+    whole, whole_issues = normalize_rows(source)
+    monkeypatch.setattr(engine, "NORMALIZE_CHUNK_ROWS", 5)
+    chunked, chunked_issues = normalize_rows(iter(source))
+    assert [(r.row, r.track, r.qty, r.length_text) for r in chunked.records] == [
+            (r.row, r.track, r.qty, r.length_text) for r in whole.records
+    ]
+    assert chunked_issues == whole_issues
+
+
+def test_cell_text_keeps_excel_formatting():
+    # Как в исходной версии: число из Excel печатается так, как его отдал openpyxl
+    assert cell_text(30.0) == "30.0"
+    assert cell_text(30) == "30"
+    assert cell_text(None) == ""
+    labels, _ = normalize_rows([(2, "АПС", "ТР-1", "КВВГ", 30.0, 1)])
+    assert labels.records[0].length_text == "L=30.0 м"
+
+
+def test_parquet_integer_floats_lose_fraction(tmp_path):
+    # Пустая ячейка делает столбец Parquet float — 30 не должно стать '30.0'
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from readers import read_parquet_rows
+
+    path = str(tmp_path / "j.parquet")
+    pq.write_table(pa.table({
+            "Подсистема": ["АПС", "АПС"], "Трасса": ["ТР-1", "ТР-2"], "Кабель": ["КВВГ", "КВВГ"],
+            "Длина": [30.0, None], "Кол-во": [1, 2],
+    }), path)
+    _, rows = read_parquet_rows(path)
+    assert [row[4] for row in rows] == ["30", ""]
@@ -0,0 +1,55 @@
+"""Кэш готовых файлов"""
+import os
+
+from engine import LabelRecord, LabelSequence
+from output_cache import OutputCache
+
+
+def sequence(track="ТР-1", qty=2):
+    data = LabelSequence()
+    data.append(LabelRecord("АПС", track, "КВВГ", "10", qty, row=2))
+    return data
+
+
+def test_key_depends_on_content_and_params():
+    key = OutputCache.key(sequence(), "params")
+    assert key == OutputCache.key(sequence(), "params")
+    assert key != OutputCache.key(sequence(qty=3), "params")
+    assert key != OutputCache.key(sequence(track="ТР-2"), "params")
+    assert key != OutputCache.key(sequence(), "other params")
+
+
+def write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return str(path)
+
+
+def test_store_and_restore_volumes(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    outputs = [write(tmp_path / "j_001.pdf", 10), write(tmp_path / "j_002.pdf", 20)]
+    cache.store("k1", str(tmp_path / "j.pdf"), outputs, labels=2)
+
+    entry = cache.lookup("k1")
+    assert entry["files"] == ["_001.pdf", "_002.pdf"]
+    assert entry["bytes"] == 30
+    os.makedirs(tmp_path / "out")
+    restored = cache.restore(entry, str(tmp_path / "out" / "k.pdf"))
+    assert [os.path.basename(path) for path in restored] == ["k_001.pdf", "k_002.pdf"]
+    assert os.path.getsize(restored[1]) == 20
+    assert cache.lookup("missing") is None
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_mb=250 / 2 ** 20)
+    for key in ("old", "used", "new"):
+        cache.store(key, str(tmp_path / "j.pdf"), [write(tmp_path / "j.pdf", 100)], labels=1)
+        if key == "used":
+            cache.lookup("old")  # Запись прочитана — вытесняется не она
+    assert {entry["key"] for entry in cache.entries()} == {"old", "new"}
+
+
+def test_output_larger_than_cache_is_not_stored(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_mb=50 / 2 ** 20)
+    cache.store("big", str(tmp_path / "j.pdf"), [write(tmp_path / "j.pdf", 100)], labels=1)
+    assert cache.entries() == []
@@ -0,0 +1,47 @@
+"""Упаковка заданий на общие листы"""
+from engine import LabelRecord, LabelSequence
+from packing import FILLER_JOB, pack_jobs
+
+
+def job(name, count):
+    labels = LabelSequence()
+    labels.append(LabelRecord("АПС", name, "КВВГ", "10", count, row=2, source=name))
+    return name, labels
+
+
+def layout(packed, per_page):
+    """Задания по листам: [[трасса или None для пустой ячейки, ...], ...]"""
+    cells = [record.track or None for record, _ in packed]
+    return [cells[start:start + per_page] for start in range(0, len(cells), per_page)]
+
+
+def test_full_sheets_first_then_tails_share_sheets():
+    packed, report = pack_jobs([job("a", 6), job("b", 3), job("c", 1)], per_page=4)
+    sheets = layout(packed, 4)
+    assert sheets[0] == ["a"] * 4
+    # Хвосты a (2), b (3) и c (1): b+c на одном листе, a — на последнем
+    assert sheets[1:] == [["b", "b", "b", "c"], ["a", "a"]]
+    assert [(entry["job"], entry["sheets"], entry["paper"]) for entry in report] == [
+            ("a", [1, 3], 1.5), ("b", [2], 0.75), ("c", [2], 0.25),
+    ]
+
+
+def test_tail_is_not_split_and_holes_are_blank():
+    packed, _ = pack_jobs([job("a", 3), job("b", 3)], per_page=4)
+    assert layout(packed, 4) == [["a", "a", "a", None], ["b", "b", "b"]]
+
+
+def test_filler_fills_holes_and_the_rest_goes_last():
+    _, filler = job("fill", 4)
+    packed, report = pack_jobs([job("a", 3), job("b", 3)], per_page=4, filler=filler)
+    assert layout(packed, 4) == [["a", "a", "a", "fill"], ["b", "b", "b", "fill"], ["fill", "fill"]]
+    assert report[-1]["job"] == FILLER_JOB
+    assert report[-1]["sheets"] == [1, 2, 3]
+
+
+def test_packing_keeps_every_label():
+    jobs = [job(name, count) for name, count in (("a", 7), ("b", 25), ("c", 12), ("d", 1))]
+    packed, report = pack_jobs(jobs, per_page=5)
+    printed = [record.track for record, _ in packed if record.track]
+    assert sorted(printed) == sorted(name for name, labels in jobs for _ in range(len(labels)))
+    assert sum(entry["labels"] for entry in report) == 45
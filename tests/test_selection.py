@@ -0,0 +1,75 @@
+"""Отбор для допечатки"""
+import pytest
+
+from engine import LabelRecord, LabelSequence
+from selection import (
+        Selection, build_index, index_path, make_selection, original_path, page_locations,
+        parse_ranges, reprint_path, sheet_copies, write_index,
+)
+
+
+def test_parse_ranges():
+    assert parse_ranges("3, 7-9,,12-12") == [(3, 3), (7, 9), (12, 12)]
+    assert parse_ranges("") == []
+
+
+@pytest.mark.parametrize("value", ["a", "5-3", "0", "2-x", "-4"])
+def test_parse_ranges_rejects(value):
+    with pytest.raises(ValueError):
+        parse_ranges(value)
+
+
+def test_reprint_names():
+    assert reprint_path("out/j.pdf") == "out/j_reprint.pdf"
+    assert reprint_path("out/j_reprint.pdf") == "out/j_reprint.pdf"
+    assert original_path("out/j_reprint.pdf") == "out/j.pdf"
+    assert index_path("out/j.pdf") == "out/j.index.json"
+
+
+def sequence(*records):
+    data = LabelSequence()
+    for source, row, track, qty in records:
+        data.append(LabelRecord("АПС", track, "КВВГ", "10", qty, row=row, source=source))
+    return data
+
+
+def test_sheet_copies_counts_labels_on_selected_sheets():
+    # 4 бирки на лист: строка 2 — листы 1–2, строка 3 — лист 2, строка 4 — листы 2–3
+    data = sequence(("j.xlsx", 2, "A", 5), ("j.xlsx", 3, "B", 1), ("j.xlsx", 4, "C", 4))
+    files, locations = page_locations(["j.pdf"], "pdf", 3)
+    index = build_index(data, 4, files, locations, "a4")
+    assert sheet_copies(index, [(2, 2)]) == {("j.xlsx", 2): 1, ("j.xlsx", 3): 1, ("j.xlsx", 4): 2}
+    assert sheet_copies(index, [(1, 1), (3, 3)]) == {("j.xlsx", 2): 4, ("j.xlsx", 4): 2}
+    assert index["tracks"]["C"] == [[2, 3, 0, 3], [2, 4, 0, 3], [3, 1, 0, 5], [3, 2, 0, 5]]
+
+
+ROWS = [
+        (2, "АПС", "ТР-1", "КВВГ", "10", 3),
+        (3, "СКС", "ТР-2", "UTP", "20", 1),
+        (4, "АПС", "ТР-10", "КВВГ", "30", 2),
+]
+
+
+def test_filter_by_track_system_and_rows():
+    assert [row[0] for row in Selection(tracks=["тр-1*"]).filter_rows("j.xlsx", ROWS)] == [2, 4]
+    assert [row[0] for row in Selection(systems=["скс"]).filter_rows("j.xlsx", ROWS)] == [3]
+    assert [row[0] for row in Selection(rows="3-4").filter_rows("j.xlsx", ROWS)] == [3, 4]
+    # Условия разных видов — по «и»
+    assert [row[0] for row in Selection(tracks=["ТР-1*"], rows="3-4").filter_rows("j.xlsx", ROWS)] == [4]
+
+
+def test_filter_by_sheet_numbers_replaces_quantity(tmp_path):
+    data = sequence(("j.xlsx", 2, "ТР-1", 3), ("j.xlsx", 3, "ТР-2", 1), ("j.xlsx", 4, "ТР-10", 2))
+    files, locations = page_locations([str(tmp_path / "j.pdf")], "pdf", 2)
+    write_index(build_index(data, 4, files, locations, "a4"), str(tmp_path / "j.pdf"))
+
+    selection = make_selection({"sheet_numbers": "2"}, str(tmp_path / "j_reprint.pdf"))
+    assert list(selection.filter_rows("j.xlsx", ROWS)) == [(4, "АПС", "ТР-10", "КВВГ", "30", 2)]
+    # Бирки другого источника на листе не было
+    assert list(selection.filter_rows("k.xlsx", ROWS)) == []
+
+
+def test_make_selection_refuses_to_overwrite_its_index(tmp_path):
+    assert make_selection({}) is None
+    with pytest.raises(ValueError):
+        make_selection({"sheet_numbers": "1", "index": str(tmp_path / "j.index.json")}, str(tmp_path / "j.pdf"))
@@ -0,0 +1,50 @@
+"""Сервер печати: только локальные адреса и запросы"""
+import http.client
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from server import JobQueue, _Handler, is_loopback, serve
+
+
+@pytest.mark.parametrize("host, expected", [
+        ("127.0.0.1", True), ("127.0.0.2", True), ("localhost", True), ("[::1]", True),
+        ("0.0.0.0", False), ("", False), ("192.168.1.10", False), ("printer.example.com", False),
+])
+def test_is_loopback(host, expected):
+    assert is_loopback(host) is expected
+
+
+def test_serve_refuses_public_address(tmp_path):
+    with pytest.raises(ValueError):
+        serve("0.0.0.0", 0, queue_path=str(tmp_path / "queue.sqlite3"))
+
+
+@pytest.fixture
+def server(tmp_path):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def status(port, method, host, content_type=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    headers = {"Host": host}
+    if content_type:
+        headers["Content-Type"] = content_type
+    connection.request(method, "/jobs/1/cancel" if method == "POST" else "/jobs", body=b"{}", headers=headers)
+    return connection.getresponse().status
+
+
+def test_requests_need_local_host_and_json(server):
+    assert status(server, "GET", f"127.0.0.1:{server}") == 200
+    # Чужое имя, перенаправленное на 127.0.0.1 (DNS rebinding)
+    assert status(server, "GET", f"evil.example.com:{server}") == 403
+    # Простая форма из браузера
+    assert status(server, "POST", f"localhost:{server}", "text/plain") == 403
+    assert status(server, "POST", f"localhost:{server}", "application/json; charset=utf-8") == 404
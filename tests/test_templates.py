@@ -0,0 +1,36 @@
+"""Шаблоны листов: подбор раскладки, центрирование, рулоны"""
+import pytest
+from reportlab.lib.pagesizes import A3, A4
+from reportlab.lib.units import mm
+
+from templates import densest_tiling, get_template, make_template
+
+
+def test_densest_tiling_picks_orientation():
+    # A3 книжная: 8 в ряду × 8 рядов; альбомная: 12 × 5 — книжная плотнее
+    assert densest_tiling(*A3, 60 * mm, 49 * mm) == (A3[0], A3[1], 8, 8)
+    assert densest_tiling(A3[1], A3[0], 60 * mm, 49 * mm) == (A3[0], A3[1], 8, 8)
+    # Вытянутый лист: вдоль — 8 × 2, поперёк — 2 × 5
+    width, height, cols, rows = densest_tiling(300 * mm, 120 * mm, 60 * mm, 49 * mm)
+    assert (width, height) == (300 * mm, 120 * mm)
+    assert cols * rows == 16
+    width, height, cols, rows = densest_tiling(120 * mm, 300 * mm, 60 * mm, 49 * mm)
+    assert (width, height) == (300 * mm, 120 * mm)
+
+
+def test_make_template_centres_grid_and_rejects_tiny_pages():
+    template = make_template("t", *A4)
+    assert (template.cols, template.rows) == (5, 5)
+    left = template.x_start - template.triangle_base / 2
+    right = template.x_start + template.cols * template.triangle_base / 2
+    assert left == pytest.approx(template.page_width - right)
+    with pytest.raises(ValueError):
+        make_template("tiny", 40 * mm, 40 * mm)
+    with pytest.raises(ValueError):
+        make_template("roll", 100 * mm)
+
+
+def test_roll_height_follows_rows():
+    roll = get_template("roll-100")
+    assert roll.rows == 10
+    assert roll.page_height == pytest.approx(10 * 49 * mm + 6 * mm)
@@ -0,0 +1,42 @@
+"""Тома вывода: старые тома сверх нового числа удаляются"""
+import os
+
+import pytest
+
+from engine import generate_pdf, remove_stale_volumes, volume_path
+
+
+def touch(path):
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    return path
+
+
+def test_remove_stale_volumes(tmp_path):
+    output = str(tmp_path / "j.pdf")
+    for number in (1, 2, 3, 4, 6):
+        touch(volume_path(output, number))
+    assert remove_stale_volumes(output, 2) == [volume_path(output, 3), volume_path(output, 4)]
+    assert sorted(os.listdir(tmp_path)) == ["j_001.pdf", "j_002.pdf", "j_006.pdf"]
+
+
+def journal(path, tracks):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Подсистема", "Трасса", "Кабель", "Длина", "Кол-во"])
+    for track in range(tracks):
+        ws.append(["АПС", f"ТР-{track}", "КВВГ", 10, 25])
+    wb.save(path)
+    return path
+
+
+def test_fewer_volumes_replace_the_old_set(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    output = str(out / "j.pdf")
+    # 25 бирок на лист A4: строка журнала — один лист, том — один лист
+    generate_pdf(journal(str(tmp_path / "j.xlsx"), 4), output, volume_sheets=1, metrics_path=None)
+    assert sorted(path.name for path in out.glob("*.pdf")) == ["j_001.pdf", "j_002.pdf", "j_003.pdf", "j_004.pdf"]
+    generate_pdf(journal(str(tmp_path / "j.xlsx"), 2), output, volume_sheets=1, metrics_path=None)
+    assert sorted(path.name for path in out.glob("*.pdf")) == ["j_001.pdf", "j_002.pdf"]